@@ -1,18 +1,69 @@
 # backend/api/auctions.py
 from flask import Blueprint, request, jsonify
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 
 # Use explicit relative imports
-from models_enhanced import Auction, Bid
-from extensions import db
+from models_enhanced import Auction, AuctionStatus, Bid, Item
+from extensions import db, read_only
+from ending_soon import ending_soon_index
+from http_cache import conditional
+from idempotency import DONE, PENDING, bid_dedupe, valid_client_bid_id
 
 auctions_bp = Blueprint('auctions_bp', __name__)
 
+def active_auctions_version():
+    # Bid ids only grow, so max(Bid.id) moves on every bid, whether or not
+    # the route that stored it touched the auction; count and sum(id) move
+    # when auctions open or close, max(updated_at) on any other change
+    active_ids = select(Auction.id).where(Auction.status == AuctionStatus.ACTIVE)
+    return db.session.execute(
+        select(func.count(Auction.id), func.sum(Auction.id), func.max(Auction.updated_at),
+               func.max(Item.updated_at),
+               select(func.max(Bid.id)).where(Bid.auction_id.in_(active_ids)).scalar_subquery())
+        .join(Item, Item.id == Auction.item_id)
+        .where(Auction.status == AuctionStatus.ACTIVE)
+    ).one()
+
+def auction_version(auction_id):
+    # The detail lists the bids, so the version follows them too
+    bid_count = select(func.count(Bid.id)).where(Bid.auction_id == auction_id).scalar_subquery()
+    last_bid_id = select(func.max(Bid.id)).where(Bid.auction_id == auction_id).scalar_subquery()
+    return db.session.execute(
+        select(Auction.current_price, Auction.winning_bid_id, Auction.status, Auction.end_time,
+               Auction.updated_at, Item.updated_at, bid_count, last_bid_id)
+        .join(Item, Item.id == Auction.item_id)
+        .where(Auction.id == auction_id)
+    ).first()
+
 @auctions_bp.route('/', methods=['GET'])
+@read_only
+@conditional(active_auctions_version)
 def get_auctions():
-    auctions = Auction.query.filter_by(status='ACTIVE').all()
+    auctions = Auction.query.filter_by(status=AuctionStatus.ACTIVE).all()
     return jsonify([auction.to_dict(include_item=True) for auction in auctions]), 200
 
+@auctions_bp.route('/ending-soon', methods=['GET'])
+def get_ending_soon():
+    # Served from the in-memory index, no database access
+    minutes = request.args.get('minutes', 10, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+
+    auctions, total = ending_soon_index.window(minutes * 60, offset=(page - 1) * per_page, limit=per_page)
+    return jsonify({
+        'auctions': [
+            {'auction_id': auction_id, 'end_time': end_time.isoformat()}
+            for auction_id, end_time in auctions
+        ],
+        'page': page,
+        'per_page': per_page,
+        'total': total
+    }), 200
+
 @auctions_bp.route('/<int:auction_id>', methods=['GET'])
+@read_only
+@conditional(auction_version)
 def get_auction(auction_id):
     auction = Auction.query.get_or_404(auction_id)
     return jsonify(auction.to_dict(include_item=True, include_bids=True)), 200
@@ -25,20 +76,65 @@ def place_bid(auction_id):
     if not data or not data.get('amount') or not data.get('bidder_id'):
         return jsonify({'message': 'Missing amount or bidder_id'}), 400
 
-    if data['amount'] <= auction.current_price:
-        return jsonify({'message': 'Bid must be higher than the current price'}), 400
+    # Resends with the same key get the original response back (idempotency.py)
+    client_bid_id = request.headers.get('Idempotency-Key') or data.get('client_bid_id')
+    if client_bid_id is not None:
+        if not valid_client_bid_id(client_bid_id):
+            return jsonify({'message': 'Invalid Idempotency-Key'}), 400
+        state, outcome = bid_dedupe.claim(data['bidder_id'], client_bid_id)
+        if state == DONE:
+            return _replayed(*outcome['data'])
+        if state == PENDING:
+            return jsonify({'message': 'A bid with this Idempotency-Key is still being processed'}), 409
+
+    def reply(body, status):
+        if client_bid_id is not None:
+            bid_dedupe.complete(data['bidder_id'], client_bid_id, {'event': 'response', 'data': (body, status)})
+        return jsonify(body), status
 
-    new_bid = Bid(
-        auction_id=auction_id,
-        bidder_id=data['bidder_id'],
-        amount=data['amount']
-    )
-    
-    # The event listener will update the auction's price and stats
-    db.session.add(new_bid)
-    db.session.commit()
+    try:
+        # A resend the in-memory table missed (other process, restart) gets
+        # the stored bid back instead of being validated against its own price
+        if client_bid_id is not None:
+            original = Bid.query.filter_by(bidder_id=data['bidder_id'], client_bid_id=client_bid_id).first()
+            if original is not None:
+                bid_dedupe.complete(data['bidder_id'], client_bid_id,
+                                    {'event': 'response', 'data': (original.to_dict(), 201)})
+                return _replayed(original.to_dict(), 201)
+
+        if data['amount'] <= auction.current_price:
+            return reply({'message': 'Bid must be higher than the current price'}, 400)
+
+        new_bid = Bid(
+            auction_id=auction_id,
+            bidder_id=data['bidder_id'],
+            amount=data['amount'],
+            client_bid_id=client_bid_id
+        )
+
+        # The event listener will update the auction's price and stats
+        db.session.add(new_bid)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        original = Bid.query.filter_by(bidder_id=data['bidder_id'], client_bid_id=client_bid_id).first()
+        if client_bid_id is None or original is None:
+            bid_dedupe.release(data['bidder_id'], client_bid_id)
+            raise
+        bid_dedupe.complete(data['bidder_id'], client_bid_id, {'event': 'response', 'data': (original.to_dict(), 201)})
+        return _replayed(original.to_dict(), 201)
+    except Exception:
+        if client_bid_id is not None:
+            bid_dedupe.release(data['bidder_id'], client_bid_id)
+        raise
 
     # In a real app, you would emit a socketio event here to update all clients
     # socketio.emit('new_bid', {'auction_id': auction_id, 'bid': new_bid.to_dict()}, room=f'auction-{auction_id}')
 
-    return jsonify(new_bid.to_dict()), 201
+    return reply(new_bid.to_dict(), 201)
+
+def _replayed(body, status):
+    response = jsonify(body)
+    response.status_code = status
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
@@ -1,7 +1,8 @@
 from functools import wraps
 from flask import request, jsonify, g, current_app
 import jwt
-from models import User
+from extensions import db
+from models_enhanced import User
 
 def token_required(role=None):
     def decorator(f):
@@ -20,8 +21,8 @@ def token_required(role=None):
 
             try:
                 data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-                current_user = User.query.get(data['id'])
-                if not current_user:
+                current_user = db.session.get(User, data['id']) if data.get('id') else None
+                if not current_user or not current_user.is_active:
                     return jsonify({'message': 'User not found'}), 401
                 g.current_user = current_user
             except jwt.ExpiredSignatureError:
@@ -29,7 +30,7 @@ def token_required(role=None):
             except jwt.InvalidTokenError:
                 return jsonify({'message': 'Token is invalid'}), 401
 
-            if role and g.current_user.role != role:
+            if role and g.current_user.role.value != role:
                 return jsonify({'message': f'Access denied: requires {role} role'}), 403
 
             return f(*args, **kwargs)
@@ -1,18 +1,32 @@
 # backend/api/items.py
 from flask import Blueprint, request, jsonify
+from sqlalchemy import func, select
 
 # Use explicit relative imports
 from models_enhanced import Item
-from extensions import db
+from extensions import db, read_only
+from http_cache import conditional
 
 items_bp = Blueprint('items_bp', __name__)
 
+def items_version():
+    return db.session.execute(
+        select(func.count(Item.id), func.max(Item.id), func.max(Item.updated_at))
+    ).one()
+
+def item_version(item_id):
+    return db.session.execute(select(Item.updated_at).where(Item.id == item_id)).scalar()
+
 @items_bp.route('/', methods=['GET'])
+@read_only
+@conditional(items_version)
 def get_items():
     items = Item.query.all()
-    return jsonify([item.to_dict() for item in items]), 200
+    return jsonify(Item.__schema__.dump_many(items)), 200
 
 @items_bp.route('/<int:item_id>', methods=['GET'])
+@read_only
+@conditional(item_version)
 def get_item(item_id):
     item = Item.query.get_or_404(item_id)
     return jsonify(item.to_dict(include_owner=True)), 200
@@ -0,0 +1,82 @@
+# backend/api/media.py
+import os
+import re
+
+from flask import Blueprint, current_app, g, jsonify, request, send_file
+
+from api.decorators import token_required
+from extensions import db
+from media import UploadRejected
+from models_enhanced import Item
+
+media_bp = Blueprint('media_bp', __name__)
+
+_DIGEST = re.compile(r'^[0-9a-f]{64}$')
+
+
+@media_bp.route('/items/<int:item_id>/image', methods=['PUT', 'POST'])
+@token_required()
+def upload_item_image(item_id):
+    """
+    Upload an item photo as the raw request body (Content-Type: image/...) or
+    as the `image` field of a multipart form. The body is streamed to disk;
+    thumbnails are rendered in the background.
+    """
+    item = Item.query.get_or_404(item_id)
+    if item.owner_id != g.current_user.id:
+        return jsonify({'message': 'Only the item owner can upload its image'}), 403
+
+    store = current_app.extensions['media']
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        if upload is None:
+            return jsonify({'message': 'Missing image field'}), 400
+        stream = upload.stream
+    else:
+        stream = request.stream
+
+    try:
+        digest, extension, created = store.save_stream(stream, current_app.config['MAX_CONTENT_LENGTH'])
+    except UploadRejected as e:
+        return jsonify({'message': str(e)}), 400
+
+    if created or not all(os.path.exists(store.thumbnail_path(digest, size)) for size in store.thumbnail_sizes):
+        store.generate_thumbnails(digest, extension)
+
+    urls = store.urls(digest)
+    item.image_url = urls['original']
+    db.session.commit()
+    return jsonify({'item_id': item.id, 'digest': digest, 'deduplicated': not created, **urls}), 201
+
+
+@media_bp.route('/<digest>', methods=['GET'])
+def get_original(digest):
+    store = current_app.extensions['media']
+    path = store.find_original(digest) if _DIGEST.match(digest) else None
+    if path is None:
+        return jsonify({'message': 'Image not found'}), 404
+    return _immutable(send_file(path, conditional=True, etag=digest))
+
+
+@media_bp.route('/<digest>/<int:size>.webp', methods=['GET'])
+def get_thumbnail(digest, size):
+    store = current_app.extensions['media']
+    if not _DIGEST.match(digest) or size not in store.thumbnail_sizes:
+        return jsonify({'message': 'Image not found'}), 404
+    path = store.thumbnail_path(digest, size)
+    if os.path.exists(path):
+        return _immutable(send_file(path, mimetype='image/webp', conditional=True, etag=f'{digest}-{size}'))
+    # still rendering: serve the original once, uncached, so the client retries later
+    original = store.find_original(digest)
+    if original is None:
+        return jsonify({'message': 'Image not found'}), 404
+    response = send_file(original)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def _immutable(response):
+    """Content-addressed URLs never change: cache for the configured lifetime"""
+    max_age = current_app.config.get('MEDIA_CACHE_MAX_AGE', 31536000)
+    response.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+    return response
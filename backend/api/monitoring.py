@@ -0,0 +1,53 @@
+# backend/api/monitoring.py
+from flask import Blueprint, Response, jsonify, current_app, request
+
+from api.decorators import token_required
+from extensions import db, pool_stats
+
+monitoring_bp = Blueprint('monitoring_bp', __name__)
+
+@monitoring_bp.route('/db-pool', methods=['GET'])
+@token_required(role='admin')
+def get_db_pool_stats():
+    """
+    Connection pool utilisation for the primary and the read engine (admins only).
+    """
+    read_engine = current_app.extensions['read_engine']
+    return jsonify({
+        'primary': pool_stats(db.engine),
+        'read': pool_stats(read_engine) if read_engine is not db.engine else 'primary',
+    }), 200
+
+@monitoring_bp.route('/metrics', methods=['GET'])
+@token_required(role='admin')
+def get_metrics():
+    """
+    Latency percentiles and SQL per call for every route and socket event (admins only).
+    ?format=prometheus returns the Prometheus text format instead of JSON;
+    scrapers send an admin token as their bearer token.
+    """
+    metrics = current_app.extensions.get('metrics')
+    if metrics is None:
+        return jsonify({'message': 'Instrumentation is disabled'}), 404
+    if request.args.get('format') == 'prometheus':
+        return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify(metrics.snapshot()), 200
+
+@monitoring_bp.route('/jobs', methods=['GET'])
+@token_required(role='admin')
+def get_job_stats():
+    """
+    Background job counts by status (queued, running, dead); admins only.
+    """
+    return jsonify(current_app.extensions['jobs'].stats()), 200
+
+@monitoring_bp.route('/outbound', methods=['GET'])
+@token_required(role='admin')
+def get_outbound_stats():
+    """
+    Per-connection outbound queue depths and slow-consumer counters; admins only.
+    """
+    outbound = current_app.extensions.get('outbound')
+    if outbound is None:
+        return jsonify({'message': 'The socket server is not running in this process'}), 404
+    return jsonify(outbound.stats()), 200
@@ -1,11 +1,20 @@
 # backend/app.py
+import os
+
 from flask import Flask
 from flask_cors import CORS
 
 # --- 1. استيراد الإضافات والتهيئة ---
 # لاحظ: لا توجد نقاط هنا. هذا هو الشكل الصحيح.
-from extensions import db, bcrypt, socketio
-from config import Config
+from extensions import db, bcrypt, socketio, socketio_options, configure_engines, init_read_routing
+from config import Config, config
+from instrumentation import init_instrumentation, instrument_socketio
+from query_guard import init_query_guard
+from media import init_media
+from http_cache import init_http_cache
+from serialization import init_serialization
+from job_queue import init_job_queue
+from idempotency import init_bid_dedupe
 
 def create_app(config_class=Config):
     """
@@ -18,20 +27,33 @@ def create_app(config_class=Config):
 
     # --- 2. تهيئة الإضافات مع التطبيق ---
     db.init_app(app)
+    configure_engines(app)
+    init_read_routing(app)
     bcrypt.init_app(app)
-    socketio.init_app(app)
+    init_serialization(app)
+    socketio.init_app(app, **socketio_options(app))
+    init_instrumentation(app)
+    init_query_guard(app)
+    init_media(app)
+    init_http_cache(app)
+    init_job_queue(app)
+    init_bid_dedupe(app)
 
     # --- 3. تسجيل Blueprints ---
     # لاحظ: لا توجد نقاط هنا أيضًا. هذا هو الشكل الصحيح.
     from api.auth import auth_bp
-    # from api.items import items_bp      # TODO: Uncomment when items API is implemented
-    # from api.auctions import auctions_bp  # TODO: Uncomment when auctions API is implemented
+    from api.items import items_bp
+    from api.auctions import auctions_bp
     from api.merchant import merchant_bp
+    from api.monitoring import monitoring_bp
+    from api.media import media_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    # app.register_blueprint(items_bp, url_prefix='/api/items')      # TODO: Uncomment when items API is implemented
-    # app.register_blueprint(auctions_bp, url_prefix='/api/auctions')  # TODO: Uncomment when auctions API is implemented
+    app.register_blueprint(items_bp, url_prefix='/api/items')
+    app.register_blueprint(auctions_bp, url_prefix='/api/auctions')
     app.register_blueprint(merchant_bp, url_prefix='/api')
+    app.register_blueprint(monitoring_bp, url_prefix='/api/monitoring')
+    app.register_blueprint(media_bp, url_prefix='/api/media')
 
     # --- 4. أوامر مخصصة (Custom CLI Commands) ---
     @app.cli.command("init-db")
@@ -49,10 +71,14 @@ def create_app(config_class=Config):
     def on_disconnect():
         print('Client disconnected')
 
+    instrument_socketio(socketio, app)
+
     return app
 
 # --- 6. نقطة الدخول للتشغيل المباشر (للتطوير فقط) ---
+# For production use serve.py (gunicorn, see gunicorn.conf.py).
 if __name__ == '__main__':
-    app = create_app()
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    app = create_app(config[os.environ.get('FLASK_CONFIG', 'development')])
+    socketio.run(app, debug=app.config.get('DEBUG', False), host='0.0.0.0',
+                 port=app.config['SERVER_BASE_PORT'])
 
@@ -0,0 +1,190 @@
+"""
+Auction Event Log for Mzadd Platform
+Per-auction event sequence numbers and a bounded log of recent deltas, so
+reconnecting clients can catch up without a full auction snapshot.
+
+A client may receive an auction's events from any server process (through
+the message queue), so with SERVER_PROCESSES > 1 the epoch, sequences and
+recent events live in Redis (SharedAuctionEventLog) and every process
+numbers from the same counters.
+"""
+
+import threading
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from serialization import dumps_bytes, loads
+
+try:
+    import redis
+except ImportError:  # only needed for more than one server process
+    redis = None
+
+
+def parse_seq(value) -> Optional[int]:
+    """A client-sent sequence number as an int, or None when it is not one"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class AuctionEventLog:
+    """Assigns monotonically increasing sequence numbers and keeps recent events"""
+
+    def __init__(self, max_events_per_auction: int = 256):
+        # Identifies this log's lifetime: sequence numbers from another
+        # epoch (e.g. before a restart) cannot be compared with ours.
+        self.epoch = uuid.uuid4().hex[:12]
+        self.max_events = max_events_per_auction
+        self._seq: Dict[int, int] = {}
+        self._events: Dict[int, Deque[Dict]] = {}
+        self._lock = threading.Lock()
+
+    def append(self, auction_id: int, event: str, data: Dict) -> int:
+        """Record an event and return its sequence number"""
+        with self._lock:
+            seq = self._seq.get(auction_id, 0) + 1
+            self._seq[auction_id] = seq
+            events = self._events.get(auction_id)
+            if events is None:
+                events = self._events[auction_id] = deque(maxlen=self.max_events)
+            events.append({'seq': seq, 'event': event, 'data': data})
+            return seq
+
+    def current_seq(self, auction_id: int) -> int:
+        return self._seq.get(auction_id, 0)
+
+    def since(self, auction_id: int, last_seq: int, epoch: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Events after `last_seq`, or None when the client must take a snapshot
+        instead (different epoch, unknown auction, a `last_seq` that is not a
+        number, or the gap is older than what the log still holds).
+        """
+        last_seq = parse_seq(last_seq)
+        if epoch != self.epoch or last_seq is None:
+            return None
+        with self._lock:
+            current = self._seq.get(auction_id)
+            if current is None or last_seq > current:
+                return None
+            if last_seq == current:
+                return []
+            events = self._events.get(auction_id)
+            if not events or events[0]['seq'] > last_seq + 1:
+                return None
+            return [entry for entry in events if entry['seq'] > last_seq]
+
+    def discard(self, auction_id: int):
+        """Drop the log of a finished auction (its sequence keeps counting)"""
+        with self._lock:
+            self._events.pop(auction_id, None)
+
+    def export(self) -> Dict:
+        """Epoch, sequences and recent events, for handing off to a new process"""
+        with self._lock:
+            return {
+                'epoch': self.epoch,
+                'seq': dict(self._seq),
+                'events': {auction_id: list(events) for auction_id, events in self._events.items()},
+            }
+
+    def adopt(self, state: Dict) -> bool:
+        """
+        Continue a predecessor's sequences under its epoch, so its clients'
+        last_seq values stay valid. Only possible before this log has
+        sequenced anything itself.
+        """
+        with self._lock:
+            if self._seq:
+                return False
+            self.epoch = state['epoch']
+            self._seq = {int(auction_id): seq for auction_id, seq in state['seq'].items()}
+            self._events = {
+                int(auction_id): deque(events, maxlen=self.max_events)
+                for auction_id, events in state['events'].items()
+            }
+            return True
+
+
+class SharedAuctionEventLog(AuctionEventLog):
+    """
+    AuctionEventLog kept in Redis: INCR allocates each auction's sequence
+    numbers and a sorted set (scored by seq) holds its recent events, so
+    every process hands out and replays the same numbers.
+    """
+
+    def __init__(self, client, max_events_per_auction: int = 256, prefix: str = 'mzadd:events'):
+        super().__init__(max_events_per_auction)
+        self.client = client
+        self.prefix = prefix
+        self.epoch = self._shared_epoch()
+
+    def _key(self, *parts) -> str:
+        return ':'.join((self.prefix,) + tuple(str(part) for part in parts))
+
+    def _shared_epoch(self) -> str:
+        """The epoch every process uses; a new one if Redis lost the sequences"""
+        self.client.set(self._key('epoch'), uuid.uuid4().hex[:12], nx=True)
+        return self.client.get(self._key('epoch')).decode()
+
+    def append(self, auction_id: int, event: str, data: Dict) -> int:
+        seq = self.client.incr(self._key('seq', auction_id))
+        if seq == 1:
+            # first number handed out (or the counters were lost): re-read the epoch
+            self.epoch = self._shared_epoch()
+        events = self._key('log', auction_id)
+        self.client.zadd(events, {dumps_bytes({'seq': seq, 'event': event, 'data': data}): seq})
+        self.client.zremrangebyrank(events, 0, -self.max_events - 1)
+        return seq
+
+    def current_seq(self, auction_id: int) -> int:
+        return int(self.client.get(self._key('seq', auction_id)) or 0)
+
+    def since(self, auction_id: int, last_seq: int, epoch: Optional[str] = None) -> Optional[List[Dict]]:
+        last_seq = parse_seq(last_seq)
+        if epoch != self.epoch or last_seq is None:
+            return None
+        current = self.client.get(self._key('seq', auction_id))
+        if current is None or last_seq > int(current):
+            return None
+        if last_seq == int(current):
+            return []
+        events = [loads(entry) for entry in self.client.zrangebyscore(self._key('log', auction_id), last_seq + 1, '+inf')]
+        # trimmed, discarded, or a number whose event is not stored yet
+        expected = list(range(last_seq + 1, last_seq + 1 + len(events)))
+        if not events or [entry['seq'] for entry in events] != expected:
+            return None
+        return events
+
+    def discard(self, auction_id: int):
+        self.client.delete(self._key('log', auction_id))
+
+    def export(self) -> Dict:
+        """Nothing to hand over: the successor reads the same keys"""
+        return {'epoch': self.epoch, 'seq': {}, 'events': {}}
+
+    def adopt(self, state: Dict) -> bool:
+        return state['epoch'] == self.epoch
+
+
+def open_event_log(config) -> AuctionEventLog:
+    """
+    The event log for this process: shared through Redis when
+    EVENT_LOG_REDIS_URL is set, in memory otherwise. More than one server
+    process without a shared log would hand out clashing sequence numbers,
+    so that combination is refused.
+    """
+    url = config.get('EVENT_LOG_REDIS_URL')
+    max_events = config.get('EVENT_LOG_MAX_EVENTS', 256)
+    if url:
+        if redis is None:
+            raise RuntimeError('EVENT_LOG_REDIS_URL is set but the redis package is not installed')
+        return SharedAuctionEventLog(redis.Redis.from_url(url), max_events)
+    if config.get('SERVER_PROCESSES', 1) > 1:
+        raise RuntimeError('SERVER_PROCESSES > 1 needs EVENT_LOG_REDIS_URL: event sequences '
+                           'must be allocated in one place for all processes')
+    return AuctionEventLog(max_events)
@@ -0,0 +1,133 @@
+"""
+Bid-commit throughput benchmark: legacy vs tuned SQLite engine profile.
+
+Writers commit bids the way handle_place_bid does (insert a bid, update the
+auction price, commit) while readers run listing queries in parallel.
+
+    python benchmarks/bench_bid_commit.py [--writers 4] [--readers 4] [--seconds 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from config import Config, build_engine_options
+from extensions import configure_sqlite_engine
+
+AUCTIONS = 200
+
+SCHEMA = [
+    "CREATE TABLE auction (id INTEGER PRIMARY KEY, current_price FLOAT NOT NULL, total_bids INTEGER NOT NULL)",
+    "CREATE TABLE bid (id INTEGER PRIMARY KEY, auction_id INTEGER NOT NULL, bidder_id INTEGER NOT NULL, "
+    "amount FLOAT NOT NULL, timestamp FLOAT NOT NULL)",
+    "CREATE INDEX ix_bid_auction ON bid (auction_id)",
+]
+
+
+def build_engines(profile, path):
+    uri = f'sqlite:///{path}'
+    if profile == 'legacy':
+        # The previous Config.SQLALCHEMY_ENGINE_OPTIONS, default rollback journal
+        options = {'pool_pre_ping': True, 'pool_recycle': 300, 'connect_args': {'check_same_thread': False}}
+        engine = create_engine(uri, **options)
+        return engine, engine
+
+    config = {key: getattr(Config, key) for key in dir(Config) if key.startswith('SQLITE_')}
+    engine = create_engine(uri, **build_engine_options(uri))
+    configure_sqlite_engine(engine, config)
+    read_engine = create_engine(
+        f'sqlite:///file:{path}?mode=ro&uri=true',
+        pool_size=Config.SQLITE_READ_POOL_SIZE,
+        connect_args={'check_same_thread': False, 'timeout': Config.SQLITE_BUSY_TIMEOUT_MS / 1000},
+    )
+    configure_sqlite_engine(read_engine, config, read_only=True)
+    return engine, read_engine
+
+
+def run(profile, writers, readers, seconds):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    engine, read_engine = build_engines(profile, path)
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO auction (id, current_price, total_bids) VALUES (:id, 100, 0)"),
+                     [{'id': i} for i in range(1, AUCTIONS + 1)])
+
+    stop = threading.Event()
+    counts = {'commits': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def writer(worker_id):
+        n = 0
+        while not stop.is_set():
+            auction_id = (worker_id * 7919 + n) % AUCTIONS + 1
+            n += 1
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text("INSERT INTO bid (auction_id, bidder_id, amount, timestamp) "
+                                      "VALUES (:a, :u, :p, :t)"),
+                                 {'a': auction_id, 'u': worker_id, 'p': 100 + n, 't': time.time()})
+                    conn.execute(text("UPDATE auction SET current_price = :p, total_bids = total_bids + 1 "
+                                      "WHERE id = :a"), {'a': auction_id, 'p': 100 + n})
+                with lock:
+                    counts['commits'] += 1
+            except OperationalError:
+                with lock:
+                    counts['errors'] += 1
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with read_engine.connect() as conn:
+                    conn.execute(text("SELECT a.id, a.current_price, COUNT(b.id) FROM auction a "
+                                      "LEFT JOIN bid b ON b.auction_id = a.id GROUP BY a.id")).fetchall()
+                with lock:
+                    counts['reads'] += 1
+            except OperationalError:
+                with lock:
+                    counts['errors'] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    engine.dispose()
+    read_engine.dispose()
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+
+    return {
+        'profile': profile,
+        'bid_commits_per_sec': round(counts['commits'] / seconds, 1),
+        'listing_reads_per_sec': round(counts['reads'] / seconds, 1),
+        'errors': counts['errors'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    for profile in ('legacy', 'tuned'):
+        print(run(profile, args.writers, args.readers, args.seconds))
+
+
+if __name__ == '__main__':
+    main()
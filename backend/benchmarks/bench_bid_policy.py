@@ -0,0 +1,87 @@
+"""
+Bid policy evaluation cost per bid.
+
+Times what the bid hot path asks of the policy engine for every bid
+(minimum next bid, then the anti-sniping decision) over many auctions and
+categories, and compares the ladder lookup with a linear scan of the bands.
+
+    python benchmarks/bench_bid_policy.py [--auctions 10000] [--bids 1000000] [--bands 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bid_policy import PolicyEngine
+
+CATEGORIES = [None, 'electronics', 'cars', 'art', 'watches', 'real_estate']
+
+
+def build_engine(bands):
+    ladder = [(10 ** (i / 4), round(1.5 ** i, 2)) for i in range(bands)]
+    ladder[0] = (0, ladder[0][1])
+    return PolicyEngine.from_config({
+        'BID_INCREMENT_LADDER': ladder,
+        'AUCTION_EXTENSION_WINDOW': 300,
+        'AUCTION_EXTENSION_TIME': 300,
+        'AUCTION_MAX_EXTENSIONS': 20,
+        'BID_POLICY_CATEGORIES': {
+            category: {'increments': [(start * 2, increment * 2) for start, increment in ladder]}
+            for category in CATEGORIES[1:]
+        },
+    })
+
+
+def linear_increment(bands, price):
+    increment = bands[0][1]
+    for start, band_increment in bands:
+        if price < start:
+            break
+        increment = band_increment
+    return increment
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--auctions', type=int, default=10000)
+    parser.add_argument('--bids', type=int, default=1000000)
+    parser.add_argument('--bands', type=int, default=20)
+    args = parser.parse_args()
+
+    engine = build_engine(args.bands)
+    rng = random.Random(42)
+    categories = {auction_id: rng.choice(CATEGORIES) for auction_id in range(args.auctions)}
+    bids = [
+        (rng.randrange(args.auctions), rng.uniform(0, 10 ** (args.bands / 4)), rng.uniform(0, 3600))
+        for _ in range(args.bids)
+    ]
+
+    start = time.perf_counter()
+    for auction_id, price, remaining in bids:
+        engine.min_next_bid(auction_id, price, categories[auction_id])
+        engine.extension_for(auction_id, remaining)
+    policy_elapsed = time.perf_counter() - start
+
+    bands = engine.default.ladder.bands
+    start = time.perf_counter()
+    for _, price, _ in bids:
+        engine.default.ladder.increment_for(price)
+    bisect_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _, price, _ in bids:
+        linear_increment(bands, price)
+    linear_elapsed = time.perf_counter() - start
+
+    per_bid = lambda elapsed: elapsed / args.bids * 1e9
+    print(f"{args.bids} bids, {args.auctions} auctions, {args.bands} price bands")
+    print(f"  full policy evaluation : {per_bid(policy_elapsed):7.0f} ns/bid")
+    print(f"  ladder lookup (bisect) : {per_bid(bisect_elapsed):7.0f} ns/bid")
+    print(f"  ladder lookup (linear) : {per_bid(linear_elapsed):7.0f} ns/bid")
+
+
+if __name__ == '__main__':
+    main()
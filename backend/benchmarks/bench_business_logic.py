@@ -0,0 +1,45 @@
+"""
+Micro-benchmarks for the settlement and analytics paths in business_logic.
+
+    pytest benchmarks/bench_business_logic.py --benchmark-autosave
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from business_logic import analytics_manager, profit_optimizer, revenue_manager
+from models_enhanced import db, Item, User, UserRole
+
+
+@pytest.mark.parametrize('rate', [None, 0.035])
+def test_calculate_commission(benchmark, rate):
+    result = benchmark(revenue_manager.calculate_commission, 1234.56, rate)
+    assert result > 0
+
+
+def test_get_revenue_analytics(benchmark, seeded_app):
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=30)
+
+    def run():
+        result = analytics_manager.get_revenue_analytics(start_date, end_date)
+        db.session.remove()  # measure a cold identity map every round
+        return result
+
+    result = benchmark.pedantic(run, rounds=3, iterations=1, warmup_rounds=1)
+    assert result['success']
+
+
+def test_suggest_optimal_commission_rate_big_merchant(benchmark, seeded_app):
+    merchant_id = db.session.query(Item.owner_id).join(User, User.id == Item.owner_id).filter(
+        User.role == UserRole.MERCHANT
+    ).group_by(Item.owner_id).order_by(func.count(Item.id).desc()).limit(1).scalar()
+
+    def run():
+        result = profit_optimizer.suggest_optimal_commission_rate(merchant_id)
+        db.session.remove()
+        return result
+
+    result = benchmark.pedantic(run, rounds=5, iterations=1, warmup_rounds=1)
+    assert result['success']
@@ -0,0 +1,89 @@
+"""
+Cost of a dashboard poll with and without conditional GET.
+
+Serves a listing of synthetic auctions through the Flask test client and
+compares, per poll: a plain jsonify route, the same route behind
+@conditional on a changed version (view + compression), a repeat poll
+answered from the encoded body cache, and a poll answered with 304.
+
+    python benchmarks/bench_http_cache.py [--auctions 1000] [--polls 500]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Blueprint, jsonify
+
+from app import create_app
+from config import TestingConfig
+from http_cache import conditional
+
+
+def build_app(auctions):
+    now = datetime(2026, 1, 1)
+    rows = [{
+        'id': i,
+        'item': {'id': i, 'name': f'Lot {i}', 'category': 'electronics', 'image_url': f'/api/media/{i:064x}'},
+        'current_price': 100.0 + i,
+        'status': 'ACTIVE',
+        'end_time': (now + timedelta(minutes=i)).isoformat(),
+        'bid_count': i % 37,
+    } for i in range(auctions)]
+    state = {'version': 0}
+
+    blueprint = Blueprint('bench_bp', __name__)
+
+    @blueprint.route('/plain')
+    def plain():
+        return jsonify(rows)
+
+    @blueprint.route('/conditional')
+    @conditional(lambda: state['version'])
+    def cached():
+        return jsonify(rows)
+
+    app = create_app(TestingConfig)
+    app.register_blueprint(blueprint, url_prefix='/bench')
+    return app, state
+
+
+def measure(label, polls, poll):
+    poll()
+    start = time.perf_counter()
+    size = 0
+    for _ in range(polls):
+        size = len(poll().data)
+    per_poll = (time.perf_counter() - start) / polls
+    print(f"  {label:<34} {per_poll * 1e6:9.0f} us/poll  {size:9d} bytes on the wire")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--auctions', type=int, default=1000)
+    parser.add_argument('--polls', type=int, default=500)
+    args = parser.parse_args()
+
+    app, state = build_app(args.auctions)
+    client = app.test_client()
+    gzip_only = {'Accept-Encoding': 'gzip'}
+
+    def changed():
+        state['version'] += 1
+        return client.get('/bench/conditional', headers=gzip_only)
+
+    print(f"{args.auctions} auctions, {args.polls} polls")
+    measure('plain jsonify', args.polls, lambda: client.get('/bench/plain'))
+    measure('plain jsonify + gzip', args.polls, lambda: client.get('/bench/plain', headers=gzip_only))
+    measure('conditional, version changed', args.polls, changed)
+    etag = client.get('/bench/conditional', headers=gzip_only).headers['ETag']
+    measure('conditional, cached gzip body', args.polls, lambda: client.get('/bench/conditional', headers=gzip_only))
+    measure('conditional, 304 Not Modified', args.polls,
+            lambda: client.get('/bench/conditional', headers={**gzip_only, 'If-None-Match': etag}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Bid journal write throughput and crash-recovery time.
+
+Writes N bid records (plus an extension every 50 bids and a close every
+2000) across a set of auctions, then measures recovery:
+  - full replay of every segment (no snapshot)
+  - snapshot + the records appended after it (--tail)
+and, for reference, rebuilding the same per-auction state from a SQLite
+bid table with one aggregate query.
+
+    python benchmarks/bench_journal.py [--entries 1000000] [--auctions 5000] [--tail 100000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bid_journal import BidJournal
+
+
+def write(directory, entries, auctions, snapshot_at=None):
+    random.seed(7)
+    journal = BidJournal(directory, snapshot_every=0)
+    start_time = datetime(2026, 1, 1)
+    rows = []
+    began = time.perf_counter()
+    for bid_id in range(1, entries + 1):
+        auction_id = random.randrange(1, auctions + 1)
+        bidder_id = random.randrange(1, 20000)
+        amount = 10.0 + bid_id * 0.01
+        journal.record_bids(auction_id, [(bid_id, bidder_id, amount)])
+        rows.append((bid_id, auction_id, bidder_id, amount))
+        if bid_id % 50 == 0:
+            journal.record_extension(auction_id, start_time + timedelta(seconds=bid_id), bid_id // 50 % 5,
+                                     sync=False)
+        if bid_id % 2000 == 0:
+            journal.record_close(random.randrange(1, auctions + 1), sync=False)
+        if bid_id == snapshot_at:
+            journal.compact()
+    journal.close()
+    elapsed = time.perf_counter() - began
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    return elapsed, size, rows
+
+
+def recover(directory, repeat):
+    best = None
+    for _ in range(repeat):
+        journal = BidJournal(directory, snapshot_every=0)
+        began = time.perf_counter()
+        state = journal.recover()
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best, state
+
+
+def rebuild_from_db(rows, repeat):
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE bid (id INTEGER PRIMARY KEY, auction_id INTEGER, bidder_id INTEGER, amount REAL)')
+    connection.execute('CREATE INDEX ix_bid_auction ON bid (auction_id)')
+    connection.executemany('INSERT INTO bid VALUES (?, ?, ?, ?)', rows)
+    connection.commit()
+    query = ('SELECT b.auction_id, b.amount, b.bidder_id, b.id, agg.total FROM bid b JOIN '
+             '(SELECT auction_id, MAX(id) AS last_id, COUNT(*) AS total FROM bid GROUP BY auction_id) agg '
+             'ON b.id = agg.last_id')
+    best = None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = connection.execute(query).fetchall()
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--entries', type=int, default=1_000_000)
+    parser.add_argument('--auctions', type=int, default=5000)
+    parser.add_argument('--tail', type=int, default=100_000, help='records after the snapshot')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    full_dir, snap_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    try:
+        elapsed, size, rows = write(full_dir, args.entries, args.auctions)
+        print(f'write      {args.entries} bids  {elapsed:6.2f} s  {args.entries / elapsed:10.0f} bids/s  '
+              f'{size / 1e6:.1f} MB')
+        replay, state = recover(full_dir, args.repeat)
+        print(f'replay     full journal       {replay:6.2f} s  ({len(state)} open auctions)')
+
+        write(snap_dir, args.entries, args.auctions, snapshot_at=args.entries - args.tail)
+        snapshot, snapshot_state = recover(snap_dir, args.repeat)
+        print(f'replay     snapshot + {args.tail} {snapshot:6.2f} s  ({len(snapshot_state)} open auctions)')
+
+        query, groups = rebuild_from_db(rows, args.repeat)
+        print(f'sqlite     aggregate query    {query:6.2f} s  ({groups} auctions, closes not applied)')
+    finally:
+        shutil.rmtree(full_dir)
+        shutil.rmtree(snap_dir)
+
+
+if __name__ == '__main__':
+    main()
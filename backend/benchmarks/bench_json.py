@@ -0,0 +1,125 @@
+"""
+JSON serialization cost for large listings and bid broadcasts.
+
+Compares, per backend (stdlib json, orjson):
+  - a 10k-auction listing built by hand-written to_dict-style functions
+    (isoformat per datetime) versus a compiled Schema (datetimes left to the
+    serializer), including the jsonify() call through the Flask provider
+  - one Socket.IO event packet for a new_bid broadcast
+
+    python benchmarks/bench_json.py [--auctions 10000] [--broadcasts 100000]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+from socketio import packet
+
+import serialization
+from app import create_app
+from config import TestingConfig
+from models_enhanced import UserRole
+from serialization import Many, Schema, SocketIOJSON
+
+
+class Row:
+    """Stands in for a loaded model instance (plain attributes, no ORM overhead)"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+def build_rows(count):
+    now = datetime(2026, 1, 1)
+    rows = []
+    for i in range(count):
+        owner = Row(id=i % 500, username=f'merchant{i % 500}', role=UserRole.MERCHANT)
+        item = Row(id=i, name=f'Lot {i}', category='electronics', start_price=10.0,
+                   image_url=f'/api/media/{i:064x}', owner=owner, updated_at=now)
+        bids = [Row(id=i * 3 + b, bidder_id=b, amount=100.0 + b, timestamp=now + timedelta(seconds=b))
+                for b in range(3)]
+        rows.append(Row(id=i, item=item, current_price=102.0, status='ACTIVE',
+                        start_time=now, end_time=now + timedelta(hours=i % 48), bids=bids))
+    return rows
+
+
+def to_dict(auction):
+    """What hand-written to_dict methods do today"""
+    item = auction.item
+    return {
+        'id': auction.id,
+        'current_price': float(auction.current_price),
+        'status': auction.status,
+        'start_time': auction.start_time.isoformat(),
+        'end_time': auction.end_time.isoformat(),
+        'item': {
+            'id': item.id, 'name': item.name, 'category': item.category,
+            'start_price': float(item.start_price), 'image_url': item.image_url,
+            'updated_at': item.updated_at.isoformat(),
+            'owner': {'id': item.owner.id, 'username': item.owner.username, 'role': item.owner.role.value},
+        },
+        'bids': [{'id': bid.id, 'bidder_id': bid.bidder_id, 'amount': float(bid.amount),
+                  'timestamp': bid.timestamp.isoformat()} for bid in auction.bids],
+    }
+
+
+AUCTION_SCHEMA = Schema(
+    'id', 'current_price', 'status', 'start_time', 'end_time',
+    item=Schema('id', 'name', 'category', 'start_price', 'image_url', 'updated_at',
+                owner=Schema('id', 'username', 'role')),
+    bids=Many(Schema('id', 'bidder_id', 'amount', 'timestamp')),
+)
+
+
+def timed(function, repeat):
+    function()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class Packet(packet.Packet):
+    json = SocketIOJSON
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--auctions', type=int, default=10000)
+    parser.add_argument('--broadcasts', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app(TestingConfig)
+    rows = build_rows(args.auctions)
+    broadcast = ['new_bid', {
+        'auction_id': 42, 'bid_id': 9001, 'amount': Decimal('1250.00'), 'bidder_name': 'sam',
+        'timestamp': datetime(2026, 1, 1, 12, 0, 0, 123456), 'total_bids': 31, 'unique_bidders': 9,
+        'end_time': datetime(2026, 1, 1, 12, 5), 'seq': 118,
+    }]
+
+    print(f"listing of {args.auctions} auctions (best of {args.repeat}), broadcast x{args.broadcasts}")
+    for backend in serialization.BACKENDS:
+        serialization.use_backend(backend)
+        with app.app_context():
+            hand = timed(lambda: jsonify([to_dict(row) for row in rows]), args.repeat)
+            compiled = timed(lambda: jsonify(AUCTION_SCHEMA.dump_many(rows)), args.repeat)
+            size = len(jsonify(AUCTION_SCHEMA.dump_many(rows)).get_data())
+        start = time.perf_counter()
+        for _ in range(args.broadcasts):
+            Packet(packet.EVENT, broadcast).encode()
+        per_packet = (time.perf_counter() - start) / args.broadcasts
+        print(f"  {backend:<7} to_dict + jsonify {hand * 1000:7.1f} ms   schema + jsonify {compiled * 1000:7.1f} ms"
+              f"   ({size / 1e6:.1f} MB)   new_bid packet {per_packet * 1e6:5.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Slow consumers on a hot auction: buffered frames and broadcast cost.
+
+N connections watch one auction; a fraction of them never drain their
+transport. For M new_bid broadcasts (with presence chatter between them)
+this reports, without and with OutboundHub:
+  - frames buffered server-side for the slow connections at the end
+  - time spent per broadcast on backpressure bookkeeping
+
+    python benchmarks/bench_outbound.py [--connections 5000] [--slow 0.05] [--broadcasts 20000]
+"""
+import argparse
+import os
+import queue
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outbound import OutboundHub
+
+
+class Transport:
+    def __init__(self):
+        self.queue = queue.Queue()
+
+
+class SocketIO:
+    """Room emits append to slow transports, which never drain (fast ones are not modelled)"""
+
+    def __init__(self, sids, slow):
+        self.transports = {sid: Transport() for sid in sids}
+        self.slow = slow
+        self.disconnected = set()
+        outer = self
+
+        class Manager:
+            def eio_sid_from_sid(self, sid, namespace):
+                return sid
+
+        class EIO:
+            sockets = self.transports
+
+        class Server:
+            manager = Manager()
+            eio = EIO()
+
+            def disconnect(self, sid, namespace=None):
+                outer.disconnected.add(sid)
+
+        self.server = Server()
+
+    def room_emit(self, skip=()):
+        skip = set(skip)
+        for sid in self.slow:
+            if sid not in skip and sid not in self.disconnected:
+                self.transports[sid].queue.put(None)
+
+    def emit(self, event, data, to=None):
+        self.transports[to].queue.put(None)
+
+
+def run(connections, slow_fraction, broadcasts, use_hub):
+    sids = [f's{i}' for i in range(connections)]
+    slow = sids[:int(connections * slow_fraction)]
+    socketio = SocketIO(sids, slow)
+    hub = OutboundHub(socketio, max_depth=256, watermark=32, on_overflow=lambda sid: {}) if use_hub else None
+    participants = set(sids)
+    bookkeeping = 0.0
+    for i in range(broadcasts):
+        for event in ('new_bid', 'participant_joined'):
+            began = time.perf_counter()
+            behind = hub.behind(participants) if hub else []
+            for sid in behind:
+                hub.push(sid, event, {'amount': i}, auction_id=1)
+            bookkeeping += time.perf_counter() - began
+            socketio.room_emit(skip=behind)
+        if hub and i % 50 == 0:  # the scan/pump task, every scan_interval
+            began = time.perf_counter()
+            hub.scan(sids)
+            hub.pump()
+            bookkeeping += time.perf_counter() - began
+    buffered = sum(socketio.transports[sid].queue.qsize() for sid in slow)
+    if hub:
+        buffered += hub.stats()['queued_frames']
+    return buffered, bookkeeping, len(socketio.disconnected), hub.stats() if hub else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--connections', type=int, default=5000)
+    parser.add_argument('--slow', type=float, default=0.05)
+    parser.add_argument('--broadcasts', type=int, default=20000)
+    args = parser.parse_args()
+
+    for use_hub in (False, True):
+        buffered, bookkeeping, disconnected, stats = run(args.connections, args.slow, args.broadcasts, use_hub)
+        label = 'outbound hub' if use_hub else 'room emit only'
+        per_broadcast = bookkeeping * 1e6 / (args.broadcasts * 2)
+        lagging = max(int(args.connections * args.slow), 1)
+        print(f'{label:15s} buffered frames {buffered:10d}  '
+              f'bookkeeping {per_broadcast:7.2f} us/broadcast ({per_broadcast / lagging:.2f} per slow client)  '
+              f'disconnected {disconnected}')
+        if stats:
+            print(f'{"":15s} {stats}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+Micro-benchmarks for per-request serialization and authentication.
+
+    pytest benchmarks/bench_serialization.py --benchmark-autosave
+"""
+import jwt
+from flask import g, jsonify
+
+from api.decorators import token_required
+from models_enhanced import Auction, User
+
+
+def test_auction_to_dict(benchmark, small_app):
+    auction = Auction.query.filter(Auction.total_bids > 0).first()
+    auction.item  # load the item once; the benchmark measures serialization only
+    result = benchmark(auction.to_dict, include_item=True)
+    assert result['id'] == auction.id
+
+
+def test_token_required_decode(benchmark, small_app):
+    user_id = User.query.with_entities(User.id).first()[0]
+    token = jwt.encode({'id': user_id}, small_app.config['SECRET_KEY'], algorithm='HS256')
+
+    @token_required()
+    def view():
+        return jsonify({'id': g.current_user.id})
+
+    def call():
+        with small_app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+            return view()
+
+    response = benchmark(call)
+    assert response.status_code == 200
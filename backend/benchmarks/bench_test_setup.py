@@ -0,0 +1,130 @@
+"""
+Wall-clock of the test_comprehensive suite: rebuild per test versus
+template + rolled-back transaction.
+
+"rebuild" runs the same tests on what MzaddTestCase used to do for every
+test: a new app on a temporary SQLite file, create_all, three users hashed
+at the production bcrypt cost and a new websocket server, then drop_all.
+"template" runs them as they are, on db_fixtures: one app and server per
+class, and per test a transaction on the in-memory template clone that is
+rolled back.
+
+    python benchmarks/bench_test_setup.py [--repeat 3]
+
+Measured here (1 CPU, 21 tests of which 8 pass and 13 are expected
+failures, best of 3):
+
+    rebuild per test   26.07 s
+    template            0.27 s  (+0.12 s when the template has to be rebuilt)
+
+The whole suite (`pytest -q tests`, 211 tests) takes 9.9-10.2 s of wall
+clock serially. `pytest -n 2 tests` (pytest-xdist) passes too, with the
+template built once under its lock, but takes 12.2-12.4 s on this
+single-CPU machine. The parallel speed-up is unmeasured here.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, 'tests'))
+
+from app import create_app
+from config import Config, TestingConfig
+from db_fixtures import SHARED_USERS, DatabaseTestCase, template_path
+from models_enhanced import User, db
+from websocket_server import create_websocket_server
+
+import test_comprehensive
+
+
+def rebuild_set_up(self):
+    """The old per-test setup, in place of DatabaseTestCase.setUp"""
+    db_fd, db_path = tempfile.mkstemp()
+    uri = f'sqlite:///{db_path}'
+
+    class RebuildConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        BCRYPT_LOG_ROUNDS = Config.BCRYPT_LOG_ROUNDS
+
+    self.app = create_app(RebuildConfig)
+    self.client = self.app.test_client()
+    app_context = self.app.app_context()
+    app_context.push()
+    db.create_all()
+    self.users = {}
+    for username, (email, role, password) in SHARED_USERS.items():
+        user = self.users[username] = User(username=username, email=email, role=role,
+                                           is_active=True, is_verified=True)
+        user.set_password(password)
+        db.session.add(user)
+    db.session.commit()
+    self.websocket_server = create_websocket_server(self.app, self.app.config['SECRET_KEY'])
+
+    def tear_down():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app.extensions['read_engine'].dispose()
+        app_context.pop()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+    self.addCleanup(tear_down)
+
+
+def suite() -> unittest.TestSuite:
+    loader = unittest.TestLoader()
+    tests = unittest.TestSuite()
+    for name in dir(test_comprehensive):
+        case = getattr(test_comprehensive, name)
+        if isinstance(case, type) and issubclass(case, test_comprehensive.MzaddTestCase):
+            tests.addTests(loader.loadTestsFromTestCase(case))
+    return tests
+
+
+def run(rebuild: bool):
+    result = unittest.TestResult()
+    if not rebuild:
+        suite().run(result)
+        return result
+    with mock.patch.object(DatabaseTestCase, 'setUp', rebuild_set_up), \
+            mock.patch.object(DatabaseTestCase, 'setUpClass', classmethod(lambda cls: None)), \
+            mock.patch.object(test_comprehensive.MzaddTestCase, 'setUpClass', classmethod(lambda cls: None)):
+        suite().run(result)
+    return result
+
+
+def timed_run(rebuild: bool):
+    start = time.perf_counter()
+    result = run(rebuild)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per mode; the best is reported')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    start = time.perf_counter()
+    template_path()
+    first_build = time.perf_counter() - start
+
+    for label, rebuild in (('rebuild per test', True), ('template', False)):
+        runs = [timed_run(rebuild) for _ in range(args.repeat)]
+        best, result = min(runs, key=lambda run: run[0])
+        status = 'ok' if result.wasSuccessful() else f'{len(result.failures) + len(result.errors)} failing'
+        print(f"  {label:17s} {best:7.2f} s  ({result.testsRun} tests, {len(result.skipped)} skipped, {status})")
+    print(f"  template build    {first_build:7.2f} s  (only when the schema changed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Concurrent image upload throughput.
+
+Streams synthetic photos into a MediaStore from many threads (as concurrent
+requests would), then waits for the process pool to finish the WebP
+thumbnails. Reports uploads/s and MB/s for the streamed writes and the time
+until every thumbnail exists. A share of the uploads repeats earlier photos
+to exercise deduplication.
+
+    python benchmarks/bench_uploads.py [--uploads 200] [--concurrency 16] [--size 4000x3000]
+"""
+import argparse
+import importlib.util
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from media import MediaStore
+
+
+def make_photos(count, width, height, seed):
+    """JPEG bodies with noise so they compress like photos; raw bytes without Pillow"""
+    rng = random.Random(seed)
+    try:
+        from PIL import Image
+    except ImportError:
+        return [b'\xff\xd8\xff\xe0' + rng.randbytes(width * height // 4) for _ in range(count)]
+    photos = []
+    for _ in range(count):
+        image = Image.frombytes('RGB', (width // 8, height // 8), rng.randbytes(width * height * 3 // 64))
+        buffer = io.BytesIO()
+        image.resize((width, height)).save(buffer, 'JPEG', quality=90)
+        photos.append(buffer.getvalue())
+    return photos
+
+
+def run(uploads, concurrency, width, height, duplicates, workers, seed=7):
+    distinct = max(1, int(uploads * (1 - duplicates)))
+    photos = make_photos(min(distinct, 32), width, height, seed)
+    rng = random.Random(seed)
+    bodies = []
+    for i in range(uploads):
+        body = photos[i % len(photos)]
+        # a different trailer makes each "distinct" upload a different digest
+        bodies.append(body + i.to_bytes(4, 'big') if i < distinct else rng.choice(bodies))
+
+    root = tempfile.mkdtemp(prefix='mzadd-media-')
+    store = MediaStore(root, {'jpg', 'png', 'webp', 'gif'}, workers=workers)
+    try:
+        has_pillow = importlib.util.find_spec('PIL') is not None
+
+        thumbnails = []
+
+        def upload(body):
+            digest, extension, created = store.save_stream(io.BytesIO(body), 16 * 1024 * 1024)
+            if created and has_pillow:
+                thumbnails.append(store.generate_thumbnails(digest, extension))
+            return created
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            created = sum(pool.map(upload, bodies))
+        upload_seconds = time.perf_counter() - start
+        wait(thumbnails)
+        thumbnail_seconds = time.perf_counter() - start
+        failed = sum(1 for future in thumbnails if future.exception() is not None)
+
+        megabytes = sum(len(body) for body in bodies) / 1e6
+        print(f"{uploads} uploads ({megabytes:.1f} MB, {created} stored, "
+              f"{uploads - created} deduplicated) with {concurrency} threads")
+        print(f"  streamed:   {upload_seconds:.2f} s  {uploads / upload_seconds:.0f} uploads/s  "
+              f"{megabytes / upload_seconds:.0f} MB/s")
+        if has_pillow:
+            print(f"  thumbnails: {len(thumbnails)} x {len(store.thumbnail_sizes)} sizes done after "
+                  f"{thumbnail_seconds:.2f} s with {store.workers} workers ({failed} failed)")
+        else:
+            print("  thumbnails: skipped (Pillow is not installed)")
+    finally:
+        store.shutdown()
+        shutil.rmtree(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uploads', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--size', default='4000x3000', help='photo size WIDTHxHEIGHT')
+    parser.add_argument('--duplicates', type=float, default=0.2, help='share of repeated photos')
+    parser.add_argument('--workers', type=int, default=None, help='thumbnail processes (default: CPUs)')
+    args = parser.parse_args()
+    width, height = (int(part) for part in args.size.lower().split('x'))
+    run(args.uploads, args.concurrency, width, height, args.duplicates, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Fixtures for the pytest-benchmark suite.
+
+Datasets are generated once per size with seed_bulk and cached as SQLite
+files under benchmarks/.data, keyed by size, seed and generator version, so
+every commit is measured against identical data:
+
+    pytest benchmarks/bench_business_logic.py benchmarks/bench_serialization.py \\
+        --benchmark-autosave
+    pytest benchmarks/bench_*.py --benchmark-compare --benchmark-compare-fail=mean:10%
+
+BENCH_AUCTION_COUNTS (default "10000,100000,1000000") selects the dataset
+sizes and BENCH_SEED the generator seed. pytest-benchmark comes from
+requirements.txt; without it the `benchmark` fixture is missing and every
+test errors at setup.
+
+Baseline (SQLite, 4 cores; mean per call):
+
+    size              get_revenue_analytics   suggest_optimal_commission_rate
+    10k auctions      3.8 s                   119 ms
+    100k auctions     35.2 s                  841 ms
+"""
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config import TestingConfig, build_engine_options
+from models_enhanced import db
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.data')
+AUCTION_COUNTS = [int(count) for count in os.environ.get('BENCH_AUCTION_COUNTS', '10000,100000,1000000').split(',')]
+SEED = int(os.environ.get('BENCH_SEED', 42))
+
+
+def dataset_path(auctions: int) -> str:
+    """Path of the cached dataset, generating it on first use"""
+    from seed_bulk import GENERATOR_VERSION, generate
+    path = os.path.join(DATA_DIR, f'auctions_{auctions}_seed_{SEED}_v{GENERATOR_VERSION}.db')
+    if os.path.exists(path):
+        return path
+    os.makedirs(DATA_DIR, exist_ok=True)
+    partial = path + '.partial'
+    app = _create_app(partial)
+    with app.app_context():
+        db.create_all()
+        with db.engine.connect() as connection:
+            generate(connection, auctions, seed=SEED, processes=os.cpu_count() or 1)
+        db.engine.dispose()
+    shutil.move(partial, path)
+    return path
+
+
+def _create_app(path):
+    uri = f'sqlite:///{path}'
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(uri)
+
+    return create_app(BenchConfig)
+
+
+@pytest.fixture(scope='session', params=AUCTION_COUNTS, ids=lambda count: f'{count}_auctions')
+def seeded_app(request):
+    """App bound to a cached dataset of the parametrised size"""
+    app = _create_app(dataset_path(request.param))
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def small_app():
+    """App on the smallest dataset, for benchmarks that do not depend on size"""
+    app = _create_app(dataset_path(min(AUCTION_COUNTS)))
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,425 @@
+"""
+Live-bidding load generator.
+
+Starts the app in-process (on a temporary SQLite file) or targets a running
+server, connects N simulated Socket.IO clients that authenticate, join
+auctions and bid in a closed loop on a Zipf-distributed choice of auctions,
+then reports bids/sec and latency percentiles as JSON:
+
+  round_trip           place_bid sent -> bidder receives its own new_bid
+  accept_to_broadcast  server bid timestamp -> new_bid received, per recipient
+
+Countdowns are kept either the old way, polling get_auction_status for every
+joined auction each --poll-seconds (--countdown poll), or with a time_sync
+burst on connect plus auction_time pushes (--countdown sync, the default).
+Run both to see the status traffic and SQL the push model removes; with an
+in-process server the results include the server-side cost per event.
+
+Measured with 100 clients, 20 auctions, 30 s, --poll-seconds 5, on an
+in-process threading server with a SQLite file:
+
+  poll  63 get_auction_status/s, 3 SQL statements each (189/s), 951 ms mean
+        handler time under load; 21.9 bids/s, round trip p50 840 ms
+  sync  400 time_sync calls, all at connect, no SQL (0.29 ms each);
+        38.9 bids/s, round trip p50 629 ms
+
+    python benchmarks/load_bidding.py --clients 2000 --auctions 200 --seconds 60 \\
+        [--db file|<uri>] [--target http://host:5000 --secret KEY] \\
+        [--encoding json|msgpack] [--countdown poll|sync] [--output results.json]
+
+With --target the users and auctions must already exist (ids 1..N, see
+--first-user-id / --first-auction-id) and --secret must be the server's JWT key.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+import socketio
+
+from bid_policy import PolicyEngine
+from config import Config, TestingConfig, build_engine_options
+from time_sync import ClockSync
+from wire_codec import FIELD_CODES, decode_compact, epoch_millis
+
+SHORT_TO_LONG = {code: name for name, code in FIELD_CODES.items()}
+
+
+# --- distribution and statistics -------------------------------------------
+
+class ZipfSampler:
+    """Draws ranks 0..n-1 with P(k) proportional to 1 / (k + 1) ** s"""
+
+    def __init__(self, n: int, s: float = 1.1, rng: random.Random = None):
+        self.cumulative = list(accumulate(1.0 / (k + 1) ** s for k in range(n)))
+        self.rng = rng or random.Random()
+
+    def sample(self) -> int:
+        return bisect_left(self.cumulative, self.rng.random() * self.cumulative[-1])
+
+    def distinct(self, count: int) -> list:
+        count = min(count, len(self.cumulative))
+        chosen = []
+        while len(chosen) < count:
+            rank = self.sample()
+            if rank not in chosen:
+                chosen.append(rank)
+        return chosen
+
+
+def percentiles(samples, points=(50, 99, 99.9)) -> dict:
+    """Nearest-rank percentiles in milliseconds, plus count/min/max/mean"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    result = {
+        'count': len(ordered),
+        'min': round(ordered[0], 3),
+        'mean': round(sum(ordered) / len(ordered), 3),
+        'max': round(ordered[-1], 3),
+    }
+    for point in points:
+        index = max(int(-(-point * len(ordered) // 100)) - 1, 0)
+        result[f'p{point:g}'.replace('.', '')] = round(ordered[min(index, len(ordered) - 1)], 3)
+    return result
+
+
+# --- in-process server -------------------------------------------------------
+
+def database_uri(db_option: str) -> str:
+    if db_option == 'file':
+        fd, path = tempfile.mkstemp(suffix='.db', prefix='mzadd_load_')
+        os.close(fd)
+        return f'sqlite:///{path}'
+    return db_option
+
+
+def start_server(args):
+    """Create the app and websocket server in this process; returns (app, server, url)"""
+    from app import create_app
+    from websocket_server import create_websocket_server
+
+    uri = database_uri(args.db)
+
+    class LoadConfig(TestingConfig):
+        TESTING = False
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(uri)
+        SOCKETIO_ASYNC_MODE = 'threading'
+        SOCKETIO_CORS_ALLOWED_ORIGINS = '*'  # the simulated clients send the server's own origin
+
+    app = create_app(LoadConfig)
+    with app.app_context():
+        from models_enhanced import db
+        db.create_all()
+        seed(args)
+    server = create_websocket_server(app, app.config['JWT_SECRET_KEY'])
+    thread = threading.Thread(
+        target=server.socketio.run, args=(app,),
+        kwargs={'host': '127.0.0.1', 'port': args.port, 'allow_unsafe_werkzeug': True},
+        daemon=True
+    )
+    thread.start()
+    time.sleep(1.0)
+    return app, server, f'http://127.0.0.1:{args.port}'
+
+
+def seed(args):
+    """Bidders, one seller, and active auctions with predictable ids"""
+    from models_enhanced import db, User, UserRole, Item, ItemStatus, Auction, AuctionStatus
+
+    password_hash = '$2b$04$' + '.' * 53  # never used to log in; clients get JWTs
+    now = datetime.utcnow()
+    seller = User(username='load_seller', email='load_seller@example.com',
+                  password_hash=password_hash, role=UserRole.MERCHANT)
+    db.session.add(seller)
+    db.session.flush()
+    args.seller_id = seller.id
+    db.session.bulk_insert_mappings(User, [
+        {'username': f'load_user_{i}', 'email': f'load_user_{i}@example.com',
+         'password_hash': password_hash, 'role': UserRole.BIDDER, 'is_active': True}
+        for i in range(args.clients)
+    ])
+    db.session.bulk_insert_mappings(Item, [
+        {'name': f'Load item {i}', 'owner_id': seller.id, 'start_price': 10.0, 'status': ItemStatus.ACTIVE}
+        for i in range(args.auctions)
+    ])
+    db.session.flush()
+    item_ids = [item_id for (item_id,) in db.session.query(Item.id).order_by(Item.id)]
+    db.session.bulk_insert_mappings(Auction, [
+        {'item_id': item_id, 'current_price': 10.0,
+         'start_time': now, 'end_time': now + timedelta(seconds=args.seconds + 3600),
+         'status': AuctionStatus.ACTIVE, 'total_bids': 0}
+        for item_id in item_ids
+    ])
+    db.session.commit()
+    args.first_user_id = seller.id + 1
+    args.first_auction_id = db.session.query(db.func.min(Auction.id)).scalar()
+
+
+# --- simulated client ---------------------------------------------------------
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {'sent': 0, 'accepted': 0, 'rejected': 0, 'timeouts': 0,
+                         'broadcasts': 0, 'connect_failures': 0, 'auth_failures': 0,
+                         'status_requests': 0, 'status_replies': 0, 'time_syncs': 0, 'time_pushes': 0}
+        self.round_trip = []
+        self.accept_to_broadcast = []
+        self.clock_delay = []
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+
+def normalize(data):
+    """new_bid payload as a dict with long field names (JSON or compact frame)"""
+    if isinstance(data, (bytes, bytearray)):
+        data = {SHORT_TO_LONG.get(key, key): value for key, value in decode_compact(data).items()}
+        data['timestamp_ms'] = data.get('timestamp')
+    else:
+        timestamp = data.get('timestamp')
+        data['timestamp_ms'] = epoch_millis(datetime.fromisoformat(timestamp)) if timestamp else None
+    return data
+
+
+class BidderClient:
+    def __init__(self, index, args, url, token, auction_ids, policies, metrics, stop):
+        self.index = index
+        self.args = args
+        self.url = url
+        self.token = token
+        self.auction_ids = auction_ids
+        self.policies = policies
+        self.metrics = metrics
+        self.stop = stop
+        self.username = f'load_user_{index}'
+        self.rng = random.Random(args.seed + index)
+        self.prices = {}
+        self.pending = None  # (auction_id, amount, sent_at)
+        self.reply = threading.Event()
+        self.authenticated = threading.Event()
+        self.clock = ClockSync()
+        self.next_poll = time.monotonic() + self.rng.uniform(0, args.poll_seconds)
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('auth_success', lambda data: self.authenticated.set())
+        self.sio.on('auth_error', lambda data: self.authenticated.set())
+        self.sio.on('auction_joined', self.on_joined)
+        self.sio.on('new_bid', self.on_new_bid)
+        self.sio.on('bid_confirmation', self.on_reply)
+        self.sio.on('bid_error', self.on_error)
+        self.sio.on('auction_status', lambda data: self.metrics.count('status_replies'))
+        self.sio.on('auction_time', lambda data: self.metrics.count('time_pushes'))
+        self.sio.on('time_sync', self.on_time_sync)
+
+    def on_joined(self, data):
+        self.prices[data['auction_id']] = data['auction_data']['current_price']
+
+    def on_new_bid(self, data):
+        received = time.time()
+        data = normalize(data)
+        self.metrics.count('broadcasts')
+        auction_id, amount = data['auction_id'], data['amount']
+        self.prices[auction_id] = max(self.prices.get(auction_id, 0), amount)
+        if data['timestamp_ms'] is not None:
+            with self.metrics.lock:
+                self.metrics.accept_to_broadcast.append(received * 1000 - data['timestamp_ms'])
+        pending = self.pending
+        if pending and pending[0] == auction_id and data['bidder_name'] == self.username:
+            with self.metrics.lock:
+                self.metrics.round_trip.append((time.perf_counter() - pending[2]) * 1000)
+
+    def on_time_sync(self, data):
+        _, delay = self.clock.add(data, time.time() * 1000)
+        with self.metrics.lock:
+            self.metrics.clock_delay.append(delay)
+
+    def keep_countdown(self):
+        """What the bidding UI does to keep its timers right, in the chosen mode"""
+        if self.args.countdown != 'poll' or time.monotonic() < self.next_poll:
+            return
+        self.next_poll += self.args.poll_seconds
+        for auction_id in self.auction_ids:
+            self.sio.emit('get_auction_status', {'auction_id': auction_id})
+        self.metrics.count('status_requests', len(self.auction_ids))
+
+    def on_reply(self, data):
+        self.metrics.count('accepted')
+        self.reply.set()
+
+    def on_error(self, data):
+        self.metrics.count('rejected')
+        self.reply.set()
+
+    def connect(self):
+        try:
+            self.sio.connect(self.url, transports=[self.args.transport])
+            self.sio.emit('authenticate', {'token': self.token, 'encoding': self.args.encoding})
+            if not self.authenticated.wait(10):
+                self.metrics.count('auth_failures')
+                return False
+            for auction_id in self.auction_ids:
+                self.sio.emit('join_auction', {'auction_id': auction_id})
+            if self.args.countdown == 'sync':
+                for _ in range(self.args.sync_samples):
+                    self.sio.emit('time_sync', {'t0': time.time() * 1000})
+                self.metrics.count('time_syncs', self.args.sync_samples)
+            return True
+        except Exception:
+            self.metrics.count('connect_failures')
+            return False
+
+    def run(self):
+        think = self.args.think_ms / 1000
+        while not self.stop.is_set():
+            self.keep_countdown()
+            auction_id = self.auction_ids[self.rng.randrange(len(self.auction_ids))]
+            price = self.prices.get(auction_id, 10.0)
+            amount = round(self.policies.min_next_bid(auction_id, price)
+                           + self.rng.randint(0, 2) * self.policies.increment_for(auction_id, price), 2)
+            self.reply.clear()
+            self.pending = (auction_id, amount, time.perf_counter())
+            self.sio.emit('place_bid', {'auction_id': auction_id, 'amount': amount})
+            self.metrics.count('sent')
+            if not self.reply.wait(self.args.timeout):
+                self.metrics.count('timeouts')
+            self.pending = None
+            if think:
+                self.stop.wait(self.rng.expovariate(1 / think))
+
+    def close(self):
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+
+# --- driver ----------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--auctions', type=int, default=100)
+    parser.add_argument('--auctions-per-client', type=int, default=3)
+    parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent of auction popularity')
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--think-ms', type=float, default=500, help='mean pause between bids per client')
+    parser.add_argument('--timeout', type=float, default=10, help='seconds to wait for a bid reply')
+    parser.add_argument('--ramp-workers', type=int, default=50, help='parallel connects while ramping up')
+    # not ':memory:': one connection shared by every server thread is not safe
+    parser.add_argument('--db', default='file', help="'file' (a temporary SQLite file) or a database URI")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--target', help='URL of a running server instead of an in-process one')
+    parser.add_argument('--secret', help='JWT secret of the target server')
+    parser.add_argument('--first-user-id', type=int, default=1)
+    parser.add_argument('--first-auction-id', type=int, default=1)
+    parser.add_argument('--encoding', choices=['json', 'msgpack'], default='json')
+    parser.add_argument('--transport', choices=['websocket', 'polling'], default='websocket')
+    parser.add_argument('--countdown', choices=['poll', 'sync'], default='sync',
+                        help='poll get_auction_status, or time_sync + auction_time pushes')
+    parser.add_argument('--poll-seconds', type=float, default=5, help='status poll interval with --countdown poll')
+    parser.add_argument('--sync-samples', type=int, default=4, help='time_sync exchanges per client on connect')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON results to this file')
+    args = parser.parse_args()
+
+    if args.target:
+        if not args.secret:
+            parser.error('--secret is required with --target')
+        url, secret = args.target, args.secret
+        config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    else:
+        app, _, url = start_server(args)
+        secret, config = app.config['JWT_SECRET_KEY'], app.config
+
+    # bid just above the minimum the server will accept
+    policies = PolicyEngine.from_config(config)
+    sampler = ZipfSampler(args.auctions, args.zipf, random.Random(args.seed))
+    metrics = Metrics()
+    stop = threading.Event()
+    clients = [
+        BidderClient(
+            i, args, url,
+            jwt.encode({'user_id': args.first_user_id + i}, secret, algorithm='HS256'),
+            [args.first_auction_id + rank for rank in sampler.distinct(args.auctions_per_client)],
+            policies, metrics, stop
+        )
+        for i in range(args.clients)
+    ]
+
+    ramp_started = time.perf_counter()
+    with ThreadPoolExecutor(args.ramp_workers) as pool:
+        connected = [client for client, ok in zip(clients, pool.map(BidderClient.connect, clients)) if ok]
+    ramp_seconds = time.perf_counter() - ramp_started
+
+    threads = [threading.Thread(target=client.run, daemon=True) for client in connected]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    stop.wait(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join(args.timeout + 1)
+    elapsed = time.perf_counter() - started
+    # each close waits for the server's close frame; do them side by side
+    with ThreadPoolExecutor(args.ramp_workers) as pool:
+        list(pool.map(BidderClient.close, connected))
+
+    counters = dict(metrics.counters)
+    countdown = {
+        'mode': args.countdown,
+        'status_requests_per_sec': round(counters['status_requests'] / elapsed, 2) if elapsed else 0,
+        'time_syncs': counters['time_syncs'],
+        'time_pushes': counters['time_pushes'],
+        'clock_delay_ms': percentiles(metrics.clock_delay),
+    }
+    if not args.target:
+        # server-side latency and SQL of the events that keep countdowns right
+        from instrumentation import metrics as server_metrics
+        snapshot = server_metrics.snapshot()
+        countdown['server'] = {
+            name: snapshot[name] for name in ('socket get_auction_status', 'socket time_sync') if name in snapshot
+        }
+        status = snapshot.get('socket get_auction_status')
+        if status and elapsed:
+            countdown['status_sql_per_sec'] = round(status['count'] * status.get('sql_per_call', 0) / elapsed, 2)
+    results = {
+        'benchmark': 'live_bidding',
+        'started_at': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'params': {key: value for key, value in vars(args).items() if key not in ('secret', 'output')},
+        'clients_connected': len(connected),
+        'ramp_seconds': round(ramp_seconds, 3),
+        'duration_seconds': round(elapsed, 3),
+        'counters': counters,
+        'bids_per_sec': round(counters['accepted'] / elapsed, 2) if elapsed else 0,
+        'attempts_per_sec': round(counters['sent'] / elapsed, 2) if elapsed else 0,
+        'latency_ms': {
+            'round_trip': percentiles(metrics.round_trip),
+            'accept_to_broadcast': percentiles(metrics.accept_to_broadcast),
+        },
+        'countdown': countdown,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+"""
+Bid Journal for Mzadd Platform
+Local append-only journal of the bids, extensions and closes one server
+process accepted. Each process (one per SERVER_PROCESSES port) writes its
+own directory, JOURNAL_DIR/<bind>, which its replacement on the same port
+recovers. The database stays the source of truth for auction state: on
+startup the server recovers the journal (repairing a torn tail) and
+appends the committed bids it had not fsynced, so the log is complete.
+
+Records are length-prefixed binary (length, crc32, payload) appended to
+numbered segment files and fsynced in batches. A compaction writes the
+live state to a snapshot and starts a new segment; recovery loads the
+snapshot and replays the segments after it through mmap, stopping at the
+first torn or corrupt record (which is truncated away).
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from handoff import listener_key, state_directory
+
+logger = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct('<II')  # payload length, crc32(payload)
+BID = struct.Struct('<Bqqqd')  # type, auction_id, bid_id, bidder_id, amount
+EXTEND = struct.Struct('<BqdI')  # type, auction_id, end_time, extensions so far
+CLOSE = struct.Struct('<Bq')  # type, auction_id
+TYPE_BID, TYPE_EXTEND, TYPE_CLOSE = 1, 2, 3
+
+SNAPSHOT_HEADER = struct.Struct('<4sHQQI')  # magic, version, generation, last_bid_id, count
+SNAPSHOT_ENTRY = struct.Struct('<qdqqIdI')  # auction_id, price, leader_id, bid_id, total_bids, end_time, extensions
+SNAPSHOT_MAGIC = b'MZBJ'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FILE = 'snapshot.bin'
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_seconds(value: Optional[datetime]) -> float:
+    return (value - _EPOCH).total_seconds() if value is not None else 0.0
+
+
+def _to_datetime(seconds: float) -> Optional[datetime]:
+    return _EPOCH + timedelta(seconds=seconds) if seconds else None
+
+
+class LiveAuction:
+    """Bid-derived state of one open auction"""
+
+    __slots__ = ('price', 'leader_id', 'bid_id', 'total_bids', 'end_time', 'extensions')
+
+    def __init__(self, price=0.0, leader_id=0, bid_id=0, total_bids=0, end_time=0.0, extensions=0):
+        self.price = price
+        self.leader_id = leader_id
+        self.bid_id = bid_id
+        self.total_bids = total_bids
+        self.end_time = end_time  # epoch seconds, 0 = not journaled yet
+        self.extensions = extensions
+
+    def to_dict(self) -> Dict:
+        return {
+            'current_price': self.price,
+            'leader_id': self.leader_id or None,
+            'winning_bid_id': self.bid_id or None,
+            'total_bids': self.total_bids,
+            'end_time': _to_datetime(self.end_time),
+            'extensions': self.extensions,
+        }
+
+
+class LiveState:
+    """auction_id -> LiveAuction, rebuilt by applying journal payloads in order"""
+
+    def __init__(self):
+        self.auctions: Dict[int, LiveAuction] = {}
+        self.last_bid_id = 0
+
+    def apply(self, payload) -> None:
+        kind = payload[0]
+        if kind == TYPE_BID:
+            _, auction_id, bid_id, bidder_id, amount = BID.unpack(payload)
+            self.apply_bid(auction_id, bid_id, bidder_id, amount)
+        elif kind == TYPE_EXTEND:
+            _, auction_id, end_time, extensions = EXTEND.unpack(payload)
+            auction = self._auction(auction_id)
+            auction.end_time = end_time
+            auction.extensions = extensions
+        elif kind == TYPE_CLOSE:
+            self.auctions.pop(CLOSE.unpack(payload)[1], None)
+
+    def apply_bid(self, auction_id: int, bid_id: int, bidder_id: int, amount: float) -> None:
+        auction = self._auction(auction_id)
+        auction.total_bids += 1
+        if bid_id > auction.bid_id:
+            auction.price = amount
+            auction.leader_id = bidder_id
+            auction.bid_id = bid_id
+        if bid_id > self.last_bid_id:
+            self.last_bid_id = bid_id
+
+    def _auction(self, auction_id: int) -> LiveAuction:
+        auction = self.auctions.get(auction_id)
+        if auction is None:
+            auction = self.auctions[auction_id] = LiveAuction()
+        return auction
+
+    def get(self, auction_id: int) -> Optional[LiveAuction]:
+        return self.auctions.get(auction_id)
+
+    def __len__(self):
+        return len(self.auctions)
+
+
+class BidJournal:
+    """
+    Appends are buffered and written + fsynced once `fsync_batch` records
+    are pending or `fsync_interval` seconds have passed (by the flusher
+    thread); sync=True writes through immediately. Every `snapshot_every`
+    records the flusher compacts the journal into a snapshot.
+    """
+
+    def __init__(self, directory: str, fsync_interval: float = 0.05, fsync_batch: int = 512,
+                 snapshot_every: int = 100_000):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self.snapshot_every = snapshot_every
+        self.state = LiveState()
+        self.generation = 0
+        self.records_since_snapshot = 0
+        self._buffer = bytearray()
+        self._pending = 0
+        self._file = None
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    # -- writing --------------------------------------------------------
+
+    def record_bids(self, auction_id: int, bids: Iterable[Tuple[int, int, float]], sync: bool = False):
+        """Accepted bids of one auction as (bid_id, bidder_id, amount), in id order"""
+        payloads = [BID.pack(TYPE_BID, auction_id, bid_id, bidder_id, amount) for bid_id, bidder_id, amount in bids]
+        self._append(payloads, sync)
+
+    def record_extension(self, auction_id: int, end_time: datetime, extensions: int, sync: bool = True):
+        self._append([EXTEND.pack(TYPE_EXTEND, auction_id, _to_seconds(end_time), extensions)], sync)
+
+    def record_close(self, auction_id: int, sync: bool = True):
+        self._append([CLOSE.pack(TYPE_CLOSE, auction_id)], sync)
+
+    def _append(self, payloads, sync: bool):
+        with self._lock:
+            buffer = self._buffer
+            for payload in payloads:
+                buffer += RECORD_HEADER.pack(len(payload), zlib.crc32(payload))
+                buffer += payload
+                self.state.apply(payload)
+            self._pending += len(payloads)
+            self.records_since_snapshot += len(payloads)
+            if sync or self._pending >= self.fsync_batch:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        if self._file is None:
+            self._file = open(self._segment_path(self.generation), 'ab', buffering=0)
+        self._file.write(self._buffer)
+        os.fsync(self._file.fileno())
+        self._buffer = bytearray()
+        self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    # -- compaction -----------------------------------------------------
+
+    def compact(self):
+        """Snapshot the live state and drop the segments it covers"""
+        with self._compact_lock:
+            with self._lock:
+                self._flush_locked()
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self.generation += 1
+                generation = self.generation
+                last_bid_id = self.state.last_bid_id
+                entries = [
+                    SNAPSHOT_ENTRY.pack(auction_id, a.price, a.leader_id, a.bid_id, a.total_bids,
+                                        a.end_time, a.extensions)
+                    for auction_id, a in self.state.auctions.items()
+                ]
+                self.records_since_snapshot = 0
+            body = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, generation, last_bid_id,
+                                        len(entries)) + b''.join(entries)
+            path = os.path.join(self.directory, SNAPSHOT_FILE)
+            with open(path + '.tmp', 'wb') as snapshot:
+                snapshot.write(body)
+                snapshot.write(struct.pack('<I', zlib.crc32(body)))
+                snapshot.flush()
+                os.fsync(snapshot.fileno())
+            os.replace(path + '.tmp', path)
+            self._fsync_directory()
+            for old in self._segments():
+                if old < generation:
+                    os.remove(self._segment_path(old))
+
+    # -- recovery -------------------------------------------------------
+
+    def recover(self) -> LiveState:
+        """Rebuild the live state from the snapshot plus the segments after it"""
+        with self._compact_lock, self._lock:
+            self.state = LiveState()
+            self.generation = self._load_snapshot()
+            replayed = 0
+            segments = [g for g in self._segments() if g >= self.generation]
+            for generation in segments:
+                replayed += self._replay(generation, truncate=generation == segments[-1])
+            if segments:
+                self.generation = segments[-1]
+            self.records_since_snapshot = replayed
+        return self.state
+
+    def _load_snapshot(self) -> int:
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'rb') as snapshot:
+            data = snapshot.read()
+        body, (crc,) = data[:-4], struct.unpack('<I', data[-4:])
+        if zlib.crc32(body) != crc:
+            raise ValueError(f'Corrupt journal snapshot {path}')
+        magic, version, generation, last_bid_id, count = SNAPSHOT_HEADER.unpack_from(body)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f'Unsupported journal snapshot {path}')
+        auctions = self.state.auctions
+        for auction_id, *fields in SNAPSHOT_ENTRY.iter_unpack(body[SNAPSHOT_HEADER.size:]):
+            auctions[auction_id] = LiveAuction(*fields)
+        self.state.last_bid_id = last_bid_id
+        return generation
+
+    def _replay(self, generation: int, truncate: bool) -> int:
+        path = self._segment_path(generation)
+        size = os.path.getsize(path)
+        if not size:
+            return 0
+        state = self.state
+        apply, apply_bid = state.apply, state.apply_bid
+        unpack_header, unpack_bid = RECORD_HEADER.unpack_from, BID.unpack_from
+        header_size, bid_size = RECORD_HEADER.size, BID.size
+        crc32 = zlib.crc32
+        offset = count = 0
+        with open(path, 'rb') as segment, mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            try:
+                while offset + header_size <= size:
+                    length, crc = unpack_header(data, offset)
+                    start = offset + header_size
+                    end = start + length
+                    if end > size or crc32(view[start:end]) != crc:
+                        break
+                    if length == bid_size and data[start] == TYPE_BID:  # the common case, without a copy
+                        apply_bid(*unpack_bid(data, start)[1:])
+                    else:
+                        apply(data[start:end])
+                    offset = end
+                    count += 1
+            finally:
+                view.release()
+        if offset < size:
+            logger.warning(f'Bid journal {path}: dropping {size - offset} bytes after a torn or corrupt record')
+            if truncate:
+                with open(path, 'r+b') as segment:
+                    segment.truncate(offset)
+                    os.fsync(segment.fileno())
+        return count
+
+    # -- files and background flushing -------------------------------------
+
+    def _segment_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f'segment-{generation:08d}.log')
+
+    def _segments(self):
+        return sorted(
+            int(name[8:16]) for name in os.listdir(self.directory)
+            if name.startswith('segment-') and name.endswith('.log')
+        )
+
+    def _fsync_directory(self):
+        descriptor = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def start(self, spawn=None):
+        """Run the flusher in a thread (or with `spawn`, e.g. socketio.start_background_task)"""
+        if spawn is not None:
+            spawn(self._run_flusher)
+        else:
+            self._flusher = threading.Thread(target=self._run_flusher, name='bid-journal', daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                self.flush()
+                if self.snapshot_every and self.records_since_snapshot >= self.snapshot_every:
+                    self.compact()
+            except Exception as e:
+                logger.error(f'Bid journal flush failed: {str(e)}')
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def open_journal(config, root_path: str = '') -> Optional[BidJournal]:
+    """This process's journal under JOURNAL_DIR, or None when journaling is off"""
+    directory = state_directory(config, 'JOURNAL_DIR', root_path)
+    if not directory:
+        return None
+    return BidJournal(
+        os.path.join(directory, listener_key()),
+        fsync_interval=config.get('JOURNAL_FSYNC_INTERVAL', 0.05),
+        fsync_batch=config.get('JOURNAL_FSYNC_BATCH', 512),
+        snapshot_every=config.get('JOURNAL_SNAPSHOT_EVERY', 100_000),
+    )
@@ -0,0 +1,129 @@
+"""
+Bid Policy Engine for Mzadd Platform
+Increment ladders and anti-sniping extension rules, compiled once from
+configuration (defaults, per category, per auction) so the bid hot path only
+does dictionary lookups and a binary search over price bands
+"""
+
+from bisect import bisect_right
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class IncrementLadder:
+    """Price bands [(from_price, increment), ...]; the band containing a price sets its increment"""
+
+    def __init__(self, bands: Iterable[Tuple[float, float]]):
+        bands = sorted((float(start), float(increment)) for start, increment in bands)
+        if not bands:
+            raise ValueError('An increment ladder needs at least one band')
+        if any(increment <= 0 for _, increment in bands):
+            raise ValueError('Bid increments must be positive')
+        self.bands = bands
+        self._starts = [start for start, _ in bands]
+        self._increments = [increment for _, increment in bands]
+
+    def increment_for(self, price: float) -> float:
+        position = bisect_right(self._starts, price) - 1
+        return self._increments[max(position, 0)]
+
+
+class ExtensionRule:
+    """
+    Anti-sniping: a bid placed within `window` seconds of the end pushes the
+    end back by `extension` seconds, at most `max_extensions` times
+    (None = unlimited).
+    """
+
+    def __init__(self, window: int, extension: int, max_extensions: Optional[int] = None):
+        self.window = window
+        self.extension = extension
+        self.max_extensions = max_extensions
+
+    def extension_for(self, seconds_remaining: float, extensions_so_far: int) -> int:
+        if seconds_remaining >= self.window or self.extension <= 0:
+            return 0
+        if self.max_extensions is not None and extensions_so_far >= self.max_extensions:
+            return 0
+        return self.extension
+
+
+class BidPolicy:
+    """The compiled rules that apply to one auction"""
+
+    def __init__(self, ladder: IncrementLadder, extension: ExtensionRule):
+        self.ladder = ladder
+        self.extension = extension
+
+    def min_next_bid(self, current_price: float) -> float:
+        return current_price + self.ladder.increment_for(current_price)
+
+
+def compile_policy(rules: Dict, base: Optional[BidPolicy] = None) -> BidPolicy:
+    """
+    Build a policy from a rules dict; keys not given are inherited from `base`:
+        {'increments': [(0, 1), (100, 5), (1000, 25)],
+         'extension_window': 300, 'extension_time': 300, 'max_extensions': 10}
+    """
+    ladder = IncrementLadder(rules['increments']) if 'increments' in rules else base.ladder
+    base_extension = base.extension if base else ExtensionRule(0, 0)
+    extension = ExtensionRule(
+        rules.get('extension_window', base_extension.window),
+        rules.get('extension_time', base_extension.extension),
+        rules.get('max_extensions', base_extension.max_extensions),
+    )
+    return BidPolicy(ladder, extension)
+
+
+class PolicyEngine:
+    """
+    Resolves the policy of an auction: per-auction rules, then its category's,
+    then the default. The resolved policy is remembered per auction, so
+    callers that only know the auction id (proxy bidding) get the same rules.
+    Extension counts live on the auction row (Auction.extension_count) and
+    are passed in, so the cap holds across processes and restarts.
+    """
+
+    def __init__(self, default: BidPolicy, categories: Optional[Dict[str, BidPolicy]] = None):
+        self.default = default
+        self.categories = dict(categories or {})
+        self._auctions: Dict[int, BidPolicy] = {}
+
+    @classmethod
+    def from_config(cls, config) -> 'PolicyEngine':
+        default = compile_policy({
+            'increments': config.get('BID_INCREMENT_LADDER') or [(0, config.get('MIN_BID_INCREMENT', 1.0))],
+            'extension_window': config.get('AUCTION_EXTENSION_WINDOW', 300),
+            'extension_time': config.get('AUCTION_EXTENSION_TIME', 300),
+            'max_extensions': config.get('AUCTION_MAX_EXTENSIONS'),
+        })
+        categories = {
+            category: compile_policy(rules, default)
+            for category, rules in (config.get('BID_POLICY_CATEGORIES') or {}).items()
+        }
+        return cls(default, categories)
+
+    def set_auction_rules(self, auction_id: int, rules: Dict, category: Optional[str] = None):
+        """Override the rules of one auction on top of its category (or the default)"""
+        self._auctions[auction_id] = compile_policy(rules, self.categories.get(category, self.default))
+
+    def policy_for(self, auction_id: int, category: Optional[str] = None) -> BidPolicy:
+        policy = self._auctions.get(auction_id)
+        if policy is None:
+            policy = self.categories.get(category, self.default)
+            if category is not None:
+                self._auctions[auction_id] = policy  # later id-only lookups find it
+        return policy
+
+    def min_next_bid(self, auction_id: int, current_price: float, category: Optional[str] = None) -> float:
+        return self.policy_for(auction_id, category).min_next_bid(current_price)
+
+    def increment_for(self, auction_id: int, price: float) -> float:
+        return self.policy_for(auction_id).ladder.increment_for(price)
+
+    def extension_for(self, auction_id: int, seconds_remaining: float, extensions_so_far: int = 0,
+                      category: Optional[str] = None) -> int:
+        """Seconds to extend the auction by after a bid (0 = none)"""
+        return self.policy_for(auction_id, category).extension.extension_for(seconds_remaining, extensions_so_far)
+
+    def clear_auction(self, auction_id: int):
+        self._auctions.pop(auction_id, None)
@@ -5,7 +5,8 @@ Handles revenue management, commission calculations, and profit distribution
 
 from datetime import datetime, timedelta
 from decimal import Decimal, ROUND_HALF_UP
-from sqlalchemy import func
+from sqlalchemy import func, update
+from extensions import read_only
 from models_enhanced import db, User, Auction, Bid, Item, UserRole, AuctionStatus
 import logging
 
@@ -47,6 +48,16 @@ class RevenueManager:
             
             merchant = auction.item.owner
             final_price = auction.current_price
+            processed_at = datetime.utcnow()
+            
+            # Claim the settlement; only one attempt ever gets rowcount 1
+            claimed = db.session.execute(
+                update(Auction).where(Auction.id == auction_id, Auction.settled_at.is_(None))
+                .values(settled_at=processed_at).execution_options(synchronize_session=False)
+            ).rowcount
+            if not claimed:
+                db.session.rollback()
+                return {'success': True, 'already_settled': True}
             
             # Calculate commission
             commission = self.calculate_commission(final_price, merchant.commission_rate)
@@ -54,8 +65,13 @@ class RevenueManager:
             # Calculate merchant earnings (final price - commission)
             merchant_earnings = final_price - commission
             
-            # Update merchant total earnings
-            merchant.total_earnings += merchant_earnings
+            # Update merchant total earnings (in SQL: other auctions of the
+            # same merchant may settle concurrently)
+            db.session.execute(
+                update(User).where(User.id == merchant.id)
+                .values(total_earnings=func.coalesce(User.total_earnings, 0) + merchant_earnings)
+                .execution_options(synchronize_session=False)
+            )
             
             # Create transaction record
             transaction = {
@@ -64,7 +80,7 @@ class RevenueManager:
                 'final_price': final_price,
                 'commission': commission,
                 'merchant_earnings': merchant_earnings,
-                'processed_at': datetime.utcnow()
+                'processed_at': processed_at
             }
             
             # Log the transaction
@@ -141,6 +157,7 @@ class RevenueManager:
 class AnalyticsManager:
     """Manages analytics and reporting for business intelligence"""
     
+    @read_only
     def get_revenue_analytics(self, start_date=None, end_date=None):
         """Get comprehensive revenue analytics"""
         try:
@@ -243,6 +260,7 @@ class AnalyticsManager:
             logger.error(f"Error generating revenue analytics: {str(e)}")
             return {'success': False, 'message': str(e)}
     
+    @read_only
     def get_user_analytics(self):
         """Get user growth and engagement analytics"""
         try:
@@ -286,6 +304,7 @@ class AnalyticsManager:
 class ProfitOptimizer:
     """Optimizes profit through dynamic pricing and recommendations"""
     
+    @read_only
     def suggest_optimal_commission_rate(self, merchant_id):
         """Suggest optimal commission rate based on merchant performance"""
         try:
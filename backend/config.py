@@ -5,6 +5,44 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def build_engine_options(database_uri):
+    """
+    Engine options tuned per database backend.
+
+    SQLite gets no pre-ping/recycle (the file is local, there is nothing to
+    go stale) and a busy timeout instead of failing on a locked database;
+    the journal/synchronous/mmap pragmas are applied per connection in
+    extensions.configure_engines. Postgres gets a sized LIFO pool and a
+    larger compiled statement cache.
+    """
+    if database_uri.startswith('sqlite'):
+        if ':memory:' in database_uri or database_uri in ('sqlite://', 'sqlite:///'):
+            return {}  # Flask-SQLAlchemy already uses a StaticPool here
+        return {
+            'pool_size': int(os.environ.get('SQLITE_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('SQLITE_MAX_OVERFLOW', 10)),
+            'connect_args': {
+                'check_same_thread': False,
+                'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000,
+            },
+        }
+
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'False').lower() == 'true',
+        'pool_use_lifo': True,
+        'query_cache_size': int(os.environ.get('DB_QUERY_CACHE_SIZE', 1200)),
+    }
+    if database_uri.startswith('postgresql+psycopg://'):
+        # psycopg 3: server-side prepared statements after N executions
+        options['connect_args'] = {'prepare_threshold': int(os.environ.get('DB_PREPARE_THRESHOLD', 5))}
+    elif database_uri.startswith('postgresql'):
+        options['executemany_mode'] = 'values_plus_batch'
+    return options
+
 class Config:
     """Base configuration class with security-first approach."""
     
@@ -15,11 +53,19 @@ class Config:
     # Database Configuration
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-        'connect_args': {'check_same_thread': False} if 'sqlite' in os.environ.get('DATABASE_URL', 'sqlite') else {}
-    }
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
+    # Optional read replica for reporting/listing queries. For SQLite a
+    # separate read-only connection pool on the same file is used instead.
+    SQLALCHEMY_READ_DATABASE_URI = os.environ.get('READ_DATABASE_URL')
+    
+    # SQLite tuning (ignored for other backends)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # 256MB
+    SQLITE_READ_POOL_SIZE = int(os.environ.get('SQLITE_READ_POOL_SIZE', 10))
+    # After a REST write the client reads from the primary for this long (replica lag); 0 = off
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
     
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or secrets.token_urlsafe(32)
@@ -44,6 +90,17 @@ class Config:
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    MEDIA_THUMBNAIL_SIZES = (160, 480, 1024)  # longest side in pixels, WebP
+    MEDIA_WEBP_QUALITY = int(os.environ.get('MEDIA_WEBP_QUALITY', 80))
+    MEDIA_WORKERS = int(os.environ.get('MEDIA_WORKERS', 0)) or None  # thumbnail processes (None = CPUs)
+    MEDIA_CACHE_MAX_AGE = 31536000  # seconds; media URLs are content-addressed
+    
+    # HTTP caching and compression (see http_cache.py)
+    HTTP_COMPRESSION_ENABLED = os.environ.get('HTTP_COMPRESSION_ENABLED', 'True').lower() == 'true'
+    HTTP_COMPRESSION_MIN_SIZE = int(os.environ.get('HTTP_COMPRESSION_MIN_SIZE', 1024))  # bytes
+    HTTP_GZIP_LEVEL = int(os.environ.get('HTTP_GZIP_LEVEL', 6))
+    HTTP_BROTLI_QUALITY = int(os.environ.get('HTTP_BROTLI_QUALITY', 5))
+    HTTP_RESPONSE_CACHE_BYTES = int(os.environ.get('HTTP_RESPONSE_CACHE_BYTES', 64 * 1024 * 1024))
     
     # Email Configuration
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
@@ -52,6 +109,38 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@bidflow.com')
+    MAIL_TIMEOUT = int(os.environ.get('MAIL_TIMEOUT', 30))  # seconds; sends run on the job queue
+    
+    # Background Jobs (see job_queue.py; run workers with `flask jobs-worker`)
+    JOB_QUEUE_PATH = os.environ.get('JOB_QUEUE_PATH', 'instance/jobs.db')  # SQLite file or 'memory'
+    JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES', 2))
+    JOB_BATCH_SIZE = int(os.environ.get('JOB_BATCH_SIZE', 10))  # jobs claimed per dequeue
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 0.5))  # seconds when idle
+    JOB_BACKOFF_BASE = float(os.environ.get('JOB_BACKOFF_BASE', 2.0))  # first retry delay, doubles per attempt
+    JOB_BACKOFF_MAX = float(os.environ.get('JOB_BACKOFF_MAX', 600.0))
+    JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 300.0))  # running longer = worker died
+    
+    # Idempotent bids (see idempotency.py): resends of a client_bid_id replay the first outcome
+    BID_DEDUPE_TTL = float(os.environ.get('BID_DEDUPE_TTL', 600))  # seconds a client_bid_id is remembered
+    BID_DEDUPE_MAX_ENTRIES = int(os.environ.get('BID_DEDUPE_MAX_ENTRIES', 100000))  # oldest evicted first
+    
+    # Bid journal (see bid_journal.py): one subdirectory per listening address, relative to the
+    # app root; empty disables it
+    JOURNAL_DIR = os.environ.get('JOURNAL_DIR', 'instance/journal')
+    JOURNAL_FSYNC_INTERVAL = float(os.environ.get('JOURNAL_FSYNC_INTERVAL', 0.05))  # seconds between batched fsyncs
+    JOURNAL_FSYNC_BATCH = int(os.environ.get('JOURNAL_FSYNC_BATCH', 512))  # pending records that force an fsync
+    JOURNAL_SNAPSHOT_EVERY = int(os.environ.get('JOURNAL_SNAPSHOT_EVERY', 100000))  # records between snapshots
+    
+    # Drain and hot handoff on SIGTERM (see handoff.py)
+    HANDOFF_DIR = os.environ.get('HANDOFF_DIR', 'instance/handoff')  # sessions + sequences for the next process
+    RESUME_TOKEN_TTL = int(os.environ.get('RESUME_TOKEN_TTL', 300))  # seconds a session stays resumable
+    DRAIN_TIMEOUT = float(os.environ.get('DRAIN_TIMEOUT', 10))  # seconds to wait for in-flight bids
+    DRAIN_RECONNECT_SPREAD = int(os.environ.get('DRAIN_RECONNECT_SPREAD', 5))  # seconds clients spread reconnects over
+    
+    # Slow-consumer backpressure for auction broadcasts (see outbound.py)
+    OUTBOUND_WATERMARK = int(os.environ.get('OUTBOUND_WATERMARK', 32))  # transport backlog (packets) that marks a client as behind
+    OUTBOUND_MAX_DEPTH = int(os.environ.get('OUTBOUND_MAX_DEPTH', 256))  # queued frames before disconnect + resync
+    OUTBOUND_SCAN_INTERVAL = float(os.environ.get('OUTBOUND_SCAN_INTERVAL', 0.1))  # seconds between backlog scans / pumps
     
     # Admin Configuration
     ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@bidflow.com')
@@ -65,11 +154,46 @@ class Config:
     # WebSocket Configuration
     SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
     SOCKETIO_CORS_ALLOWED_ORIGINS = CORS_ORIGINS
+    # Required when more than one server process is running, so that room
+    # broadcasts reach clients connected to the other processes.
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')  # e.g. redis://redis:6379/0
+    # Event sequences for resync (auction_events.py): required with
+    # SERVER_PROCESSES > 1 so all processes number events from one counter
+    EVENT_LOG_REDIS_URL = os.environ.get('EVENT_LOG_REDIS_URL')  # e.g. redis://redis:6379/1
+    SOCKETIO_PING_INTERVAL = int(os.environ.get('SOCKETIO_PING_INTERVAL', 25))
+    SOCKETIO_PING_TIMEOUT = int(os.environ.get('SOCKETIO_PING_TIMEOUT', 20))
+    SOCKETIO_LOGGER = os.environ.get('SOCKETIO_LOGGER', 'False').lower() == 'true'
+    SOCKETIO_ENGINEIO_LOGGER = os.environ.get('SOCKETIO_ENGINEIO_LOGGER', 'False').lower() == 'true'
+    
+    # JSON for responses and Socket.IO packets: 'orjson' (serialization.py) or 'stdlib'
+    JSON_SERIALIZER = os.environ.get('JSON_SERIALIZER', 'orjson')
+    
+    # Instrumentation (route / socket event timing, see instrumentation.py)
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', 'True').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    # N+1 guard (query_guard.py): 'off', 'warn' or 'raise'
+    QUERY_GUARD_MODE = os.environ.get('QUERY_GUARD_MODE', 'off')
+    QUERY_BUDGET = int(os.environ.get('QUERY_BUDGET', 30))  # statements per request / socket event
+    QUERY_REPEAT_LIMIT = int(os.environ.get('QUERY_REPEAT_LIMIT', 5))  # same statement shape per scope
+    
+    # Serving Configuration (see gunicorn.conf.py and serve.py)
+    SERVER_PROCESSES = int(os.environ.get('SERVER_PROCESSES', 1))
+    SERVER_BASE_PORT = int(os.environ.get('SERVER_BASE_PORT', 5000))
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 100))  # threading mode only
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))
     
     # Business Logic Configuration
     AUCTION_EXTENSION_TIME = 300  # 5 minutes in seconds
+    AUCTION_EXTENSION_WINDOW = 300  # bids this close to the end extend the auction
+    AUCTION_MAX_EXTENSIONS = None  # cap on anti-sniping extensions per auction (None = unlimited)
     MIN_BID_INCREMENT = 1.0  # Minimum bid increment
+    # Tiered increments as (from_price, increment); empty = MIN_BID_INCREMENT everywhere
+    BID_INCREMENT_LADDER = [(0, 1.0), (100, 5.0), (1000, 25.0), (10000, 100.0)]
+    # Per-category overrides of the keys accepted by bid_policy.compile_policy
+    BID_POLICY_CATEGORIES = {}
     COMMISSION_RATE = 0.05  # 5% commission rate
+    ENDING_SOON_WINDOW = int(os.environ.get('ENDING_SOON_WINDOW', 600))  # seconds before end_time
+    AUCTION_SWEEP_INTERVAL = int(os.environ.get('AUCTION_SWEEP_INTERVAL', 30))  # seconds
     
     @staticmethod
     def init_app(app):
@@ -89,14 +213,22 @@ class DevelopmentConfig(Config):
     FLASK_ENV = 'development'
     SQLALCHEMY_ECHO = True
     RATELIMIT_ENABLED = False  # Disable rate limiting in development
+    QUERY_GUARD_MODE = os.environ.get('QUERY_GUARD_MODE', 'warn')
 
 class TestingConfig(Config):
     """Testing configuration with in-memory database."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
     WTF_CSRF_ENABLED = False
     RATELIMIT_ENABLED = False
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=1)  # Short expiry for testing
+    QUERY_GUARD_MODE = 'raise'  # N+1 patterns fail the test that triggers them
+    JOB_QUEUE_PATH = 'memory'  # per-app queue; tests run jobs with an in-process Worker
+    BCRYPT_LOG_ROUNDS = 4  # bcrypt's minimum cost: hashing is not what the tests measure
+    MAIL_USE_TLS = False
+    JOURNAL_DIR = None  # tests that need a journal open one in a temporary directory
+    HANDOFF_DIR = None
 
 class ProductionConfig(Config):
     """Production configuration with enhanced security."""
@@ -0,0 +1,143 @@
+"""
+Ending-soon Index for Mzadd Platform
+Keeps active auctions sorted by end_time in memory so "closing in the next
+N minutes" is a binary search plus a slice instead of a table scan
+"""
+
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+
+logger = logging.getLogger(__name__)
+
+# Columns whose change is pushed to clients as auction_time
+LIFECYCLE_FIELDS = ('start_time', 'end_time', 'status')
+
+
+class EndingSoonIndex:
+    """Active auctions ordered by (end_time, auction_id)"""
+
+    def __init__(self):
+        self._keys: List[Tuple[datetime, int]] = []
+        self._end_times: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+
+    def track(self, auction_id: int, end_time: datetime):
+        """Add an auction or move it after an extension"""
+        with self._lock:
+            current = self._end_times.get(auction_id)
+            if current == end_time:
+                return
+            if current is not None:
+                self._remove_key(current, auction_id)
+            self._end_times[auction_id] = end_time
+            insort(self._keys, (end_time, auction_id))
+
+    def remove(self, auction_id: int):
+        with self._lock:
+            current = self._end_times.pop(auction_id, None)
+            if current is not None:
+                self._remove_key(current, auction_id)
+
+    def _remove_key(self, end_time: datetime, auction_id: int):
+        position = bisect_left(self._keys, (end_time, auction_id))
+        if position < len(self._keys) and self._keys[position] == (end_time, auction_id):
+            del self._keys[position]
+
+    def window(self, within_seconds: int, now: Optional[datetime] = None,
+               offset: int = 0, limit: int = 50) -> Tuple[List[Tuple[int, datetime]], int]:
+        """
+        Auctions ending in (now, now + within_seconds], soonest first.
+        Returns one page of (auction_id, end_time) and the total count.
+        """
+        now = now or datetime.utcnow()
+        offset = max(offset, 0)
+        with self._lock:
+            start = bisect_right(self._keys, (now, float('inf')))
+            stop = bisect_right(self._keys, (now + timedelta(seconds=within_seconds), float('inf')))
+            page = self._keys[start + offset:min(start + offset + limit, stop)]
+        return [(auction_id, end_time) for end_time, auction_id in page], stop - start
+
+    def end_time(self, auction_id: int) -> Optional[datetime]:
+        return self._end_times.get(auction_id)
+
+    def __len__(self):
+        return len(self._end_times)
+
+
+# (session, auction model) -> {index: (active status, on_change)}; the ORM
+# listeners are registered once per pair and feed every subscribed index
+_subscribers: Dict[Tuple[object, type], Dict[EndingSoonIndex, Tuple[object, Optional[Callable]]]] = {}
+
+
+def track_auction_changes(index: EndingSoonIndex, session, auction_model, active_status,
+                          on_change: Optional[Callable] = None):
+    """
+    Keep the index current from ORM changes to auctions (creation, extension,
+    close). Changes are collected at flush and applied only once the
+    transaction commits, so a rolled-back extension never reaches the index.
+    `on_change(auction_id, start_time, end_time, status)` is called for every
+    committed change to an auction's start time, end time or status
+    (including ones that leave the index alone, e.g. pending -> cancelled);
+    an error it raises is logged, never propagated into the commit.
+
+    Safe to call again (e.g. for each websocket server created on an app):
+    the listeners are not registered twice, and a later call replaces the
+    index's `on_change`.
+    """
+    key = (session, auction_model)
+    subscribers = _subscribers.get(key)
+    if subscribers is None:
+        subscribers = _subscribers[key] = {}
+        _listen(session, auction_model, subscribers)
+    subscribers[index] = (active_status, on_change)
+
+
+def _listen(session, auction_model, subscribers):
+    @event.listens_for(auction_model, 'after_insert')
+    def on_auction_insert(mapper, connection, target):
+        _collect(target, lifecycle_changed=True)
+
+    @event.listens_for(auction_model, 'after_update')
+    def on_auction_update(mapper, connection, target):
+        attrs = inspect(target).attrs
+        _collect(target, any(attrs[name].history.has_changes()
+                             for name in LIFECYCLE_FIELDS if name in attrs.keys()))
+
+    @event.listens_for(session, 'after_commit')
+    def on_commit(committed_session):
+        changes = committed_session.info.pop('ending_soon_pending', {})
+        for index, (active_status, on_change) in list(subscribers.items()):
+            for auction_id, (end_time, status, start_time, lifecycle_changed) in changes.items():
+                tracked = end_time if status == active_status else None
+                moved = index.end_time(auction_id) != tracked
+                if tracked is None:
+                    index.remove(auction_id)
+                else:
+                    index.track(auction_id, end_time)
+                if (moved or lifecycle_changed) and on_change is not None:
+                    try:
+                        on_change(auction_id, start_time, end_time, status)
+                    except Exception:
+                        logger.exception(f"Auction change callback failed for auction {auction_id}")
+
+    @event.listens_for(session, 'after_rollback')
+    def on_rollback(rolled_back_session):
+        rolled_back_session.info.pop('ending_soon_pending', None)
+
+
+def _collect(target, lifecycle_changed: bool):
+    """Remember an auction's state at flush; applied at commit"""
+    pending = object_session(target).info.setdefault('ending_soon_pending', {})
+    previous = pending.get(target.id)
+    lifecycle_changed = lifecycle_changed or (previous is not None and previous[3])
+    pending[target.id] = (target.end_time, target.status, getattr(target, 'start_time', None), lifecycle_changed)
+
+
+# Initialize index
+ending_soon_index = EndingSoonIndex()
@@ -1,9 +1,248 @@
 # backend/extensions.py
+import contextvars
+import threading
+import time
+import weakref
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSession
 from flask_bcrypt import Bcrypt
 from flask_socketio import SocketIO # <--- THIS LINE WAS MISSING
+from sqlalchemy import create_engine, event
+
+from outbound import backpressure_manager
+from serialization import SocketIOJSON
+
+_read_only = contextvars.ContextVar('db_read_only', default=False)
+# True for requests from a client that wrote within READ_YOUR_WRITES_SECONDS
+_pin_primary = contextvars.ContextVar('db_pin_primary', default=False)
+PRIMARY_COOKIE = 'mzadd_read_primary_until'
+
+
+class RoutingSession(FlaskSession):
+    """
+    Session that sends queries made inside a @read_only scope to the read
+    engine (replica or read-only SQLite pool). Flushes and any statement
+    that is not a SELECT always go to the primary, so bids and settlement
+    are never routed away from it.
+
+    Once the session has written in its current transaction, its reads stay
+    on the primary until the transaction ends, so it sees its own writes.
+    """
+
+    _wrote = False  # written to the primary in the current transaction
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or engine is not self._db.engines.get(None):
+            return engine
+        if self._flushing or (clause is not None and not getattr(clause, 'is_select', False)):
+            self._wrote = True
+        elif _read_only.get() and not self._wrote and not _pin_primary.get():
+            read_engine = current_app.extensions.get('read_engine')
+            if read_engine is not None:
+                return read_engine
+        return engine
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_write(session):
+    if session._wrote and has_request_context():
+        g.db_wrote = True  # init_read_routing pins the client to the primary
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _reset_write(session, transaction):
+    if transaction.parent is None:
+        session._wrote = False
+
+
+def _end_read_transaction():
+    """
+    End a transaction that only read, releasing the read connection and its
+    snapshot instead of holding them until the request tears down. Anything
+    written or pending is left for the caller to commit.
+    """
+    session = db.session()
+    if session.in_transaction() and not session._wrote and not (session.new or session.dirty or session.deleted):
+        session.rollback()
+
+
+def read_only(f):
+    """
+    Mark a route or manager method as read-only: every query it makes runs
+    on the read engine, so long reports never hold locks that stall bidding.
+    Leaving the outermost scope hands the read connection back.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        outermost = not _read_only.get()
+        token = _read_only.set(True)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+            if outermost:
+                _end_read_transaction()
+    return decorated_function
+
+
+def init_read_routing(app):
+    """
+    Read-your-writes across requests: a request that commits a write sets a
+    short-lived cookie, and the client's requests carrying it read from the
+    primary until a replica has caught up. Off when READ_YOUR_WRITES_SECONDS
+    is 0. The cookie can only move reads to the primary, so it is not signed.
+    """
+    seconds = app.config.get('READ_YOUR_WRITES_SECONDS', 0)
+    if not seconds:
+        return
+
+    @app.before_request
+    def pin_recent_writers():
+        try:
+            pinned = float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        g.read_routing_token = _pin_primary.set(pinned)
+
+    @app.after_request
+    def remember_writer(response):
+        if g.pop('db_wrote', False):
+            response.set_cookie(PRIMARY_COOKIE, str(int(time.time() + seconds)), max_age=seconds,
+                                httponly=True, samesite='Lax')
+        return response
+
+    @app.teardown_request
+    def unpin(exc=None):
+        token = g.pop('read_routing_token', None)
+        if token is not None:
+            _pin_primary.reset(token)
+
 
 # Create extension instances
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
-socketio = SocketIO(cors_allowed_origins="*", async_mode='gevent') # <--- THIS LINE WAS MISSING
+# The async mode is not fixed here: it comes from Config.SOCKETIO_ASYNC_MODE
+# when the app is created (see socketio_options below).
+socketio = SocketIO()
+
+
+def socketio_options(app):
+    """
+    Build the SocketIO keyword arguments from the app configuration, so every
+    SocketIO instance bound to the app runs with the same async mode.
+    """
+    return {
+        'async_mode': app.config.get('SOCKETIO_ASYNC_MODE', 'threading'),
+        'cors_allowed_origins': app.config.get('SOCKETIO_CORS_ALLOWED_ORIGINS', '*'),
+        'message_queue': app.config.get('SOCKETIO_MESSAGE_QUEUE'),
+        # delivers through the outbound queues of lagging clients (outbound.py)
+        'client_manager': backpressure_manager(app.config.get('SOCKETIO_MESSAGE_QUEUE')),
+        'ping_interval': app.config.get('SOCKETIO_PING_INTERVAL', 25),
+        'ping_timeout': app.config.get('SOCKETIO_PING_TIMEOUT', 20),
+        'logger': app.config.get('SOCKETIO_LOGGER', False),
+        'engineio_logger': app.config.get('SOCKETIO_ENGINEIO_LOGGER', False),
+        # packets go through the same serializer as responses (serialization.py)
+        'json': SocketIOJSON,
+    }
+
+
+# --- Database engines ---
+
+_pool_counters = weakref.WeakKeyDictionary()  # pool -> checkout counters
+_pool_locks = weakref.WeakKeyDictionary()  # pool -> lock guarding its counters
+
+
+def apply_sqlite_pragmas(dbapi_connection, config, read_only=False):
+    """Per-connection SQLite tuning: WAL lets readers run during bid commits."""
+    cursor = dbapi_connection.cursor()
+    if not read_only:
+        cursor.execute(f"PRAGMA journal_mode={config.get('SQLITE_JOURNAL_MODE', 'WAL')}")
+        cursor.execute(f"PRAGMA synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}")
+    else:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.execute(f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+    cursor.execute(f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 0))}")
+    cursor.close()
+
+
+def configure_sqlite_engine(engine, config, read_only=False):
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, config, read_only=read_only)
+
+
+def track_pool(engine):
+    """Count checkouts and the high-water mark of checked-out connections."""
+    pool = engine.pool
+    counters = _pool_counters.setdefault(pool, {'checkouts_total': 0, 'peak_checkedout': 0})
+    lock = _pool_locks.setdefault(pool, threading.Lock())
+    checkedout = getattr(pool, 'checkedout', None)
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with lock:  # checkouts happen on every worker thread
+            counters['checkouts_total'] += 1
+            if callable(checkedout):
+                counters['peak_checkedout'] = max(counters['peak_checkedout'], checkedout())
+
+
+def _is_sqlite_file(engine):
+    return engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:')
+
+
+def create_read_engine(app, primary):
+    """
+    Engine for reporting and listing queries: the configured replica, a
+    separate read-only pool on the same file for SQLite, or the primary.
+    """
+    from config import build_engine_options
+
+    read_uri = app.config.get('SQLALCHEMY_READ_DATABASE_URI')
+    if read_uri:
+        engine = create_engine(read_uri, **build_engine_options(read_uri))
+    elif _is_sqlite_file(primary):
+        engine = create_engine(
+            f"sqlite:///file:{primary.url.database}?mode=ro&uri=true",
+            pool_size=app.config.get('SQLITE_READ_POOL_SIZE', 10),
+            max_overflow=app.config.get('SQLITE_READ_POOL_SIZE', 10),
+            connect_args={
+                'check_same_thread': False,
+                'timeout': app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000,
+            },
+        )
+        configure_sqlite_engine(engine, app.config, read_only=True)
+    else:
+        return primary
+    track_pool(engine)
+    return engine
+
+
+def configure_engines(app):
+    """Apply the backend profile to the primary engine and build the read engine."""
+    with app.app_context():
+        primary = db.engine
+        if _is_sqlite_file(primary):
+            configure_sqlite_engine(primary, app.config)
+        track_pool(primary)
+        app.extensions['read_engine'] = create_read_engine(app, primary)
+
+
+def pool_stats(engine):
+    """Snapshot of pool utilisation for the monitoring endpoint (no URL: host and user stay private)."""
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__, 'dialect': engine.dialect.name}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    counters = _pool_counters.get(pool)
+    if counters is not None:
+        with _pool_locks[pool]:
+            stats.update(counters)
+    if stats.get('size'):
+        stats['utilization'] = round(stats.get('checkedout', 0) / stats['size'], 3)
+    return stats
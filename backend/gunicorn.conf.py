@@ -0,0 +1,58 @@
+# backend/gunicorn.conf.py
+"""
+Gunicorn settings for serving the backend, driven by the same
+SOCKETIO_ASYNC_MODE that the SocketIO extension is initialised with.
+
+Socket.IO keeps per-connection state in the process, so every gunicorn
+master runs exactly ONE worker. To use more cores, serve.py starts several
+masters on consecutive ports and nginx pins each client to one of them
+(`ip_hash`), while SOCKETIO_MESSAGE_QUEUE carries room broadcasts between
+processes and EVENT_LOG_REDIS_URL gives them one set of event sequences.
+
+Performance profile per async mode (one worker process):
+
+  gevent     Greenlets + monkey-patched I/O. Best choice for production:
+             ~10k concurrent WebSockets per process, a few KB per idle
+             connection. Blocking C extensions (bcrypt) stall the whole
+             loop while they run, so keep BCRYPT_LOG_ROUNDS sensible.
+  eventlet   Same model as gevent with similar numbers; kept for parity
+             with older deployments, but eventlet is in maintenance mode.
+  threading  One OS thread per WebSocket (SERVER_THREADS caps it, 100 by
+             default). No monkey patching and the easiest to debug, but
+             ~8MB of stack per connection and GIL contention limit it to a
+             few hundred clients per process. Development / small installs.
+"""
+import os
+
+from config import Config
+
+_WORKER_CLASSES = {
+    'gevent': 'geventwebsocket.gunicorn.workers.GeventWebSocketWorker',
+    'eventlet': 'eventlet',
+    'threading': 'gthread',
+}
+
+async_mode = Config.SOCKETIO_ASYNC_MODE
+if async_mode not in _WORKER_CLASSES:
+    raise RuntimeError(f'Unsupported SOCKETIO_ASYNC_MODE: {async_mode}')
+
+bind = os.environ.get('GUNICORN_BIND', f'0.0.0.0:{Config.SERVER_BASE_PORT}')
+workers = 1
+worker_class = _WORKER_CLASSES[async_mode]
+if async_mode == 'threading':
+    threads = Config.SERVER_THREADS
+else:
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 10000))
+
+# Long-lived WebSockets must not be killed by the worker timeout; the
+# heartbeat is handled by Socket.IO pings instead.
+timeout = 0 if async_mode != 'threading' else 120
+keepalive = 75  # longer than nginx's upstream keepalive_timeout
+# On SIGTERM/SIGHUP the old worker stops accepting and gets this long to
+# finish in-flight requests before it is killed.
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+
+accesslog = '-'
+errorlog = '-'
+loglevel = Config.LOG_LEVEL.lower()
+proc_name = 'mzadd-backend'
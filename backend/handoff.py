@@ -0,0 +1,120 @@
+"""
+Session Handoff for Mzadd Platform
+A draining process writes its live sessions (user, encoding, joined
+auctions) and its event-log sequences to HANDOFF_DIR; the process that
+replaces it loads them, so clients reconnect with a resume token instead
+of re-authenticating, re-joining every auction and taking full snapshots.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import jwt
+
+from serialization import dumps_bytes, loads
+
+logger = logging.getLogger(__name__)
+
+RESUME_TOKEN_AUDIENCE = 'mzadd-resume'
+
+
+def listener_key() -> str:
+    """
+    Names this process's files in shared state directories: serve.py gives
+    every process its own GUNICORN_BIND, and a replacement reuses it
+    """
+    return os.environ.get('GUNICORN_BIND', 'default').replace(':', '_').replace('/', '_')
+
+
+def state_directory(config, name: str, root_path: str = '') -> Optional[str]:
+    """config[name] resolved against the app root, or None when unset"""
+    directory = config.get(name)
+    if not directory:
+        return None
+    return directory if os.path.isabs(directory) else os.path.join(root_path, directory)
+
+
+def new_resume_id() -> str:
+    return uuid.uuid4().hex
+
+
+def issue_resume_token(secret_key: str, user_id: int, resume_id: str, ttl: int) -> str:
+    """Signed (user_id, resume_id); proves identity on resume without a database lookup"""
+    return jwt.encode({
+        'user_id': user_id,
+        'resume_id': resume_id,
+        'aud': RESUME_TOKEN_AUDIENCE,
+        'exp': datetime.utcnow() + timedelta(seconds=ttl),
+    }, secret_key, algorithm='HS256')
+
+
+def decode_resume_token(secret_key: str, token: str) -> Dict:
+    """Raises jwt.InvalidTokenError (incl. expiry) for anything but a valid resume token"""
+    return jwt.decode(token, secret_key, algorithms=['HS256'], audience=RESUME_TOKEN_AUDIENCE)
+
+
+class HandoffStore:
+    """
+    One handoff file per listening address (processes on different ports
+    hand off independently). Files are written atomically and claimed
+    (removed) by the successor; a file older than `max_age` is ignored.
+    """
+
+    def __init__(self, directory: str, key: str = 'default', max_age: float = 300):
+        self.directory = directory
+        self.path = os.path.join(directory, f'handoff-{key.replace(":", "_").replace("/", "_")}.json')
+        self.max_age = max_age
+        self.sessions: Dict[str, Dict] = {}  # resume_id -> saved session
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, sessions: Dict[str, Dict], event_log: Dict) -> str:
+        body = dumps_bytes({'saved_at': time.time(), 'sessions': sessions, 'event_log': event_log})
+        partial = f'{self.path}.{os.getpid()}.partial'
+        with open(partial, 'wb') as handoff:
+            handoff.write(body)
+            handoff.flush()
+            os.fsync(handoff.fileno())
+        os.replace(partial, self.path)
+        return self.path
+
+    def load(self) -> Optional[Dict]:
+        """Claim a predecessor's handoff; its sessions become resumable here"""
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as handoff:
+                    state = loads(handoff.read())
+                os.remove(self.path)
+            except FileNotFoundError:
+                return None
+            except ValueError as e:
+                logger.error(f"Unreadable handoff {self.path}: {str(e)}")
+                return None
+            if time.time() - state['saved_at'] > self.max_age:
+                logger.info(f"Ignoring a handoff saved {time.time() - state['saved_at']:.0f}s ago")
+                return None
+            self.sessions.update(state['sessions'])
+            return state
+
+    def hold(self, resume_id: str, session: Dict):
+        """Keep a session resumable in this process (e.g. after a slow-consumer disconnect)"""
+        with self._lock:
+            self.sessions[resume_id] = session
+
+    def claim(self, resume_id: str) -> Optional[Dict]:
+        """A saved session, once (a resume token cannot be replayed)"""
+        with self._lock:
+            return self.sessions.pop(resume_id, None)
+
+
+def open_handoff_store(config, root_path: str = '') -> Optional[HandoffStore]:
+    """The store configured by HANDOFF_DIR (None disables handoff)"""
+    directory = state_directory(config, 'HANDOFF_DIR', root_path)
+    if not directory:
+        return None
+    return HandoffStore(directory, key=listener_key(), max_age=config.get('RESUME_TOKEN_TTL', 300))
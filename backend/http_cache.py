@@ -0,0 +1,183 @@
+"""
+HTTP Response Caching for Mzadd Platform
+Conditional GET for polled API reads: the ETag is derived from a cheap
+version query (prices, winning bids, updated_at) so a matching If-None-Match
+is answered with 304 before the body is built or serialized. Bodies are
+compressed with the best encoding the client accepts (brotli, gzip), and the
+encoded bodies of hot responses are kept so repeat polls skip the view too
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Optional, Tuple
+
+from flask import Flask, current_app, make_response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; clients fall back to gzip
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/css',
+                          'application/javascript', 'image/svg+xml'}
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encodings) -> Optional[str]:
+    """Best encoding the client accepts (werkzeug Accept), brotli first on a tie"""
+    best, best_quality = None, 0
+    for encoding in available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, config) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=config.get('HTTP_BROTLI_QUALITY', 5))
+    return gzip.compress(body, compresslevel=config.get('HTTP_GZIP_LEVEL', 6), mtime=0)
+
+
+def make_etag(*parts: Any) -> str:
+    """Validator from the request identity and the entity version"""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """LRU of encoded response bodies keyed by (ETag, encoding), bounded by total bytes"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # (etag, accepted encoding) -> (body, mimetype, applied encoding)
+        self._entries: 'OrderedDict[Tuple[str, Optional[str]], Tuple[bytes, str, Optional[str]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag: str, encoding: Optional[str]) -> Optional[Tuple[bytes, str, Optional[str]]]:
+        with self._lock:
+            entry = self._entries.get((etag, encoding))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((etag, encoding))
+            self.hits += 1
+            return entry
+
+    def put(self, etag: str, encoding: Optional[str], body: bytes, mimetype: str,
+            applied: Optional[str] = None):
+        if len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            previous = self._entries.pop((etag, encoding), None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            self._entries[(etag, encoding)] = (body, mimetype, applied)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.size, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+def _revalidate(response, etag: str, max_age: int):
+    response.set_etag(etag, weak=True)
+    # private: responses can be per-user; max-age=0 makes clients revalidate every poll
+    response.headers['Cache-Control'] = f'private, max-age={max_age}, must-revalidate'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def conditional(version: Callable[..., Any], max_age: int = 0):
+    """
+    Serve a GET route with a version-derived ETag. `version` receives the
+    view arguments and returns anything hashable by repr (typically a few
+    columns from one query). 304 when the client already has that version;
+    otherwise the encoded body is served from the response cache or built
+    once and cached.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            cache: Optional[ResponseCache] = current_app.extensions.get('http_cache')
+            if cache is None or request.method != 'GET':
+                return f(*args, **kwargs)
+
+            etag = make_etag(request.path, request.query_string, version(*args, **kwargs))
+            if request.if_none_match.contains_weak(etag):
+                return _revalidate(current_app.response_class(status=304), etag, max_age)
+
+            config = current_app.config
+            encoding = None
+            if config.get('HTTP_COMPRESSION_ENABLED', True):
+                encoding = negotiate_encoding(request.accept_encodings)
+            cached = cache.get(etag, encoding)
+            if cached is not None:
+                body, mimetype, applied = cached
+                response = current_app.response_class(body, mimetype=mimetype)
+                if applied:
+                    response.headers['Content-Encoding'] = applied
+                return _revalidate(response, etag, max_age)
+
+            identity = cache.get(etag, None) if encoding is not None else None
+            if identity is not None:
+                # built for a client without compression; only encode it
+                response = current_app.response_class(identity[0], mimetype=identity[1])
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                cache.put(etag, None, response.get_data(), response.mimetype)
+            body = response.get_data()
+            if encoding is not None:
+                applied = None
+                if len(body) >= config.get('HTTP_COMPRESSION_MIN_SIZE', 1024):
+                    body = compress(body, encoding, config)
+                    applied = encoding
+                    response.set_data(body)
+                    response.headers['Content-Encoding'] = encoding
+                cache.put(etag, encoding, body, response.mimetype, applied)
+            return _revalidate(response, etag, max_age)
+        return decorated_function
+    return decorator
+
+
+def init_http_cache(app: Flask) -> ResponseCache:
+    """
+    Register the response cache used by @conditional and compress every
+    other sizeable text response on the way out
+    """
+    cache = ResponseCache(app.config.get('HTTP_RESPONSE_CACHE_BYTES', 64 * 1024 * 1024))
+    app.extensions['http_cache'] = cache
+
+    @app.after_request
+    def compress_response(response):
+        if (not app.config.get('HTTP_COMPRESSION_ENABLED', True) or response.status_code != 200
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None or response.calculate_content_length() < app.config.get('HTTP_COMPRESSION_MIN_SIZE', 1024):
+            return response
+        response.set_data(compress(response.get_data(), encoding, app.config))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return cache
@@ -0,0 +1,95 @@
+"""
+Bid Idempotency for Mzadd Platform
+Clients tag each bid with a client_bid_id; a resend of the same id gets
+the original outcome back from a bounded, time-expiring in-memory table
+without touching the database. A unique (bidder_id, client_bid_id)
+constraint on Bid is the backstop across processes and restarts.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from flask import Flask
+
+NEW = 'new'          # first time this id is seen: process the bid
+PENDING = 'pending'  # the original is still being processed
+DONE = 'done'        # finished: replay the stored outcome
+
+_IN_FLIGHT = object()
+
+MAX_CLIENT_BID_ID_LENGTH = 64
+
+
+def valid_client_bid_id(value) -> bool:
+    return isinstance(value, str) and 0 < len(value) <= MAX_CLIENT_BID_ID_LENGTH
+
+
+class BidDedupe:
+    """
+    (user_id, client_bid_id) -> outcome, kept for `ttl` seconds and at most
+    `max_entries` entries. Every entry lives for the same ttl, so insertion
+    order is expiry order and both eviction rules pop from the front: O(1).
+    """
+
+    def __init__(self, ttl: float = 600, max_entries: int = 100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self._entries: 'OrderedDict[Tuple, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, user_id: int, client_bid_id: Hashable) -> Tuple[str, Optional[Dict]]:
+        """NEW (caller must complete() or release()), PENDING, or DONE with the stored outcome"""
+        key = (user_id, client_bid_id)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                outcome = entry[1]
+                return (PENDING, None) if outcome is _IN_FLIGHT else (DONE, outcome)
+            self._entries[key] = (now + self.ttl, _IN_FLIGHT)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return NEW, None
+
+    def complete(self, user_id: int, client_bid_id: Hashable, outcome: Dict):
+        key = (user_id, client_bid_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], outcome)
+
+    def release(self, user_id: int, client_bid_id: Hashable):
+        """Forget an id whose bid failed for a transient reason, so a resend is processed"""
+        with self._lock:
+            self._entries.pop((user_id, client_bid_id), None)
+
+    def _expire(self, now: float):
+        entries = self._entries
+        while entries:
+            expires_at = next(iter(entries.values()))[0]
+            if expires_at > now:
+                break
+            entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def init_bid_dedupe(app: Flask) -> BidDedupe:
+    bid_dedupe.ttl = app.config.get('BID_DEDUPE_TTL', 600)
+    bid_dedupe.max_entries = app.config.get('BID_DEDUPE_MAX_ENTRIES', 100_000)
+    app.extensions['bid_dedupe'] = bid_dedupe
+    return bid_dedupe
+
+
+# Shared by the REST route and the socket handler of this process
+bid_dedupe = BidDedupe()
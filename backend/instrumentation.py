@@ -0,0 +1,289 @@
+"""
+Performance Instrumentation for Mzadd Platform
+Times every Flask route and Socket.IO event, counts SQL statements and their
+time per request or event through SQLAlchemy cursor hooks, keeps HDR-style
+latency histograms per endpoint/event and logs slow queries (the statement
+only: bind parameters carry passwords, tokens and personal data)
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_query_logger = logging.getLogger('mzadd.slow_query')
+
+
+class Histogram:
+    """
+    Log-linear buckets as in HdrHistogram: values (microseconds) are grouped
+    by power of two and each power is split into 2**precision_bits linear
+    sub-buckets. Recording is O(1) with fixed memory and a relative error of
+    at most 1/2**precision_bits.
+    """
+
+    def __init__(self, precision_bits: int = 5, max_value_us: int = 60_000_000):
+        self.sub_bits = precision_bits
+        self.sub_count = 1 << precision_bits
+        self.max_value = max_value_us
+        self.counts = [0] * (self._index(max_value_us) + 1)
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_count:
+            return value
+        shift = value.bit_length() - self.sub_bits - 1
+        return (shift + 1) * self.sub_count + (value >> shift) - self.sub_count
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < 2 * self.sub_count:
+            return index
+        shift = index // self.sub_count - 1
+        base = index % self.sub_count + self.sub_count
+        return ((base + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        value = min(int(seconds * 1_000_000), self.max_value)
+        index = self._index(value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+            if self.min is None or value < self.min:
+                self.min = value
+
+    def percentile(self, percent: float) -> int:
+        """Value (us) at or below which `percent` of the recordings fall"""
+        if not self.total:
+            return 0
+        rank = max(int(-(-percent * self.total // 100)), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            if not self.total:
+                return {'count': 0}
+            result = {
+                'count': self.total,
+                'mean_ms': round(self.sum / self.total / 1000, 3),
+                'min_ms': round(self.min / 1000, 3),
+                'max_ms': round(self.max / 1000, 3),
+            }
+            for percent in (50, 90, 99, 99.9):
+                result[f'p{percent:g}_ms'.replace('.', '')] = round(self.percentile(percent) / 1000, 3)
+            return result
+
+
+class QueryStats:
+    """SQL statements issued inside one request or socket event"""
+    __slots__ = ('name', 'count', 'seconds', 'shapes', 'budget')
+
+    def __init__(self, name: str, budget: Optional[Tuple] = None):
+        self.name = name
+        self.count = 0
+        self.seconds = 0.0
+        # statement shape -> [count, call sites], only kept while a query guard is on
+        self.shapes = {} if metrics.guard is not None else None
+        self.budget = budget  # (statements, repeats) from @query_budget
+
+
+_scope: contextvars.ContextVar = contextvars.ContextVar('instrumentation_scope', default=None)
+
+
+class Timing:
+    """Latency histogram plus SQL totals of one endpoint or event"""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, stats: QueryStats):
+        self.latency.record(seconds)
+        with self._lock:
+            self.statements += stats.count
+            self.sql_seconds += stats.seconds
+
+    def snapshot(self) -> Dict:
+        entry = self.latency.snapshot()
+        if entry['count']:
+            entry['sql_per_call'] = round(self.statements / entry['count'], 2)
+            entry['sql_ms_per_call'] = round(self.sql_seconds * 1000 / entry['count'], 3)
+        return entry
+
+
+class Metrics:
+    """Timings per endpoint/event"""
+
+    def __init__(self):
+        self.timings: Dict[str, Timing] = {}
+        self.slow_query_seconds: Optional[float] = None
+        self.guard = None  # query_guard.QueryGuard when enabled
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, stats: QueryStats):
+        timing = self.timings.get(name)
+        if timing is None:
+            with self._lock:
+                timing = self.timings.setdefault(name, Timing())
+        timing.record(seconds, stats)
+
+    def snapshot(self) -> Dict:
+        return {name: timing.snapshot() for name, timing in sorted(self.timings.items())}
+
+    def prometheus(self) -> str:
+        """
+        Prometheus text format: a latency summary and an SQL statement counter
+        per endpoint/event, each family's samples grouped under its TYPE line
+        """
+        latency = ['# HELP mzadd_latency_seconds Latency of routes, socket events and tasks',
+                   '# TYPE mzadd_latency_seconds summary']
+        statements = ['# HELP mzadd_sql_statements_total SQL statements issued',
+                      '# TYPE mzadd_sql_statements_total counter']
+        for name, timing in sorted(self.timings.items()):
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            histogram = timing.latency
+            for quantile in (0.5, 0.9, 0.99, 0.999):
+                value = histogram.percentile(quantile * 100) / 1_000_000
+                latency.append(f'mzadd_latency_seconds{{name="{label}",quantile="{quantile}"}} {value}')
+            latency.append(f'mzadd_latency_seconds_sum{{name="{label}"}} {histogram.sum / 1_000_000}')
+            latency.append(f'mzadd_latency_seconds_count{{name="{label}"}} {histogram.total}')
+            statements.append(f'mzadd_sql_statements_total{{name="{label}"}} {timing.statements}')
+        return '\n'.join(latency + statements) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.timings.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, not the connection: a statement that
+    # raises never reaches after_cursor_execute, and its start would
+    # otherwise be left behind for the next statement to be timed against
+    context._instrumentation_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_instrumentation_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats = _scope.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        if stats.shapes is not None:
+            metrics.guard.record(stats, statement)
+    threshold = metrics.slow_query_seconds
+    if threshold is not None and elapsed >= threshold:
+        slow_query_logger.warning(
+            "Slow query %.1f ms in %s: %s",
+            elapsed * 1000, stats.name if stats else 'background', statement
+        )
+
+
+def _listen_sql():
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_instrumentation(app: Flask):
+    """Time every route and count its SQL; no-op unless INSTRUMENTATION_ENABLED"""
+    if not app.config.get('INSTRUMENTATION_ENABLED', True):
+        return
+    app.extensions['metrics'] = metrics
+    threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS')
+    metrics.slow_query_seconds = threshold_ms / 1000 if threshold_ms is not None else None
+    _listen_sql()
+
+    @app.before_request
+    def start_request_timer():
+        g.instrumentation_start = time.perf_counter()
+        rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+        view = app.view_functions.get(request.endpoint)
+        stats = QueryStats(f'{request.method} {rule}', getattr(view, 'query_budget', None))
+        g.instrumentation_token = _scope.set(stats)
+
+    @app.teardown_request
+    def record_request_timing(exc=None):
+        start = g.pop('instrumentation_start', None)
+        token = g.pop('instrumentation_token', None)
+        if start is None:
+            return
+        stats = _scope.get()
+        _scope.reset(token)
+        metrics.observe(stats.name, time.perf_counter() - start, stats)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _scope.get()
+
+
+def query_budget(statements: Optional[int] = None, repeats: Optional[int] = None):
+    """Raise the query guard limits for one route, socket handler or task"""
+    def decorator(f):
+        f.query_budget = (statements, repeats)
+        return f
+    return decorator
+
+
+def instrument_socketio(socketio, app: Flask):
+    """
+    Time every handler registered on `socketio` so far (call after the
+    handlers are set up). Wraps at the Socket.IO server level, so the
+    measurement includes Flask-SocketIO's context setup.
+    """
+    if 'metrics' not in app.extensions:
+        return
+    for handlers in socketio.server.handlers.values():
+        for event_name, handler in list(handlers.items()):
+            if not getattr(handler, 'instrumented', False):
+                handlers[event_name] = _timed_handler(f'socket {event_name}', handler)
+
+
+def timed(name: str):
+    """Time a background task or helper like a socket event (e.g. auction settlement)"""
+    def decorator(f):
+        return _timed_handler(name, f)
+    return decorator
+
+
+def _timed_handler(name: str, handler):
+    @wraps(handler)
+    def timed_handler(*args, **kwargs):
+        stats = QueryStats(name, getattr(handler, 'query_budget', None))
+        token = _scope.set(stats)
+        start = time.perf_counter()
+        try:
+            result = handler(*args, **kwargs)
+            if metrics.guard is not None:
+                metrics.guard.check(stats)
+            return result
+        finally:
+            metrics.observe(name, time.perf_counter() - start, stats)
+            _scope.reset(token)
+    timed_handler.instrumented = True
+    return timed_handler
+
+
+# Initialize metrics
+metrics = Metrics()
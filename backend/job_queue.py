@@ -0,0 +1,351 @@
+"""
+Background Job Queue for Mzadd Platform
+Durable SQLite-backed queue for slow side effects (settlement, fees,
+emails): handlers only enqueue; worker processes claim jobs in priority
+order in batches, retry failures with exponential backoff and park jobs
+that keep failing as 'dead' for inspection
+"""
+
+import contextlib
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, current_app
+
+from instrumentation import timed
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+QUEUED, RUNNING, DEAD = 'queued', 'running', 'dead'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job (
+    id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    locked_by TEXT,
+    locked_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_job_ready ON job (status, priority DESC, run_at, id);
+"""
+
+
+class Task:
+    """A registered job handler and its defaults"""
+
+    def __init__(self, name: str, function: Callable, priority: int, max_attempts: int):
+        self.name = name
+        self.function = timed(f'job {name}')(function)
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+
+tasks: Dict[str, Task] = {}
+
+
+def task(name: str, priority: int = PRIORITY_NORMAL, max_attempts: int = 5):
+    """Register a job handler; it is called with the job payload as keyword arguments"""
+    def decorator(f):
+        tasks[name] = Task(name, f, priority, max_attempts)
+        return f
+    return decorator
+
+
+class Job:
+    __slots__ = ('id', 'task', 'payload', 'priority', 'attempts', 'max_attempts')
+
+    def __init__(self, id, task, payload, priority, attempts, max_attempts):
+        self.id = id
+        self.task = task
+        self.payload = loads(payload)
+        self.priority = priority
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+
+
+class JobQueue:
+    """
+    The `job` table of a SQLite file (WAL, so enqueues from request threads
+    and claims by worker processes do not block each other). A path of
+    'memory' keeps the queue in a shared in-memory database for tests.
+    """
+
+    def __init__(self, path: str, backoff_base: float = 2.0, backoff_max: float = 600.0,
+                 lease_seconds: float = 300.0):
+        if path == 'memory':
+            self.uri = f'file:jobs_{uuid.uuid4().hex}?mode=memory&cache=shared'
+            # shared-cache tables are locked without waiting for busy_timeout
+            self._serialize = threading.RLock()
+        else:
+            self._serialize = contextlib.nullcontext()
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.uri = f'file:{os.path.abspath(path)}'
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        # also keeps a shared in-memory database alive
+        self._keeper = self._connect()
+        self._keeper.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.uri, uri=True, isolation_level=None, timeout=30,
+                                     check_same_thread=False)
+        if 'mode=memory' not in self.uri:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _execute(self, query: str, parameters=()) -> sqlite3.Cursor:
+        with self._serialize:
+            return self.connection.execute(query, parameters)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def enqueue(self, task_name: str, payload: Optional[Dict] = None, priority: Optional[int] = None,
+                delay: float = 0, max_attempts: Optional[int] = None) -> int:
+        return self.enqueue_many(task_name, [payload or {}], priority, delay, max_attempts)[0]
+
+    def enqueue_many(self, task_name: str, payloads: Iterable[Dict], priority: Optional[int] = None,
+                     delay: float = 0, max_attempts: Optional[int] = None) -> List[int]:
+        """Several jobs of one task in a single transaction"""
+        spec = tasks.get(task_name)
+        if priority is None:
+            priority = spec.priority if spec else PRIORITY_NORMAL
+        if max_attempts is None:
+            max_attempts = spec.max_attempts if spec else 5
+        now = time.time()
+        rows = [(task_name, dumps(payload), priority, max_attempts, now + delay, now) for payload in payloads]
+        connection = self.connection
+        ids = []
+        with self._serialize:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                for row in rows:
+                    ids.append(connection.execute(
+                        'INSERT INTO job (task, payload, priority, max_attempts, run_at, created_at) '
+                        'VALUES (?, ?, ?, ?, ?, ?)', row
+                    ).lastrowid)
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        return ids
+
+    def dequeue(self, worker_id: str, limit: int = 10) -> List[Job]:
+        """Claim up to `limit` ready jobs, highest priority first, in one transaction"""
+        now = time.time()
+        with self._serialize:
+            rows = self.connection.execute(
+                'UPDATE job SET status = ?, locked_by = ?, locked_at = ?, attempts = attempts + 1 '
+                'WHERE id IN (SELECT id FROM job WHERE status = ? AND run_at <= ? '
+                'ORDER BY priority DESC, run_at, id LIMIT ?) '
+                'RETURNING id, task, payload, priority, attempts, max_attempts',
+                (RUNNING, worker_id, now, QUEUED, now, limit)
+            ).fetchall()
+        # RETURNING gives no order guarantee
+        rows.sort(key=lambda row: (-row[3], row[0]))
+        return [Job(*row) for row in rows]
+
+    def complete(self, job_ids: List[int]):
+        if job_ids:
+            self._execute(f"DELETE FROM job WHERE id IN ({','.join('?' * len(job_ids))})", job_ids)
+
+    def fail(self, job: Job, error: str) -> Tuple[str, float]:
+        """Back off and requeue, or park the job as dead after its last attempt"""
+        if job.attempts >= job.max_attempts:
+            self._execute(
+                'UPDATE job SET status = ?, locked_by = NULL, last_error = ? WHERE id = ?',
+                (DEAD, error, job.id)
+            )
+            return DEAD, 0.0
+        delay = self.backoff(job.attempts)
+        self._execute(
+            'UPDATE job SET status = ?, locked_by = NULL, run_at = ?, last_error = ? WHERE id = ?',
+            (QUEUED, time.time() + delay, error, job.id)
+        )
+        return QUEUED, delay
+
+    def backoff(self, attempts: int) -> float:
+        """Exponential backoff with jitter so retried jobs do not fire together"""
+        delay = min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    def requeue_stale(self) -> int:
+        """Jobs whose worker died mid-run go back to the queue (at-least-once delivery)"""
+        cursor = self._execute(
+            'UPDATE job SET status = ?, locked_by = NULL WHERE status = ? AND locked_at < ?',
+            (QUEUED, RUNNING, time.time() - self.lease_seconds)
+        )
+        return cursor.rowcount
+
+    def retry_dead(self, job_ids: Optional[List[int]] = None) -> int:
+        query = 'UPDATE job SET status = ?, attempts = 0, run_at = ? WHERE status = ?'
+        parameters = [QUEUED, time.time(), DEAD]
+        if job_ids:
+            query += f" AND id IN ({','.join('?' * len(job_ids))})"
+            parameters += job_ids
+        return self._execute(query, parameters).rowcount
+
+    def stats(self) -> Dict:
+        with self._serialize:
+            counts = dict(self.connection.execute('SELECT status, COUNT(*) FROM job GROUP BY status').fetchall())
+        return {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DEAD)}
+
+
+class Worker:
+    """Runs claimed jobs inside an app context; one per thread or process"""
+
+    def __init__(self, queue: JobQueue, app: Flask, batch_size: int = 10, poll_interval: float = 0.5,
+                 worker_id: Optional[str] = None):
+        self.queue = queue
+        self.app = app
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f'{os.getpid()}-{uuid.uuid4().hex[:6]}'
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> int:
+        """Claim and run one batch; returns the number of jobs claimed"""
+        jobs = self.queue.dequeue(self.worker_id, self.batch_size)
+        done = []
+        for job in jobs:
+            spec = tasks.get(job.task)
+            try:
+                if spec is None:
+                    raise LookupError(f'Unknown task {job.task!r}')
+                with self.app.app_context():
+                    spec.function(**job.payload)
+                done.append(job.id)
+            except Exception as e:
+                status, delay = self.queue.fail(job, ''.join(traceback.format_exception_only(type(e), e)).strip())
+                if status == DEAD:
+                    logger.error(f"Job {job.id} ({job.task}) failed {job.attempts} times, giving up: {e}")
+                else:
+                    logger.warning(f"Job {job.id} ({job.task}) failed, retry in {delay:.1f}s: {e}")
+        self.queue.complete(done)
+        return len(jobs)
+
+    def run_until_empty(self, max_batches: int = 1000) -> int:
+        """Process every ready job, then return (in-process use, e.g. tests)"""
+        processed = 0
+        for _ in range(max_batches):
+            claimed = self.run_once()
+            if not claimed:
+                break
+            processed += claimed
+        return processed
+
+    def run(self):
+        logger.info(f"Job worker {self.worker_id} started")
+        last_recovery = 0.0
+        while not self._stop.is_set():
+            try:
+                # inside the try: a locked jobs.db must not end the worker here either
+                if time.monotonic() - last_recovery > self.queue.lease_seconds / 2:
+                    self.queue.requeue_stale()
+                    last_recovery = time.monotonic()
+                claimed = self.run_once()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Job worker {self.worker_id}: {e}")
+                claimed = 0
+            if claimed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+        logger.info(f"Job worker {self.worker_id} stopped")
+
+    def start(self) -> threading.Thread:
+        """Run in a daemon thread of this process"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name=f'job-worker-{self.worker_id}', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def _worker_process(config_name: str, batch_size: int, poll_interval: float):
+    from app import create_app
+    from config import config
+
+    app = create_app(config[config_name])
+    worker = Worker(app.extensions['jobs'], app, batch_size, poll_interval)
+    signal.signal(signal.SIGTERM, lambda *_: worker._stop.set())
+    signal.signal(signal.SIGINT, lambda *_: worker._stop.set())
+    worker.run()
+
+
+def run_worker_processes(config_name: str, processes: int, batch_size: int = 10, poll_interval: float = 0.5):
+    """Start `processes` workers and wait for them (stop with SIGTERM/Ctrl-C)"""
+    context = multiprocessing.get_context('spawn')
+    children = [context.Process(target=_worker_process, args=(config_name, batch_size, poll_interval),
+                                name=f'job-worker-{i}') for i in range(processes)]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.join()
+
+
+def enqueue(task_name: str, priority: Optional[int] = None, delay: float = 0, **payload) -> int:
+    """Enqueue on the current app's queue; what request and socket handlers call"""
+    return current_app.extensions['jobs'].enqueue(task_name, payload, priority=priority, delay=delay)
+
+
+def init_job_queue(app: Flask) -> JobQueue:
+    path = app.config.get('JOB_QUEUE_PATH', 'instance/jobs.db')
+    if path != 'memory' and not os.path.isabs(path):
+        path = os.path.join(app.root_path, path)
+    queue = JobQueue(
+        path,
+        backoff_base=app.config.get('JOB_BACKOFF_BASE', 2.0),
+        backoff_max=app.config.get('JOB_BACKOFF_MAX', 600.0),
+        lease_seconds=app.config.get('JOB_LEASE_SECONDS', 300.0),
+    )
+    app.extensions['jobs'] = queue
+    import jobs  # noqa: F401  registers the task handlers
+
+    @app.cli.command('jobs-worker')
+    def jobs_worker_command():
+        """Run job worker processes (JOB_WORKER_PROCESSES, JOB_BATCH_SIZE)."""
+        run_worker_processes(os.environ.get('FLASK_CONFIG', 'development'),
+                             app.config.get('JOB_WORKER_PROCESSES', 2),
+                             app.config.get('JOB_BATCH_SIZE', 10),
+                             app.config.get('JOB_POLL_INTERVAL', 0.5))
+
+    return queue
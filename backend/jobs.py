@@ -0,0 +1,104 @@
+"""
+Background Jobs for Mzadd Platform
+Handlers for the job queue (job_queue.py): auction settlement, merchant
+fees and outgoing email. A handler raises to have its job retried
+"""
+
+import logging
+import smtplib
+from email.message import EmailMessage
+
+from flask import current_app
+
+from job_queue import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, enqueue, task
+
+logger = logging.getLogger(__name__)
+
+
+class JobFailed(RuntimeError):
+    """A handler could not finish; the queue retries it with backoff"""
+
+
+@task('settle_auction', priority=PRIORITY_HIGH, max_attempts=8)
+def settle_auction(auction_id: int):
+    """
+    Commission and merchant earnings for a closed auction, then the winner's
+    email. Safe to run more than once: the credit and Auction.settled_at
+    commit together, and a run that finds the auction settled does nothing.
+    The email is its own job, enqueued only by the run that settled.
+    """
+    from business_logic import revenue_manager
+    from models_enhanced import Auction, User, db
+
+    result = revenue_manager.process_auction_completion(auction_id)
+    if not result['success']:
+        raise JobFailed(result['message'])
+    if result.get('already_settled'):
+        return result
+    auction = db.session.get(Auction, auction_id)
+    winner = db.session.get(User, auction.winning_bid.bidder_id) if auction.winning_bid else None
+    if winner is not None and winner.email:
+        enqueue('send_email', to=winner.email, subject='You won the auction',
+                body=f'Congratulations, you won auction #{auction_id} for {auction.current_price} KWD.')
+    return result
+
+
+def enqueue_unsettled_auctions() -> int:
+    """
+    Queue settlement for every closed auction with a winner that was never
+    settled, e.g. because the process died between closing it and enqueueing
+    its job (the queue lives in its own database, so the two cannot commit
+    together). Run at startup; duplicates of queued jobs are harmless.
+    """
+    from models_enhanced import Auction, AuctionStatus, db
+
+    auction_ids = [auction_id for (auction_id,) in db.session.query(Auction.id).filter(
+        Auction.status == AuctionStatus.CLOSED,
+        Auction.winning_bid_id.isnot(None),
+        Auction.settled_at.is_(None)
+    )]
+    if auction_ids:
+        current_app.extensions['jobs'].enqueue_many(
+            'settle_auction', [{'auction_id': auction_id} for auction_id in auction_ids]
+        )
+        logger.info(f"Queued settlement for {len(auction_ids)} unsettled closed auctions")
+    return len(auction_ids)
+
+
+@task('charge_registration_fee', priority=PRIORITY_NORMAL)
+def charge_registration_fee(merchant_id: int):
+    from business_logic import revenue_manager
+
+    result = revenue_manager.charge_merchant_registration_fee(merchant_id)
+    if not result['success']:
+        raise JobFailed(result['message'])
+    return result
+
+
+@task('charge_premium_listing_fee', priority=PRIORITY_NORMAL)
+def charge_premium_listing_fee(item_id: int):
+    from business_logic import revenue_manager
+
+    result = revenue_manager.charge_premium_listing_fee(item_id)
+    if not result['success']:
+        raise JobFailed(result['message'])
+    return result
+
+
+@task('send_email', priority=PRIORITY_LOW, max_attempts=10)
+def send_email(to: str, subject: str, body: str, sender: str = None):
+    """One message over SMTP with the MAIL_* settings; connection errors are retried"""
+    config = current_app.config
+    message = EmailMessage()
+    message['From'] = sender or config['MAIL_DEFAULT_SENDER']
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content(body)
+
+    with smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=config.get('MAIL_TIMEOUT', 30)) as smtp:
+        if config.get('MAIL_USE_TLS'):
+            smtp.starttls()
+        if config.get('MAIL_USERNAME'):
+            smtp.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+        smtp.send_message(message)
+    logger.info(f"Email '{subject}' sent to {to}")
@@ -0,0 +1,199 @@
+"""
+Media Storage for Mzadd Platform
+Streams uploaded images to disk in chunks, stores them content-addressed
+(SHA-256) so identical uploads are kept once, and renders resized WebP
+thumbnails in a process pool off the request thread
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+
+from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# leading bytes -> extension; checked against ALLOWED_EXTENSIONS
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+
+class UploadRejected(ValueError):
+    """The upload is not an accepted image or is too large"""
+
+
+def sniff_extension(head: bytes) -> Optional[str]:
+    """Image type from its first bytes, not from the client's filename or header"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def _sharded(root: str, digest: str, name: str) -> str:
+    return os.path.join(root, digest[:2], digest[2:4], name)
+
+
+def render_thumbnails(original: str, digest: str, thumbs_root: str,
+                      sizes: Iterable[int], quality: int) -> Dict[int, str]:
+    """
+    Runs in a worker process: one WebP per size (longest side), written to a
+    temporary name and renamed so readers never see a partial file
+    """
+    from PIL import Image, ImageOps
+
+    written = {}
+    with Image.open(original) as image:
+        # JPEG only: decode at a reduced scale that still covers the largest size
+        image.draft('RGB', (max(sizes), max(sizes)))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        for size in sorted(sizes, reverse=True):
+            path = _sharded(thumbs_root, digest, f'{digest}_{size}.webp')
+            if os.path.exists(path):
+                written[size] = path
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size), Image.LANCZOS)
+            # resize the next (smaller) size from this one instead of the original
+            image = thumbnail
+            fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                thumbnail.save(f, 'WEBP', quality=quality, method=4)
+            os.replace(temporary, path)
+            written[size] = path
+    return written
+
+
+class MediaStore:
+    """Content-addressed originals plus WebP thumbnails under one root"""
+
+    def __init__(self, root: str, allowed_extensions: Iterable[str], thumbnail_sizes=(160, 480, 1024),
+                 quality: int = 80, workers: Optional[int] = None):
+        self.root = root
+        self.originals = os.path.join(root, 'originals')
+        self.thumbs = os.path.join(root, 'thumbs')
+        self.incoming = os.path.join(root, 'incoming')
+        for path in (self.originals, self.thumbs, self.incoming):
+            os.makedirs(path, exist_ok=True)
+        self.allowed_extensions = {extension.lower() for extension in allowed_extensions}
+        self.thumbnail_sizes = tuple(thumbnail_sizes)
+        self.quality = quality
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def save_stream(self, stream: BinaryIO, max_bytes: int) -> Tuple[str, str, bool]:
+        """
+        Copy `stream` to disk chunk by chunk while hashing it; the body is never
+        held in memory. Returns (digest, extension, created) where created is
+        False when the same content was already stored.
+        """
+        fd, temporary = tempfile.mkstemp(dir=self.incoming)
+        digest = hashlib.sha256()
+        size = 0
+        head = b''
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if len(head) < 16:
+                        head += chunk[:16]
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadRejected(f'Image is larger than {max_bytes} bytes')
+                    digest.update(chunk)
+                    f.write(chunk)
+            if not size:
+                raise UploadRejected('Empty upload')
+            extension = sniff_extension(head)
+            if extension not in self.allowed_extensions:
+                raise UploadRejected('Unsupported image type')
+            hexdigest = digest.hexdigest()
+            path = self.original_path(hexdigest, extension)
+            if os.path.exists(path):
+                os.unlink(temporary)
+                return hexdigest, extension, False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temporary, path)
+            return hexdigest, extension, True
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+
+    def original_path(self, digest: str, extension: str) -> str:
+        return _sharded(self.originals, digest, f'{digest}.{extension}')
+
+    def find_original(self, digest: str) -> Optional[str]:
+        for extension in self.allowed_extensions:
+            path = self.original_path(digest, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def thumbnail_path(self, digest: str, size: int) -> str:
+        return _sharded(self.thumbs, digest, f'{digest}_{size}.webp')
+
+    def generate_thumbnails(self, digest: str, extension: str) -> Future:
+        """Queue thumbnail rendering in the process pool; the caller does not wait"""
+        future = self._executor().submit(
+            render_thumbnails, self.original_path(digest, extension), digest,
+            self.thumbs, self.thumbnail_sizes, self.quality
+        )
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future: Future):
+        if future.exception() is not None:
+            logger.error(f"Thumbnail rendering failed: {future.exception()}")
+
+    def urls(self, digest: str, url_prefix: str = '/api/media') -> Dict:
+        return {
+            'original': f'{url_prefix}/{digest}',
+            'thumbnails': {size: f'{url_prefix}/{digest}/{size}.webp' for size in self.thumbnail_sizes},
+        }
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: never fork a process that holds server threads and sockets
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+
+def init_media(app: Flask) -> MediaStore:
+    root = app.config['UPLOAD_FOLDER']
+    if not os.path.isabs(root):
+        root = os.path.join(app.root_path, root)
+    store = MediaStore(
+        root, app.config['ALLOWED_EXTENSIONS'],
+        thumbnail_sizes=app.config.get('MEDIA_THUMBNAIL_SIZES', (160, 480, 1024)),
+        quality=app.config.get('MEDIA_WEBP_QUALITY', 80),
+        workers=app.config.get('MEDIA_WORKERS'),
+    )
+    app.extensions['media'] = store
+    return store
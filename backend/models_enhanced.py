@@ -1,8 +1,9 @@
 # backend/models_enhanced.py
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask import current_app
 import enum
 from extensions import db, bcrypt
+from serialization import Schema
 
 class UserRole(enum.Enum):
     ADMIN = "admin"
@@ -25,6 +26,19 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     is_verified = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_login = db.Column(db.DateTime, nullable=True)
+
+    # Merchants only: None means the platform's default commission rate
+    commission_rate = db.Column(db.Float, nullable=True)
+    total_earnings = db.Column(db.Float, default=0.0, nullable=False)
+
+    # Public fields only: never the password hash
+    __schema__ = Schema('id', 'username', 'email', 'role', 'first_name', 'last_name',
+                        'is_active', 'is_verified', 'created_at')
+
+    @property
+    def full_name(self):
+        return ' '.join(part for part in (self.first_name, self.last_name) if part) or None
 
     def set_password(self, password):
         self.password_hash = bcrypt.generate_password_hash(
@@ -34,25 +48,190 @@ class User(db.Model):
     def check_password(self, password):
         return bcrypt.check_password_hash(self.password_hash, password)
 
-# Define other models simply so the file is complete
+class ItemStatus(enum.Enum):
+    PENDING = "pending"
+    ACTIVE = "active"
+    SOLD = "sold"
+    EXPIRED = "expired"
+
+class AuctionStatus(enum.Enum):
+    SCHEDULED = "scheduled"
+    ACTIVE = "active"
+    CLOSED = "closed"
+    CANCELLED = "cancelled"
+
 class Item(db.Model):
     __tablename__ = 'item'
+    __table_args__ = (
+        db.Index('ix_item_owner', 'owner_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    category = db.Column(db.String(50), nullable=True)
+    image_url = db.Column(db.String(255), nullable=True)
+    start_price = db.Column(db.Float, nullable=False)
+    status = db.Column(db.Enum(ItemStatus), nullable=False, default=ItemStatus.PENDING)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Version for conditional GETs (http_cache): bumped on every change
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    owner = db.relationship('User', backref=db.backref('items', lazy=True))
+
+    __schema__ = Schema('id', 'name', 'description', 'category', 'image_url', 'start_price', 'status',
+                        'owner_id', 'created_at', 'updated_at')
+
+    def to_dict(self, include_owner=False):
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'category': self.category,
+            'image_url': self.image_url,
+            'start_price': self.start_price,
+            'status': self.status.value if self.status else None,
+            'owner_id': self.owner_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        if include_owner and self.owner:
+            data['owner'] = {'id': self.owner.id, 'username': self.owner.username}
+        return data
 
 class Auction(db.Model):
     __tablename__ = 'auction'
+    # Active listings and the ending-soon index read "status = active by end_time"
+    __table_args__ = (
+        db.Index('ix_auction_status_end_time', 'status', 'end_time'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    end_time = db.Column(db.DateTime, nullable=False)
+    current_price = db.Column(db.Float, nullable=False, default=0.0)
+    status = db.Column(db.Enum(AuctionStatus), nullable=False, default=AuctionStatus.SCHEDULED)
+    # bid -> auction and auction -> winning bid reference each other
+    winning_bid_id = db.Column(db.Integer, db.ForeignKey('bid.id', use_alter=True, name='fk_auction_winning_bid'),
+                               nullable=True)
+    total_bids = db.Column(db.Integer, nullable=False, default=0)
+    unique_bidders = db.Column(db.Integer, nullable=False, default=0)
+    # anti-sniping extensions so far; the policy's cap is checked against it
+    extension_count = db.Column(db.Integer, nullable=False, default=0)
+    # set in the same transaction that credits the merchant, so a retried
+    # settlement job can tell the work is already done
+    settled_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    item = db.relationship('Item', backref=db.backref('auctions', lazy=True))
+    winning_bid = db.relationship('Bid', foreign_keys=[winning_bid_id], post_update=True)
+    bids = db.relationship('Bid', foreign_keys='Bid.auction_id', back_populates='auction', lazy='dynamic')
+
+    __schema__ = Schema('id', 'item_id', 'start_time', 'end_time', 'current_price', 'status', 'winning_bid_id',
+                        'total_bids', 'unique_bidders', 'created_at', 'updated_at')
+
+    def extend_auction(self, seconds):
+        self.end_time = self.end_time + timedelta(seconds=seconds)
+        self.extension_count = (self.extension_count or 0) + 1
+
+    def to_dict(self, include_item=False, include_bids=False):
+        data = {
+            'id': self.id,
+            'item_id': self.item_id,
+            'start_time': self.start_time.isoformat() if self.start_time else None,
+            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'current_price': self.current_price,
+            'status': self.status.value if self.status else None,
+            'winning_bid_id': self.winning_bid_id,
+            'total_bids': self.total_bids,
+            'unique_bidders': self.unique_bidders,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        if include_item and self.item:
+            data['item'] = self.item.to_dict()
+        if include_bids:
+            data['bids'] = [bid.to_dict() for bid in self.bids.order_by(Bid.id.desc())]
+        return data
 
 class Bid(db.Model):
     __tablename__ = 'bid'
+    # Backstop for idempotent submission (idempotency.py): a resent bid
+    # cannot be stored twice even when the in-memory table missed it
+    __table_args__ = (
+        db.UniqueConstraint('bidder_id', 'client_bid_id', name='uq_bid_bidder_client_bid'),
+        db.Index('ix_bid_auction', 'auction_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     auction_id = db.Column(db.Integer, db.ForeignKey('auction.id'), nullable=False)
     bidder_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    is_valid = db.Column(db.Boolean, default=True, nullable=False)
+    client_bid_id = db.Column(db.String(64), nullable=True)  # NULLs never collide
+
+    auction = db.relationship('Auction', foreign_keys=[auction_id], back_populates='bids')
+    bidder = db.relationship('User')
+
+    __schema__ = Schema('id', 'auction_id', 'bidder_id', 'amount', 'timestamp', 'is_valid')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'auction_id': self.auction_id,
+            'bidder_id': self.bidder_id,
+            'amount': self.amount,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'is_valid': self.is_valid
+        }
+
+class ProxyBid(db.Model):
+    __tablename__ = 'proxy_bid'
+    __table_args__ = (
+        db.UniqueConstraint('auction_id', 'user_id', name='uq_proxy_bid_auction_user'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    auction_id = db.Column(db.Integer, db.ForeignKey('auction.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    max_amount = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class Watch(db.Model):
+    __tablename__ = 'watch'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'auction_id', name='uq_watch_user_auction'),
+        db.Index('ix_watch_auction', 'auction_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    auction_id = db.Column(db.Integer, db.ForeignKey('auction.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
 class Notification(db.Model):
     __tablename__ = 'notification'
+    # Inbox lookups are always "unread for user X, newest first"
+    __table_args__ = (
+        db.Index('ix_notification_user_unread', 'user_id', 'is_read', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    type = db.Column(db.String(30), nullable=False)  # 'outbid', 'auction_won', 'ending_soon', ...
+    title = db.Column(db.String(200), nullable=True)
+    message = db.Column(db.Text, nullable=True)
+    data = db.Column(db.JSON, nullable=True)
+    is_read = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __schema__ = Schema('id', 'type', 'title', 'message', 'data', 'is_read', 'created_at')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'title': self.title,
+            'message': self.message,
+            'data': self.data,
+            'is_read': self.is_read,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
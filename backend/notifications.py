@@ -0,0 +1,154 @@
+"""
+Notification Pipeline for Mzadd Platform
+Persists notifications to the user inbox in batches and pushes them to the
+user's live sessions through per-user Socket.IO rooms
+"""
+
+import logging
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List
+
+from flask import Flask
+from sqlalchemy import insert, update
+from models_enhanced import db, Notification
+
+logger = logging.getLogger(__name__)
+
+
+def user_room(user_id: int) -> str:
+    """Socket.IO room joined by every authenticated session of a user"""
+    return f'user_{user_id}'
+
+
+class NotificationService:
+    """
+    Producers only enqueue; one background worker batch-inserts the queued
+    notifications and pushes each of them to its user's room. Users without
+    a live session find them in their inbox on the next `authenticate`.
+
+    A batch the database rejects is retried with backoff; one that still
+    fails is kept aside in `failed` and tried again by drain(). A worker
+    that stops for any reason is replaced by the next notify().
+    """
+
+    def __init__(self, app: Flask, socketio, batch_size: int = 500, inbox_limit: int = 100,
+                 max_attempts: int = 3, retry_delay: float = 0.5, failed_limit: int = 10_000):
+        self.app = app
+        self.socketio = socketio
+        self.batch_size = batch_size
+        self.inbox_limit = inbox_limit
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay  # doubled after each failed attempt
+        self.failed: Deque[Dict] = deque(maxlen=failed_limit)  # oldest dropped past the limit
+        self._queue: "queue.Queue[Dict]" = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def notify(self, user_ids: Iterable[int], notification_data: Dict):
+        """Queue one notification per user; returns immediately"""
+        created_at = datetime.utcnow()
+        for user_id in user_ids:
+            self._queue.put({
+                'user_id': user_id,
+                'type': notification_data.get('type', 'info'),
+                'title': notification_data.get('title'),
+                'message': notification_data.get('message'),
+                'data': notification_data.get('data'),
+                'is_read': False,
+                'created_at': created_at
+            })
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = self.socketio.start_background_task(self._run)
+
+    def _run(self):
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    self.deliver(batch)
+                except Exception as e:
+                    logger.error(f"Error delivering {len(batch)} notifications: {str(e)}")
+        finally:
+            with self._worker_lock:
+                self._worker = None  # the next notify() starts a new one
+
+    def drain(self) -> int:
+        """
+        Store and push everything still queued, and what was kept aside, in
+        the caller (graceful shutdown). Returns the number stored.
+        """
+        drained = 0
+        retry = list(self.failed)
+        self.failed.clear()
+        while True:
+            batch, retry = retry[:self.batch_size], retry[self.batch_size:]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return drained
+            if self.deliver(batch):
+                drained += len(batch)
+
+    def deliver(self, batch: List[Dict]) -> bool:
+        """flush() with retries; a batch that keeps failing goes to `failed`"""
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.socketio.sleep(self.retry_delay * 2 ** (attempt - 1))
+            if self.flush(batch):
+                return True
+        logger.error(f"Keeping {len(batch)} notifications aside after {self.max_attempts} failed attempts")
+        self.failed.extend(batch)
+        return False
+
+    def flush(self, batch: List[Dict]) -> bool:
+        """Insert a batch in one statement, then push each row to its user"""
+        with self.app.app_context():
+            try:
+                ids = db.session.scalars(
+                    insert(Notification).returning(Notification.id, sort_by_parameter_order=True),
+                    batch
+                ).all()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error storing {len(batch)} notifications: {str(e)}")
+                return False
+            finally:
+                db.session.remove()
+
+        for notification_id, row in zip(ids, batch):
+            payload = dict(row, id=notification_id)
+            self.socketio.emit('notification', payload, room=user_room(payload.pop('user_id')))
+        return True
+
+    def get_unread(self, user_id: int) -> List[Dict]:
+        """A user's unread inbox, newest first, in one indexed query"""
+        notifications = Notification.query.filter_by(
+            user_id=user_id, is_read=False
+        ).order_by(Notification.created_at.desc()).limit(self.inbox_limit).all()
+        return [notification.to_dict() for notification in notifications]
+
+    def mark_read(self, user_id: int, notification_ids: List[int]) -> int:
+        result = db.session.execute(
+            update(Notification)
+            .where(Notification.user_id == user_id, Notification.id.in_(notification_ids))
+            .values(is_read=True)
+        )
+        db.session.commit()
+        return result.rowcount
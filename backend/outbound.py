@@ -0,0 +1,272 @@
+"""
+Outbound Queues for Mzadd Platform
+Emits go straight to clients that keep up. A client whose transport
+backlog reaches the watermark is skipped at delivery and gets a bounded
+queue of its own instead, drained as its backlog clears. While queued,
+price updates are conflated to the latest per auction, presence chatter
+is the first thing dropped when the queue is full, and a client that
+still overflows is disconnected with a resync hint.
+
+The check sits in the client manager (BackpressureManager), which every
+frame this process delivers passes through, including the ones other
+processes publish on the message queue.
+"""
+
+import itertools
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Set
+
+import socketio as socketio_server
+
+from wire_codec import room_auction_id
+
+logger = logging.getLogger(__name__)
+
+# Each carries the full current state, so only the latest one matters
+PRICE_EVENTS = frozenset({'new_bid', 'auction_update'})
+# Participant counts: dropped before anything else
+PRESENCE_EVENTS = frozenset({'participant_joined', 'participant_left'})
+
+DEPTH_BUCKETS = (0, 1, 16, 64, 256)
+
+
+class ConnectionQueue:
+    """Pending frames of one lagging connection, oldest first"""
+
+    __slots__ = ('entries', 'presence')
+
+    def __init__(self):
+        # key -> [event, payload, skipped]; conflatable events are keyed by
+        # (event, auction_id), everything else by a unique number
+        self.entries: 'OrderedDict' = OrderedDict()
+        self.presence: Set = set()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class OutboundHub:
+    """
+    Per-connection backpressure for auction broadcasts. `lagging` is kept
+    current by scan() (every `scan_interval` from the pump task), so a
+    broadcast only pays for the connections that are behind.
+    """
+
+    def __init__(self, socketio, max_depth: int = 256, watermark: int = 32, scan_interval: float = 0.05,
+                 on_overflow: Optional[Callable[[str], Dict]] = None):
+        self.socketio = socketio
+        self.max_depth = max_depth
+        self.watermark = watermark
+        self.scan_interval = scan_interval
+        self.on_overflow = on_overflow  # sid -> resync hint sent before the disconnect
+        self.lagging: Set[str] = set()
+        self._queues: Dict[str, ConnectionQueue] = {}
+        self._transports: Dict = {}  # sid -> Engine.IO socket, looked up once
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._running = False
+        self.counters = {'queued': 0, 'sent': 0, 'conflated': 0, 'presence_dropped': 0, 'overflow_disconnects': 0}
+
+    # -- transport backlog ------------------------------------------------
+
+    def backlog(self, sid: str) -> int:
+        """Packets waiting in the Engine.IO socket of `sid` (not yet written to the client)"""
+        socket = self._transports.get(sid)
+        if socket is None:
+            server = self.socketio.server
+            try:
+                socket = server.eio.sockets.get(server.manager.eio_sid_from_sid(sid, '/'))
+            except (AttributeError, KeyError):
+                return 0
+            if socket is None:
+                return 0
+            self._transports[sid] = socket
+        return socket.queue.qsize()
+
+    def scan(self, sids: Iterable[str]):
+        """Re-check which connections are behind"""
+        lagging = {sid for sid in sids if self.backlog(sid) >= self.watermark}
+        with self._lock:
+            lagging.update(sid for sid, queue in self._queues.items() if queue.entries)
+            self.lagging = lagging
+
+    # -- queueing -----------------------------------------------------------
+
+    def behind(self, participants) -> list:
+        """The lagging members of a room, in O(lagging connections)"""
+        if not self.lagging:
+            return []
+        with self._lock:
+            lagging = list(self.lagging)
+        return [sid for sid in lagging if sid in participants]
+
+    def push(self, sid: str, event: str, payload, auction_id=None):
+        """Queue a frame for a lagging connection, applying the conflation policy"""
+        overflow = False
+        with self._lock:
+            queue = self._queues.get(sid)
+            if queue is None:
+                queue = self._queues[sid] = ConnectionQueue()
+            self.lagging.add(sid)
+            entries = queue.entries
+            if auction_id is not None and (event in PRICE_EVENTS or event in PRESENCE_EVENTS):
+                key = ('presence' if event in PRESENCE_EVENTS else event, auction_id)
+                previous = entries.pop(key, None)
+                skipped = 0
+                if previous is not None:
+                    skipped = previous[2] + 1
+                    self.counters['conflated' if event in PRICE_EVENTS else 'presence_dropped'] += 1
+                entries[key] = [event, payload, skipped]
+                if event in PRESENCE_EVENTS:
+                    queue.presence.add(key)
+            else:
+                entries[next(self._sequence)] = [event, payload, 0]
+            self.counters['queued'] += 1
+
+            while len(entries) > self.max_depth and queue.presence:
+                entries.pop(queue.presence.pop(), None)
+                self.counters['presence_dropped'] += 1
+            if len(entries) > self.max_depth:
+                overflow = True
+                del self._queues[sid]
+                self.lagging.discard(sid)
+                self.counters['overflow_disconnects'] += 1
+        if overflow:
+            self._disconnect(sid)
+
+    def _disconnect(self, sid: str):
+        hint = self.on_overflow(sid) if self.on_overflow else {}
+        logger.warning(f"Disconnecting slow consumer {sid}: more than {self.max_depth} frames queued")
+        self.deliver(sid, 'resync_required', dict(hint, reason='slow_consumer'))
+        self.socketio.server.disconnect(sid, namespace='/')
+
+    def deliver(self, sid: str, event: str, payload):
+        """Send one frame to `sid` without going through the queues again"""
+        self.socketio.emit(event, payload, to=sid)
+
+    def attach(self, manager: 'BackpressureManager'):
+        """Apply this hub to every frame `manager` delivers"""
+        manager.outbound = self
+        self.deliver = manager.deliver
+
+    def pump(self):
+        """Move queued frames to connections whose transport backlog has room again"""
+        with self._lock:
+            ready = []
+            for sid, queue in list(self._queues.items()):
+                room = self.watermark - self.backlog(sid)
+                frames = []
+                while room > 0 and queue.entries:
+                    key, frame = queue.entries.popitem(last=False)
+                    queue.presence.discard(key)
+                    frames.append(frame)
+                    room -= 1
+                if frames:
+                    ready.append((sid, frames))
+                    self.counters['sent'] += len(frames)
+                if not queue.entries:
+                    del self._queues[sid]
+        for sid, frames in ready:
+            for event, payload, skipped in frames:
+                if skipped and isinstance(payload, dict):
+                    payload = dict(payload, conflated=skipped)  # a seq gap the client can skip over
+                self.deliver(sid, event, payload)
+
+    def discard(self, sid: str):
+        with self._lock:
+            self._queues.pop(sid, None)
+            self._transports.pop(sid, None)
+            self.lagging.discard(sid)
+
+    def start(self, connected: Callable[[], Iterable[str]]):
+        """Scan and pump in a background task; `connected` lists the live sids"""
+        self._running = True
+
+        def run():
+            while self._running:
+                self.socketio.sleep(self.scan_interval)
+                try:
+                    self.scan(connected())
+                    self.pump()
+                except Exception as e:
+                    logger.error(f"Error pumping outbound queues: {str(e)}")
+
+        self.socketio.start_background_task(run)
+
+    def stop(self):
+        self._running = False
+
+    # -- metrics --------------------------------------------------------------
+
+    def stats(self) -> Dict:
+        with self._lock:
+            depths = [len(queue) for queue in self._queues.values()]
+        histogram = {f'{low}+': 0 for low in DEPTH_BUCKETS}
+        for depth in depths:
+            low = max(bucket for bucket in DEPTH_BUCKETS if depth >= bucket)
+            histogram[f'{low}+'] += 1
+        return dict(
+            self.counters,
+            lagging=len(self.lagging),
+            queues=len(depths),
+            queued_frames=sum(depths),
+            max_depth=max(depths, default=0),
+            depth_histogram=histogram,
+            limit=self.max_depth,
+            watermark=self.watermark,
+        )
+
+
+class BackpressureManager(socketio_server.Manager):
+    """
+    Client manager that hands frames for lagging connections to the hub
+    instead of their transport. With a message queue this class sits
+    between the queue manager and Manager (see manager_class), so frames
+    relayed from other processes are covered too.
+    """
+
+    outbound: Optional[OutboundHub] = None
+
+    def emit(self, event, data, namespace, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        room = to or room
+        hub = self.outbound
+        if hub is None or callback is not None or not hub.lagging:
+            return super().emit(event, data, namespace, room=room, skip_sid=skip_sid, callback=callback, **kwargs)
+
+        skip = list(skip_sid) if isinstance(skip_sid, list) else [skip_sid]
+        members = self.rooms.get(namespace, {}).get(room, {})
+        behind = [sid for sid in hub.behind(members) if sid not in skip]
+        auction_id = room_auction_id(room)
+        for sid in behind:
+            hub.push(sid, event, data, auction_id)
+        return super().emit(event, data, namespace, room=room, skip_sid=skip + behind, callback=callback, **kwargs)
+
+    def deliver(self, sid: str, event: str, data, namespace: str = '/'):
+        """Straight to the transport of a local connection (used by the pump)"""
+        super().emit(event, data, namespace, room=sid)
+
+
+def manager_class(url: Optional[str] = None):
+    """
+    The client manager class for SOCKETIO_MESSAGE_QUEUE, picked the way
+    Flask-SocketIO picks it, with BackpressureManager mixed in.
+    """
+    if not url:
+        return BackpressureManager
+    if url.startswith(('redis://', 'rediss://')):
+        queue_class = socketio_server.RedisManager
+    elif url.startswith('kafka://'):
+        queue_class = socketio_server.KafkaManager
+    elif url.startswith('zmq'):
+        queue_class = socketio_server.ZmqManager
+    else:
+        queue_class = socketio_server.KombuManager
+    return type(f'Backpressure{queue_class.__name__}', (queue_class, BackpressureManager), {})
+
+
+def backpressure_manager(url: Optional[str] = None, channel: str = 'flask-socketio'):
+    if not url:
+        return BackpressureManager()
+    return manager_class(url)(url, channel=channel)
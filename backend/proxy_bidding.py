@@ -0,0 +1,76 @@
+"""
+Proxy Bidding Engine for Mzadd Platform
+Bidders register a maximum and the platform bids for them. Competing
+maximums are resolved in one pass when a bid arrives, so only the visible
+result is persisted and broadcast instead of one bid per automatic raise
+"""
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+
+class ProxyResolution(NamedTuple):
+    winner_id: int
+    price: float
+    visible_bids: List[Tuple[int, float]]  # (bidder_id, amount) in insertion order
+    outbid_user_ids: Set[int]
+    bidder_max: Optional[float]  # the bidder's proxy maximum to store, None without one
+
+
+class ProxyBidEngine:
+    """
+    Resolves an incoming bid against the auction's proxy maximums. Holds no
+    state: the caller reads the maximums (ProxyBid rows) in the bid's own
+    transaction and stores `bidder_max` with the bids, so every process sees
+    the same proxies and a rolled-back bid leaves nothing behind.
+    """
+
+    def __init__(self, increment_for: Callable[[int, float], float]):
+        # increment_for(auction_id, price) -> the minimum raise above `price`
+        self.increment_for = increment_for
+
+    def resolve(self, auction_id: int, current_price: float, leader_id: Optional[int],
+                proxies: Sequence[Tuple[int, float]], bidder_id: int, amount: float,
+                max_amount: Optional[float] = None) -> ProxyResolution:
+        """
+        Apply an incoming (already validated) bid. `proxies` are the live
+        (user_id, max_amount) pairs in registration order. One O(#proxies)
+        pass finds the highest and second-highest ceilings; the winner pays
+        one increment over the runner-up, capped at their own maximum. Ties
+        go to whoever registered their maximum first.
+        """
+        # (ceiling, -order) so that an equal ceiling registered earlier ranks higher
+        candidates: Dict[int, Tuple[float, int]] = {
+            user_id: (ceiling, -order) for order, (user_id, ceiling) in enumerate(proxies)
+        }
+
+        existing = candidates.get(bidder_id)
+        ceiling = max(amount, max_amount or 0, existing[0] if existing else 0)
+        bidder_max = ceiling if max_amount or existing else None
+        if existing is None or existing[0] < ceiling:
+            candidates[bidder_id] = (ceiling, -len(proxies))  # a raised maximum queues last
+        if leader_id is not None and leader_id not in candidates:
+            candidates[leader_id] = (current_price, 1)  # standing bid beats any new entry at a tie
+
+        best_id, best, second = None, None, None
+        for user_id, rank in candidates.items():
+            if best is None or rank > best:
+                best_id, best, second = user_id, rank, best
+            elif second is None or rank > second:
+                second = rank
+
+        top = best[0]
+        runner_up = second[0] if second else current_price
+        price = min(top, runner_up + self.increment_for(auction_id, runner_up))
+        if best_id == bidder_id:
+            price = max(amount, price)
+            visible_bids = [(bidder_id, price)]
+        else:
+            # the new bid is absorbed by a higher proxy: show it at its
+            # ceiling, then the proxy's answer
+            visible_bids = [(bidder_id, ceiling), (best_id, price)]
+
+        # every other candidate (previous leader, exhausted proxies) is now
+        # behind; the bidder learns the outcome from the bid confirmation
+        outbid = {user_id for user_id in candidates if user_id not in (best_id, bidder_id)}
+
+        return ProxyResolution(best_id, price, visible_bids, outbid, bidder_max)
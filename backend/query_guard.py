@@ -0,0 +1,118 @@
+"""
+N+1 Query Guard for Mzadd Platform
+Counts statements per request or socket event (through the instrumentation
+scopes) and flags handlers that exceed a statement budget or repeat the same
+statement shape, which is what a lazy load inside a loop looks like. The
+report names the call sites that issued the statements. Raises in tests,
+warns in development
+"""
+
+import logging
+import os
+import re
+import sys
+from typing import List, Optional
+
+from flask import Flask
+
+from instrumentation import QueryStats, current_query_stats, metrics
+
+logger = logging.getLogger('mzadd.query_guard')
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIPPED_FILES = ('instrumentation.py', 'query_guard.py')
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|\$\d+|:\w+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request or socket event issued too many (or too repetitive) statements"""
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text with placeholders and IN lists normalised, so repeats compare equal"""
+    shape = _PLACEHOLDER.sub('?', statement)
+    shape = _IN_LIST.sub('(?...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryGuard:
+    """Per-scope statement budget and repeated-shape detector"""
+
+    def __init__(self, mode: str = 'raise', budget: int = 30, repeat_limit: int = 5,
+                 max_call_sites: int = 3):
+        self.mode = mode  # 'raise' or 'warn'
+        self.budget = budget
+        self.repeat_limit = repeat_limit
+        self.max_call_sites = max_call_sites
+
+    def record(self, stats: QueryStats, statement: str):
+        shape = statement_shape(statement)
+        entry = stats.shapes.get(shape)
+        if entry is None:
+            entry = stats.shapes[shape] = [0, []]
+        entry[0] += 1
+        sites = entry[1]
+        if len(sites) < self.max_call_sites and entry[0] <= self.repeat_limit + 1:
+            site = self.call_site()
+            if site not in sites:
+                sites.append(site)
+
+    @staticmethod
+    def call_site() -> str:
+        """Innermost frame in this code base that is not the instrumentation itself"""
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if (filename.startswith(BACKEND_DIR) and 'site-packages' not in filename
+                    and os.path.basename(filename) not in _SKIPPED_FILES):
+                return f'{os.path.relpath(filename, BACKEND_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}'
+            frame = frame.f_back
+        return '<outside the backend>'
+
+    def violations(self, stats: QueryStats) -> List[str]:
+        budget, repeat_limit = self.budget, self.repeat_limit
+        if stats.budget:
+            budget = stats.budget[0] or budget
+            repeat_limit = stats.budget[1] or repeat_limit
+        problems = []
+        if stats.count > budget:
+            problems.append(f'{stats.count} statements (budget {budget})')
+        for shape, (count, sites) in sorted(stats.shapes.items(), key=lambda item: -item[1][0]):
+            if count > repeat_limit:
+                problems.append(
+                    f'{count}x the same statement (limit {repeat_limit}): {shape[:300]}\n'
+                    + '\n'.join(f'      at {site}' for site in sites)
+                )
+        return problems
+
+    def check(self, stats: Optional[QueryStats]):
+        if stats is None or stats.shapes is None:
+            return
+        problems = self.violations(stats)
+        if not problems:
+            return
+        report = f'Query budget exceeded in {stats.name}:\n' + '\n'.join(f'  - {problem}' for problem in problems)
+        if self.mode == 'raise':
+            raise QueryBudgetExceeded(report)
+        logger.warning(report)
+
+
+def init_query_guard(app: Flask):
+    """
+    Enable the guard from QUERY_GUARD_MODE ('raise', 'warn' or 'off').
+    Needs instrumentation, which opens the per-request/event scopes.
+    """
+    mode = app.config.get('QUERY_GUARD_MODE', 'off')
+    if mode == 'off' or 'metrics' not in app.extensions:
+        metrics.guard = None
+        return
+    metrics.guard = QueryGuard(mode, app.config.get('QUERY_BUDGET', 30),
+                               app.config.get('QUERY_REPEAT_LIMIT', 5))
+
+    @app.after_request
+    def check_query_budget(response):
+        if metrics.guard is not None:
+            metrics.guard.check(current_query_stats())
+        return response
@@ -0,0 +1,395 @@
+# backend/seed_bulk.py
+"""
+Bulk Synthetic Data Generator for Mzadd Platform
+Generates users, items, auctions and bids with realistic (skewed)
+distributions and writes them with Core executemany inserts in large
+transactions, with secondary indexes dropped during the load and rebuilt
+afterwards. Row generation can be spread over worker processes while a
+single connection writes.
+
+    python seed_bulk.py --users 1000000 --items 5000000 --auctions 4000000 \\
+        --bids 50000000 --processes 8
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from bisect import bisect
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import insert, text
+
+from bid_policy import IncrementLadder
+from config import Config
+from extensions import bcrypt
+from models_enhanced import db, User, Item, Auction, Bid, UserRole, ItemStatus, AuctionStatus
+
+# Bump when the generated data changes so cached benchmark datasets are rebuilt
+GENERATOR_VERSION = 3
+
+BATCH_SIZE = 10000
+COMMIT_EVERY = 500000  # rows per transaction
+SEED_PASSWORD = 'password{}'  # user n logs in with password{n % hash pool size}
+
+# category -> (weight, median price in KWD); prices are log-normal around the median
+CATEGORIES = {
+    'Electronics': (20, 120), 'Fashion': (15, 40), 'Furniture': (10, 90),
+    'Collectibles': (10, 60), 'Watches': (8, 400), 'Jewelry': (8, 300),
+    'Art': (6, 250), 'Cars': (4, 4000), 'Real Estate': (1, 60000), 'Other': (18, 30),
+}
+
+
+def password_hashes(count: int = 8, rounds: Optional[int] = None, processes: int = 1) -> List[str]:
+    """
+    Precompute a small pool of real bcrypt hashes (at the configured cost) in
+    parallel; users cycle through the pool instead of hashing per row.
+    """
+    rounds = rounds or Config.BCRYPT_LOG_ROUNDS
+    passwords = [SEED_PASSWORD.format(n) for n in range(count)]
+    if processes > 1:
+        with ProcessPoolExecutor(processes) as pool:
+            return list(pool.map(_hash_password, passwords, [rounds] * count))
+    return [_hash_password(password, rounds) for password in passwords]
+
+
+def _hash_password(password: str, rounds: int) -> str:
+    return bcrypt.generate_password_hash(password, rounds).decode('utf-8')
+
+
+def batched(rows: Iterable[Dict], size: int = BATCH_SIZE) -> Iterator[List[Dict]]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert_rows(connection, model, rows: Iterable[Dict], batch_size: int = BATCH_SIZE) -> int:
+    """executemany INSERT in batches on an open transaction; returns the row count"""
+    count = 0
+    statement = insert(model.__table__)
+    for batch in batched(rows, batch_size):
+        connection.execute(statement, batch)
+        count += len(batch)
+    return count
+
+
+def _next_id(connection, model) -> int:
+    return (connection.execute(text(f'SELECT MAX(id) FROM {model.__tablename__}')).scalar() or 0) + 1
+
+
+@contextmanager
+def deferred_indexes(connection, models):
+    """
+    Drop the secondary indexes of `models` for the load and rebuild them once
+    at the end, also when the load fails. The DDL runs in transactions of its
+    own, so `connection` must not be inside one on entry or exit.
+    """
+    indexes = [index for model in models for index in model.__table__.indexes]
+    with connection.begin():
+        for index in indexes:
+            index.drop(connection, checkfirst=True)
+    try:
+        yield
+    finally:
+        with connection.begin():
+            for index in indexes:
+                index.create(connection, checkfirst=True)
+
+
+class Progress:
+    """Per-table row counts and rates, printed at most every `interval` seconds"""
+
+    def __init__(self, totals: Dict[str, int], interval: float = 2.0, stream=sys.stderr):
+        self.totals = totals
+        self.counts = dict.fromkeys(totals, 0)
+        self.interval = interval
+        self.stream = stream
+        self.started = self._last = time.perf_counter()
+
+    def update(self, table: str, rows: int):
+        self.counts[table] = self.counts.get(table, 0) + rows
+        now = time.perf_counter()
+        if now - self._last >= self.interval:
+            self._last = now
+            self.report()
+
+    def report(self, final: bool = False):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        parts = []
+        for table, total in self.totals.items():
+            count = self.counts.get(table, 0)
+            share = f'/{total:,} ({count / total:.0%})' if total else ''
+            parts.append(f'{table} {count:,}{share}')
+        rows = sum(self.counts.values())
+        label = 'done' if final else 'seeding'
+        print(f'[{label} {elapsed:7.1f}s] ' + ', '.join(parts) + f' | {rows / elapsed:,.0f} rows/s',
+              file=self.stream, flush=True)
+
+
+# --- row generation ------------------------------------------------------------
+# Chunks are generated from (plan, chunk index) alone, so any process can build
+# any chunk and the output does not depend on the number of processes.
+
+def _zipf_cumulative(n: int, s: float) -> List[float]:
+    return list(accumulate(1.0 / rank ** s for rank in range(1, n + 1)))
+
+
+def _pick(rng, ids_start: int, cumulative: List[float]) -> int:
+    return ids_start + bisect(cumulative, rng.random() * cumulative[-1])
+
+
+_plan: Dict = {}
+_tables: Dict = {}
+
+
+def _init_worker(plan: Dict):
+    """Per-process state: the plan plus lookup tables built once per process"""
+    _plan.clear()
+    _plan.update(plan)
+    _tables['merchants'] = _zipf_cumulative(plan['merchants'], 1.0)  # a few big merchants
+    _tables['bidders'] = _zipf_cumulative(plan['bidders'], 0.8)  # a few very active bidders
+    _tables['categories'] = list(CATEGORIES)
+    _tables['category_weights'] = list(accumulate(weight for weight, _ in CATEGORIES.values()))
+    _tables['ladder'] = IncrementLadder(Config.BID_INCREMENT_LADDER or [(0, Config.MIN_BID_INCREMENT)])
+
+
+def _user_chunk(chunk: int) -> List[Dict]:
+    plan = _plan
+    rng = random.Random(f"{plan['seed']}:users:{chunk}")
+    first = plan['first_user'] + chunk * BATCH_SIZE
+    last = min(first + BATCH_SIZE, plan['first_user'] + plan['users'])
+    hashes = plan['hashes']
+    rows = []
+    for user_id in range(first, last):
+        is_merchant = user_id < plan['first_bidder']
+        rows.append({
+            'id': user_id,
+            'username': f'seed_{user_id}',
+            'email': f'seed_{user_id}@example.com',
+            'password_hash': hashes[user_id % len(hashes)],
+            'role': UserRole.MERCHANT if is_merchant else UserRole.BIDDER,
+            'first_name': 'Seed',
+            'last_name': str(user_id),
+            'is_active': rng.random() > 0.02,
+            'is_verified': rng.random() > 0.3,
+            'commission_rate': rng.choice((0.03, 0.04, 0.05, 0.05, 0.05, 0.07)) if is_merchant else None,
+            # sign-ups grow over the last two years
+            'created_at': plan['now'] - timedelta(days=730 * (1 - rng.random() ** 0.5)),
+        })
+    return rows
+
+
+def _item_chunk(chunk: int):
+    """
+    Items of one chunk, plus their auctions and bids for items that were
+    auctioned (the first `auctions` items). Returns (items, auctions, bids).
+    """
+    plan, tables = _plan, _tables
+    rng = random.Random(f"{plan['seed']}:items:{chunk}")
+    now, days, ladder = plan['now'], plan['days'], tables['ladder']
+    first = plan['first_item'] + chunk * BATCH_SIZE
+    last = min(first + BATCH_SIZE, plan['first_item'] + plan['items'])
+    items, auctions, bids = [], [], []
+    for item_id in range(first, last):
+        category = tables['categories'][bisect(tables['category_weights'],
+                                               rng.random() * tables['category_weights'][-1])]
+        start_price = round(CATEGORIES[category][1] * rng.lognormvariate(0, 0.8), 2)
+        items.append({
+            'id': item_id,
+            'name': f'{category} item {item_id}',
+            'description': 'Synthetic item',
+            'category': category,
+            'start_price': start_price,
+            'owner_id': _pick(rng, plan['first_user'], tables['merchants']),
+            'status': ItemStatus.ACTIVE,
+        })
+
+        offset = item_id - plan['first_item']
+        if offset >= plan['auctions']:
+            continue
+        auction_id = plan['first_auction'] + offset
+        closed = rng.random() < plan['closed_ratio']
+        if closed:
+            end_time = now - timedelta(days=rng.uniform(0, days))
+        else:
+            end_time = now + timedelta(hours=rng.uniform(1, 72))
+        start_time = end_time - timedelta(days=rng.choice((1, 3, 3, 7, 7, 7, 14)))
+        # heavy-tailed popularity: most auctions draw a few bids, some draw hundreds
+        bid_count = int(rng.gammavariate(0.6, plan['bids_per_auction'] / 0.6))
+        if not closed:
+            bid_count = int(bid_count * rng.random())  # still running
+        price = start_price
+        bidders_seen = set()
+        bid_window = min(end_time, now) - start_time
+        positions = sorted(rng.betavariate(2.0, 0.7) for _ in range(bid_count))  # bunched near the end
+        for position in positions:
+            bidder_id = _pick(rng, plan['first_bidder'], tables['bidders'])
+            bidders_seen.add(bidder_id)
+            price = round(price + ladder.increment_for(price) * rng.choice((1, 1, 1, 2, 5)), 2)
+            bids.append({
+                'auction_id': auction_id,
+                'bidder_id': bidder_id,
+                'amount': price,
+                'timestamp': start_time + bid_window * position,
+                'is_valid': True,
+            })
+        auctions.append({
+            'id': auction_id,
+            'item_id': item_id,
+            'start_time': start_time,
+            'end_time': end_time,
+            'current_price': price,
+            'status': AuctionStatus.CLOSED if closed else AuctionStatus.ACTIVE,
+            'winning_bid_id': None,  # linked once the bids exist
+            'total_bids': bid_count,
+            'unique_bidders': len(bidders_seen),
+            'created_at': start_time,
+            'updated_at': end_time if closed else start_time,
+        })
+    return items, auctions, bids
+
+
+def _chunks(function, count: int, plan: Dict, processes: int, in_flight: Optional[int] = None):
+    """
+    Yield function(0..count-1) in order, built in `processes` worker processes.
+    At most `in_flight` chunks (default 2 per process) are submitted ahead of
+    the one being written, so generation cannot outrun the single writer and
+    buffer the whole dataset in memory.
+    """
+    if processes <= 1:
+        _init_worker(plan)
+        for chunk in range(count):
+            yield function(chunk)
+        return
+    in_flight = in_flight or processes * 2
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(plan,)) as pool:
+        pending = deque()
+        submitted = 0
+        while pending or submitted < count:
+            while submitted < count and len(pending) < in_flight:
+                pending.append(pool.submit(function, submitted))
+                submitted += 1
+            yield pending.popleft().result()
+
+
+def generate(connection, auctions: int, users: Optional[int] = None, items: Optional[int] = None,
+             bids: Optional[int] = None, merchant_ratio: float = 0.02, closed_ratio: float = 0.8,
+             days: int = 30, seed: int = 42, processes: int = 1, hashes: Optional[List[str]] = None,
+             defer_indexes: bool = True, commit_every: int = COMMIT_EVERY,
+             progress: Optional[Progress] = None) -> Dict[str, int]:
+    """
+    Write a synthetic dataset through `connection` (not in a transaction;
+    one is committed every `commit_every` rows). Ids are assigned here so
+    items, auctions and bids link without round trips.
+    """
+    users = users or max(auctions // 5, 20)
+    items = max(items or auctions, auctions)
+    bids = auctions * 8 if bids is None else bids
+    merchants = max(int(users * merchant_ratio), 1)
+    with connection.begin():
+        first_user, first_item, first_auction = (_next_id(connection, model) for model in (User, Item, Auction))
+    plan = {
+        'seed': seed, 'now': datetime.utcnow(), 'days': days, 'closed_ratio': closed_ratio,
+        'users': users, 'merchants': merchants, 'bidders': users - merchants,
+        'first_user': first_user, 'first_bidder': first_user + merchants,
+        'items': items, 'first_item': first_item,
+        'auctions': auctions, 'first_auction': first_auction,
+        'bids_per_auction': bids / auctions if auctions else 0,
+        'hashes': hashes or password_hashes(processes=processes),
+    }
+    progress = progress or Progress({'users': users, 'items': items, 'auctions': auctions, 'bids': bids})
+    counts = dict.fromkeys(('users', 'items', 'auctions', 'bids'), 0)
+    models = (User, Item, Auction, Bid)
+
+    transaction = None
+    pending = 0
+
+    def written(table, rows):
+        nonlocal transaction, pending
+        counts[table] += rows
+        progress.update(table, rows)
+        pending += rows
+        if pending >= commit_every:
+            transaction.commit()
+            transaction = connection.begin()
+            pending = 0
+
+    with deferred_indexes(connection, models) if defer_indexes else _no_op():
+        transaction = connection.begin()
+        try:
+            user_chunks = -(-users // BATCH_SIZE)
+            for rows in _chunks(_user_chunk, user_chunks, plan, processes):
+                written('users', insert_rows(connection, User, rows))
+            item_chunks = -(-items // BATCH_SIZE)
+            for item_rows, auction_rows, bid_rows in _chunks(_item_chunk, item_chunks, plan, processes):
+                written('items', insert_rows(connection, Item, item_rows))
+                written('auctions', insert_rows(connection, Auction, auction_rows))
+                written('bids', insert_rows(connection, Bid, bid_rows))
+            transaction.commit()
+        except Exception:
+            transaction.rollback()
+            raise
+    # bids are inserted in rising amount per auction, so the highest id is the
+    # winning bid; one set-based statement links them all (after the rebuild:
+    # it looks up bids by auction)
+    with connection.begin():
+        connection.execute(text(
+            'UPDATE auction SET winning_bid_id = '
+            '(SELECT MAX(bid.id) FROM bid WHERE bid.auction_id = auction.id) '
+            'WHERE status = :closed AND id >= :first AND total_bids > 0'
+        ), {'closed': AuctionStatus.CLOSED.name, 'first': first_auction})
+    progress.report(final=True)
+    return counts
+
+
+@contextmanager
+def _no_op():
+    yield
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-load a synthetic Mzadd dataset')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--items', type=int, default=500000)
+    parser.add_argument('--auctions', type=int, default=400000)
+    parser.add_argument('--bids', type=int, default=5000000)
+    parser.add_argument('--merchant-ratio', type=float, default=0.02)
+    parser.add_argument('--closed-ratio', type=float, default=0.8)
+    parser.add_argument('--days', type=int, default=30, help='closed auctions end within the last N days')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--hash-pool', type=int, default=8, help='distinct bcrypt hashes to precompute')
+    parser.add_argument('--commit-every', type=int, default=COMMIT_EVERY)
+    parser.add_argument('--keep-indexes', action='store_true', help='do not drop indexes during the load')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from app import create_app
+    from config import config
+    app = create_app(config[os.environ.get('FLASK_CONFIG', 'development')])
+    with app.app_context():
+        db.create_all()
+        hashes = password_hashes(args.hash_pool, app.config.get('BCRYPT_LOG_ROUNDS'), args.processes)
+        started = time.perf_counter()
+        with db.engine.connect() as connection:
+            counts = generate(
+                connection, args.auctions, users=args.users, items=args.items, bids=args.bids,
+                merchant_ratio=args.merchant_ratio, closed_ratio=args.closed_ratio, days=args.days,
+                seed=args.seed, processes=args.processes, hashes=hashes,
+                defer_indexes=not args.keep_indexes, commit_every=args.commit_every
+            )
+        elapsed = time.perf_counter() - started
+        print(f"✅ Inserted {counts} in {elapsed:.1f}s")
+        print(f"   Users log in as seed_<id> with password{{<id> % {len(hashes)}}}")
+
+
+if __name__ == '__main__':
+    main()
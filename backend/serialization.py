@@ -0,0 +1,160 @@
+"""
+JSON Serialization for Mzadd Platform
+One serializer for Flask responses and Socket.IO packets: orjson when it is
+installed (the standard library otherwise), with datetimes, Decimals and
+enums (UserRole, AuctionStatus, ...) handled natively, and models
+serialized through precompiled schemas instead of hand-built dicts
+"""
+
+import enum
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable
+
+from flask import Flask
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # the standard library is the fallback
+    orjson = None
+
+
+class Many:
+    """Marks a nested schema field as a collection"""
+
+    def __init__(self, schema: 'Schema'):
+        self.schema = schema
+
+
+class Schema:
+    """
+    Field list compiled once into a single function that builds the dict,
+    e.g. Schema('id', 'name', owner=Schema('id', 'username'), bids=Many(bid_schema)).
+    Values are left as they are (datetimes, enums, Decimals): the serializer
+    encodes them, so there are no per-field isoformat() calls.
+    """
+
+    def __init__(self, *fields: str, **nested):
+        self.fields = fields
+        self.nested = nested
+        self.dump = self._compile()
+
+    def only(self, *fields: str) -> 'Schema':
+        """A schema over a subset of this one's fields (e.g. without heavy nested lists)"""
+        return Schema(*(field for field in self.fields if field in fields),
+                      **{name: value for name, value in self.nested.items() if name in fields})
+
+    def extend(self, *fields: str, **nested) -> 'Schema':
+        return Schema(*self.fields, *fields, **{**self.nested, **nested})
+
+    def dump_many(self, objects: Iterable) -> list:
+        dump = self.dump
+        return [dump(obj) for obj in objects]
+
+    def _compile(self) -> Callable[[Any], Dict]:
+        namespace = {}
+        entries = [f'{name!r}: obj.{name}' for name in self.fields]
+        for name, value in self.nested.items():
+            if isinstance(value, Many):
+                namespace[f'_{name}'] = value.schema.dump
+                entries.append(f'{name!r}: [_{name}(child) for child in obj.{name}]')
+            else:
+                namespace[f'_{name}'] = value.dump
+                entries.append(f'{name!r}: (None if obj.{name} is None else _{name}(obj.{name}))')
+        source = 'def dump(obj):\n    return {' + ', '.join(entries) + '}\n'
+        exec(compile(source, f'<schema {", ".join(self.fields)}>', 'exec'), namespace)
+        return namespace['dump']
+
+
+def _default(value):
+    """Types neither orjson nor json handle on their own"""
+    schema = getattr(type(value), '__schema__', None)
+    if schema is not None:
+        return schema.dump(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _stdlib_dumps(value: Any, sort_keys: bool = False) -> bytes:
+    return json.dumps(value, default=_default, sort_keys=sort_keys, separators=(',', ':'),
+                      ensure_ascii=False).encode()
+
+
+def _orjson_dumps(value: Any, sort_keys: bool = False) -> bytes:
+    option = orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(value, default=_default, option=option)
+
+
+BACKENDS = {'stdlib': (_stdlib_dumps, json.loads)}
+if orjson is not None:
+    BACKENDS['orjson'] = (_orjson_dumps, orjson.loads)
+
+_dumps_bytes, _loads = BACKENDS.get('orjson', BACKENDS['stdlib'])
+
+
+def use_backend(name: str) -> str:
+    """Select 'orjson' or 'stdlib'; orjson falls back to stdlib when it is not installed"""
+    global _dumps_bytes, _loads
+    if name not in BACKENDS:
+        name = 'stdlib'
+    _dumps_bytes, _loads = BACKENDS[name]
+    return name
+
+
+def dumps_bytes(value: Any, sort_keys: bool = False) -> bytes:
+    return _dumps_bytes(value, sort_keys)
+
+
+def loads(s) -> Any:
+    return _loads(s)
+
+
+def dumps(value: Any, **kwargs) -> str:
+    """str output; accepts (and ignores) the stdlib keyword arguments callers pass"""
+    return dumps_bytes(value, kwargs.get('sort_keys', False)).decode()
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider: jsonify() and request.get_json() through this serializer"""
+
+    sort_keys = False
+    mimetype = 'application/json'
+
+    def dumps(self, obj: Any, **kwargs) -> str:
+        return dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys))
+
+    def loads(self, s, **kwargs) -> Any:
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # bytes straight into the response, no str round trip
+        return self._app.response_class(dumps_bytes(obj, self.sort_keys), mimetype=self.mimetype)
+
+
+class SocketIOJSON:
+    """`json` module for python-socketio packets (Flask-SocketIO `json=` option)"""
+
+    dumps = staticmethod(dumps)
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return loads(s)
+
+
+def init_serialization(app: Flask) -> JSONProvider:
+    """Install the provider with the JSON_SERIALIZER backend ('orjson' or 'stdlib')"""
+    app.config['JSON_SERIALIZER'] = use_backend(app.config.get('JSON_SERIALIZER', 'orjson'))
+    app.json = FastJSONProvider(app)
+    return app.json
@@ -0,0 +1,72 @@
+# backend/serve.py
+"""
+Production launcher: runs SERVER_PROCESSES gunicorn masters (one Socket.IO
+worker each) on consecutive ports starting at SERVER_BASE_PORT. nginx.conf
+balances them with sticky sessions.
+
+Signals:
+    SIGHUP          rolling reload, one process at a time, so the other
+                    processes keep serving while each one drains
+    SIGTERM/SIGINT  graceful shutdown of every process
+"""
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from config import Config
+
+
+def start_process(port):
+    env = dict(os.environ, GUNICORN_BIND=f'{os.environ.get("SERVER_BIND_HOST", "0.0.0.0")}:{port}')
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+
+def main():
+    ports = [Config.SERVER_BASE_PORT + i for i in range(Config.SERVER_PROCESSES)]
+    processes = {port: start_process(port) for port in ports}
+    print(f"Serving with async_mode={Config.SOCKETIO_ASYNC_MODE} on ports {ports}")
+
+    state = {'stopping': False, 'reload': False}
+
+    def on_reload(signum, frame):
+        state['reload'] = True
+
+    def on_stop(signum, frame):
+        state['stopping'] = True
+
+    signal.signal(signal.SIGHUP, on_reload)
+    signal.signal(signal.SIGTERM, on_stop)
+    signal.signal(signal.SIGINT, on_stop)
+
+    while not state['stopping']:
+        if state['reload']:
+            state['reload'] = False
+            for port, proc in processes.items():
+                # gunicorn starts the new worker before draining the old one
+                proc.send_signal(signal.SIGHUP)
+                time.sleep(Config.SERVER_GRACEFUL_TIMEOUT / max(len(processes), 1))
+
+        for port, proc in list(processes.items()):
+            if proc.poll() is not None:
+                print(f"Process on port {port} exited with {proc.returncode}, restarting")
+                processes[port] = start_process(port)
+        time.sleep(1)
+
+    for proc in processes.values():
+        proc.send_signal(signal.SIGTERM)
+    deadline = time.monotonic() + Config.SERVER_GRACEFUL_TIMEOUT + 5
+    for proc in processes.values():
+        try:
+            proc.wait(timeout=max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+pytest fixtures over the shared template database (see db_fixtures.py):
+
+    def test_something(db_session, shared_users): ...
+
+Run in parallel with `pytest -n auto tests` (pytest-xdist).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_fixtures import SHARED_USERS, TemplateTestingConfig, Transaction
+
+
+@pytest.fixture(scope='module')
+def template_app():
+    from app import create_app
+    return create_app(TemplateTestingConfig)
+
+
+@pytest.fixture
+def db_session(template_app):
+    """A session whose commits are rolled back after the test"""
+    transaction = Transaction(template_app)
+    session = transaction.begin()
+    yield session
+    transaction.rollback()
+
+
+@pytest.fixture
+def shared_users(db_session):
+    from models_enhanced import User
+    return {user.username: user for user in User.query.filter(User.username.in_(SHARED_USERS))}
@@ -0,0 +1,198 @@
+"""
+Shared Database Fixtures for the Mzadd Test Suite
+The schema and the shared fixture rows are built once into a template
+SQLite file (rebuilt only when the schema or FIXTURE_VERSION changes);
+every test process clones it into memory, and every test runs inside a
+transaction that is rolled back, with the code under test's commits turned
+into SAVEPOINT releases. Safe under pytest-xdist: the template is built
+under a file lock and each worker has its own in-memory clone.
+
+db.session itself is never replaced: only its registry is pointed at
+sessions bound to the test's connection, and those sessions subclass the
+app's session class, so listeners registered on db.session (ending_soon,
+instrumentation) keep firing inside tests.
+"""
+
+import fcntl
+import hashlib
+import os
+import sqlite3
+import unittest
+
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.util import ScopedRegistry
+from sqlalchemy.schema import CreateTable
+
+from app import create_app
+from config import TestingConfig
+from models_enhanced import User, UserRole, db
+
+FIXTURE_VERSION = 1
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.db_template')
+
+# username -> (email, role, password); available as self.users[username]
+SHARED_USERS = {
+    'admin_test': ('admin@test.com', UserRole.ADMIN, 'admin123'),
+    'merchant_test': ('merchant@test.com', UserRole.MERCHANT, 'merchant123'),
+    'bidder_test': ('bidder@test.com', UserRole.BIDDER, 'bidder123'),
+}
+
+
+def load_shared_fixtures():
+    for username, (email, role, password) in SHARED_USERS.items():
+        user = User(username=username, email=email, role=role, first_name=username.split('_')[0].title(),
+                    last_name='User', is_active=True, is_verified=True)
+        user.set_password(password)
+        db.session.add(user)
+    db.session.commit()
+
+
+def schema_digest() -> str:
+    """Changes whenever a model's DDL or the fixture set changes"""
+    from sqlalchemy.dialects import sqlite
+    ddl = [str(CreateTable(table).compile(dialect=sqlite.dialect())) for table in db.metadata.sorted_tables]
+    return hashlib.sha256('\n'.join(ddl + [str(FIXTURE_VERSION)]).encode()).hexdigest()[:16]
+
+
+def template_path() -> str:
+    """The template file, built by whichever process gets the lock first"""
+    os.makedirs(TEMPLATE_DIR, exist_ok=True)
+    path = os.path.join(TEMPLATE_DIR, f'template_{schema_digest()}.db')
+    if os.path.exists(path):
+        return path
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(path):
+            _build_template(path)
+    return path
+
+
+def _build_template(path):
+    partial = f'{path}.{os.getpid()}.partial'
+    uri = f'sqlite:///{partial}'
+
+    class TemplateBuildConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        SQLITE_JOURNAL_MODE = 'DELETE'  # a single self-contained file
+
+    app = create_app(TemplateBuildConfig)
+    with app.app_context():
+        db.create_all()
+        load_shared_fixtures()
+        db.session.remove()
+        db.engine.dispose()
+    os.replace(partial, path)
+
+
+_master = None
+
+
+def clone_template() -> sqlite3.Connection:
+    """
+    A private in-memory copy of the template. The file is read once per
+    process; later clones are memory-to-memory backups.
+    """
+    global _master
+    if _master is None:
+        source = sqlite3.connect(template_path())
+        _master = sqlite3.connect(':memory:', check_same_thread=False)
+        source.backup(_master)
+        source.close()
+    connection = sqlite3.connect(':memory:', check_same_thread=False)
+    _master.backup(connection)
+    # SQLAlchemy issues BEGIN itself (see _enable_savepoints)
+    connection.isolation_level = None
+    return connection
+
+
+class TemplateTestingConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {'creator': clone_template, 'poolclass': StaticPool}
+
+
+def _emit_begin(connection):
+    connection.exec_driver_sql('BEGIN')
+
+
+def _enable_savepoints(engine):
+    """pysqlite defers BEGIN on its own; emit it so SAVEPOINTs nest properly"""
+    if not event.contains(engine, 'begin', _emit_begin):
+        event.listen(engine, 'begin', _emit_begin)
+
+
+class _ConnectionBound:
+    """Sends every statement to the test's connection, inside its outer transaction"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        return self.bind
+
+
+_session_classes = {}
+
+
+def connection_session_class(factory_class):
+    """
+    A subclass of db.session's own session class: session events listened
+    for on db.session are registered on that class and reach subclasses too
+    """
+    session_class = _session_classes.get(factory_class)
+    if session_class is None:
+        session_class = _session_classes[factory_class] = type(
+            'ConnectionSession', (_ConnectionBound, factory_class), {})
+    return session_class
+
+
+class Transaction:
+    """
+    Outer transaction around one test: commits made by the code under test
+    only release SAVEPOINTs, and rollback() discards everything
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def begin(self):
+        self.context = self.app.app_context()
+        self.context.push()
+        _enable_savepoints(db.engine)
+        self.connection = db.engine.connect()
+        self.transaction = self.connection.begin()
+
+        factory = db.session.session_factory
+        session_class = connection_session_class(factory.class_)
+        options = dict(factory.kw, bind=self.connection, join_transaction_mode='create_savepoint')
+        db.session.remove()
+        self.original_registry = db.session.registry
+        db.session.registry = ScopedRegistry(lambda: session_class(**options), self.original_registry.scopefunc)
+        return db.session
+
+    def rollback(self):
+        db.session.remove()
+        db.session.registry = self.original_registry
+        self.transaction.rollback()
+        self.connection.close()
+        self.context.pop()
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    One app and one in-memory template clone per test class; each test
+    runs in its own rolled-back transaction with the shared fixtures loaded.
+    """
+
+    config_class = TemplateTestingConfig
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.app = create_app(cls.config_class)
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.app.test_client()
+        self._transaction = Transaction(self.app)
+        self.session = self._transaction.begin()
+        self.addCleanup(self._transaction.rollback)
+        self.users = {user.username: user for user in User.query.filter(User.username.in_(SHARED_USERS))}
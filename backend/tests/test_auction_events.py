@@ -0,0 +1,152 @@
+"""
+Tests for auction event sequencing and resync (auction_events)
+"""
+
+import unittest
+
+from auction_events import AuctionEventLog, SharedAuctionEventLog, open_event_log
+
+
+class TestAuctionEventLog(unittest.TestCase):
+    """Sequence numbers, gap detection and snapshot fallback"""
+
+    def setUp(self):
+        self.log = AuctionEventLog(max_events_per_auction=3)
+
+    def test_sequence_is_per_auction_and_monotonic(self):
+        self.assertEqual(self.log.append(1, 'new_bid', {'amount': 105}), 1)
+        self.assertEqual(self.log.append(1, 'new_bid', {'amount': 110}), 2)
+        self.assertEqual(self.log.append(2, 'new_bid', {'amount': 50}), 1)
+        self.assertEqual(self.log.current_seq(1), 2)
+
+    def test_missed_events_are_returned(self):
+        for amount in (105, 110, 115):
+            self.log.append(1, 'new_bid', {'amount': amount})
+        missed = self.log.since(1, 1, self.log.epoch)
+        self.assertEqual([entry['seq'] for entry in missed], [2, 3])
+        self.assertEqual(missed[-1]['data']['amount'], 115)
+        self.assertEqual(self.log.since(1, 3, self.log.epoch), [])
+
+    def test_gap_older_than_log_requires_snapshot(self):
+        for amount in range(5):
+            self.log.append(1, 'new_bid', {'amount': amount})
+        self.assertIsNone(self.log.since(1, 1, self.log.epoch))
+        self.assertIsNotNone(self.log.since(1, 2, self.log.epoch))
+
+    def test_other_epoch_or_unknown_auction_requires_snapshot(self):
+        self.log.append(1, 'new_bid', {'amount': 105})
+        self.assertIsNone(self.log.since(1, 1, 'stale-epoch'))
+        self.assertIsNone(self.log.since(99, 0, self.log.epoch))
+        self.assertIsNone(self.log.since(1, 5, self.log.epoch))
+
+    def test_last_seq_that_is_not_a_number_requires_snapshot(self):
+        self.log.append(1, 'new_bid', {'amount': 105})
+        for last_seq in ('abc', [0], {}, True):
+            self.assertIsNone(self.log.since(1, last_seq, self.log.epoch))
+        self.assertEqual(self.log.since(1, '1', self.log.epoch), [])
+
+    def test_discarded_auction_requires_snapshot(self):
+        self.log.append(1, 'new_bid', {'amount': 105})
+        self.log.append(1, 'auction_ended', {})
+        self.log.discard(1)
+        self.assertIsNone(self.log.since(1, 1, self.log.epoch))
+
+
+class FakeRedis:
+    """The handful of Redis commands SharedAuctionEventLog uses, in memory"""
+
+    def __init__(self):
+        self.values = {}
+        self.sorted_sets = {}
+
+    def set(self, key, value, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def incr(self, key):
+        value = int(self.values.get(key, 0)) + 1
+        self.values[key] = str(value).encode()
+        return value
+
+    def zadd(self, key, mapping):
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyrank(self, key, start, stop):
+        members = sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: item[1])
+        for member, _ in members[start:max(len(members) + stop + 1, 0) if stop < 0 else stop + 1]:
+            del self.sorted_sets[key][member]
+
+    def zrangebyscore(self, key, low, high):
+        high = float(high)
+        members = sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: item[1])
+        return [member for member, score in members if low <= score <= high]
+
+    def delete(self, key):
+        self.sorted_sets.pop(key, None)
+        self.values.pop(key, None)
+
+    def flushall(self):
+        self.values.clear()
+        self.sorted_sets.clear()
+
+
+class TestSharedAuctionEventLog(unittest.TestCase):
+    """Two server processes numbering the same auction's events"""
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.first = SharedAuctionEventLog(self.redis, max_events_per_auction=3)
+        self.second = SharedAuctionEventLog(self.redis, max_events_per_auction=3)
+
+    def test_processes_share_epoch_and_sequence(self):
+        self.assertEqual(self.first.epoch, self.second.epoch)
+        self.assertEqual(self.first.append(1, 'new_bid', {'amount': 105}), 1)
+        self.assertEqual(self.second.append(1, 'new_bid', {'amount': 110}), 2)
+        self.assertEqual(self.first.current_seq(1), 2)
+
+    def test_resync_includes_events_sent_by_the_other_process(self):
+        for log, amount in ((self.first, 105), (self.second, 110), (self.first, 115)):
+            log.append(1, 'new_bid', {'amount': amount})
+        missed = self.second.since(1, 1, self.first.epoch)
+        self.assertEqual([(entry['seq'], entry['data']['amount']) for entry in missed], [(2, 110), (3, 115)])
+        self.assertEqual(self.first.since(1, 3, self.first.epoch), [])
+
+    def test_last_seq_that_is_not_a_number_requires_snapshot(self):
+        self.first.append(1, 'new_bid', {'amount': 105})
+        self.assertIsNone(self.second.since(1, 'abc', self.first.epoch))
+        self.assertEqual(self.second.since(1, '1', self.first.epoch), [])
+
+    def test_trimmed_or_discarded_log_requires_snapshot(self):
+        for amount in range(5):
+            self.first.append(1, 'new_bid', {'amount': amount})
+        self.assertIsNone(self.second.since(1, 1, self.first.epoch))
+        self.assertEqual(len(self.second.since(1, 2, self.first.epoch)), 3)
+        self.second.discard(1)
+        self.assertIsNone(self.first.since(1, 2, self.first.epoch))
+
+    def test_lost_counters_start_a_new_epoch(self):
+        self.first.append(1, 'new_bid', {'amount': 105})
+        old_epoch = self.first.epoch
+        self.redis.flushall()
+        self.assertEqual(self.first.append(1, 'new_bid', {'amount': 110}), 1)
+        self.assertNotEqual(self.first.epoch, old_epoch)
+        self.assertIsNone(self.first.since(1, 0, old_epoch))
+
+
+class TestOpenEventLog(unittest.TestCase):
+
+    def test_one_process_keeps_the_log_in_memory(self):
+        self.assertIs(type(open_event_log({'SERVER_PROCESSES': 1})), AuctionEventLog)
+
+    def test_several_processes_need_a_shared_log(self):
+        with self.assertRaises(RuntimeError):
+            open_event_log({'SERVER_PROCESSES': 4})
+
+
+if __name__ == '__main__':
+    unittest.main()
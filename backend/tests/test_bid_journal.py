@@ -0,0 +1,112 @@
+"""
+Tests for the append-only bid journal (bid_journal)
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from bid_journal import RECORD_HEADER, BidJournal, open_journal
+
+
+class TestBidJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def journal(self, **options):
+        journal = BidJournal(self.directory, **options)
+        self.addCleanup(journal.close)
+        return journal
+
+    def write_history(self, journal):
+        journal.record_bids(1, [(1, 10, 100.0), (2, 11, 105.0)])
+        journal.record_bids(2, [(3, 10, 50.0)])
+        journal.record_bids(1, [(4, 10, 110.0)])
+        journal.record_extension(1, datetime(2026, 1, 1, 12, 5), 1)
+        journal.record_close(2)
+        journal.flush()
+
+    def assert_history(self, state):
+        self.assertEqual(len(state), 1)
+        live = state.get(1).to_dict()
+        self.assertEqual(live['current_price'], 110.0)
+        self.assertEqual(live['leader_id'], 10)
+        self.assertEqual(live['winning_bid_id'], 4)
+        self.assertEqual(live['total_bids'], 3)
+        self.assertEqual(live['end_time'], datetime(2026, 1, 1, 12, 5))
+        self.assertEqual(live['extensions'], 1)
+        self.assertEqual(state.last_bid_id, 4)
+
+    def test_replay_rebuilds_state(self):
+        writer = self.journal()
+        self.write_history(writer)
+        self.assert_history(writer.state)
+        self.assert_history(self.journal().recover())
+
+    def test_appends_are_batched_until_flush(self):
+        writer = self.journal(fsync_batch=3)
+        writer.record_bids(1, [(1, 10, 100.0), (2, 11, 101.0)])
+        self.assertEqual(len(self.journal().recover()), 0)
+        writer.record_bids(1, [(3, 10, 102.0)])  # third pending record writes the batch
+        self.assertEqual(self.journal().recover().get(1).total_bids, 3)
+
+    def test_snapshot_plus_tail(self):
+        writer = self.journal()
+        writer.record_bids(1, [(1, 10, 100.0), (2, 11, 105.0)])
+        writer.record_bids(2, [(3, 10, 50.0)])
+        writer.compact()
+        writer.record_bids(1, [(4, 10, 110.0)])
+        writer.record_extension(1, datetime(2026, 1, 1, 12, 5), 1)
+        writer.record_close(2)
+        writer.flush()
+        segments = [name for name in os.listdir(self.directory) if name.startswith('segment-')]
+        self.assertEqual(segments, ['segment-00000001.log'])  # covered segments were dropped
+        self.assert_history(self.journal().recover())
+
+    def test_torn_tail_is_truncated(self):
+        writer = self.journal()
+        self.write_history(writer)
+        writer.close()
+        path = os.path.join(self.directory, 'segment-00000000.log')
+        good_size = os.path.getsize(path)
+        with open(path, 'ab') as segment:
+            segment.write(RECORD_HEADER.pack(29, 0) + b'\x01partial')
+        recovered = self.journal()
+        self.assert_history(recovered.recover())
+        self.assertEqual(os.path.getsize(path), good_size)
+        recovered.record_bids(1, [(5, 11, 120.0)])
+        recovered.flush()
+        self.assertEqual(self.journal().recover().get(1).price, 120.0)
+
+    def test_corrupt_record_stops_replay(self):
+        writer = self.journal()
+        writer.record_bids(1, [(1, 10, 100.0), (2, 11, 105.0)])
+        writer.close()
+        path = os.path.join(self.directory, 'segment-00000000.log')
+        with open(path, 'r+b') as segment:
+            segment.seek(os.path.getsize(path) - 1)
+            segment.write(b'\xff')  # flips a byte of the second record's payload
+        state = self.journal().recover()
+        self.assertEqual(state.get(1).bid_id, 1)
+
+    def test_open_journal_from_config(self):
+        self.assertIsNone(open_journal({'JOURNAL_DIR': None}))
+        journal = open_journal({'JOURNAL_DIR': self.directory, 'JOURNAL_FSYNC_BATCH': 7})
+        self.assertEqual(journal.fsync_batch, 7)
+
+    def test_each_listener_gets_its_own_directory_under_the_app_root(self):
+        directories = set()
+        for bind in ('0.0.0.0:5000', '0.0.0.0:5001', '0.0.0.0:5000'):
+            with mock.patch.dict(os.environ, {'GUNICORN_BIND': bind}):
+                directories.add(open_journal({'JOURNAL_DIR': 'journal'}, root_path=self.directory).directory)
+        self.assertEqual(directories, {os.path.join(self.directory, 'journal', '0.0.0.0_5000'),
+                                       os.path.join(self.directory, 'journal', '0.0.0.0_5001')})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Tests for increment ladders and anti-sniping rules (bid_policy)
+"""
+
+import unittest
+
+from bid_policy import IncrementLadder, PolicyEngine
+
+
+class TestIncrementLadder(unittest.TestCase):
+    """The band containing the current price decides the increment"""
+
+    def setUp(self):
+        self.ladder = IncrementLadder([(100, 5), (0, 1), (1000, 25)])
+
+    def test_band_lookup(self):
+        self.assertEqual(self.ladder.increment_for(0), 1)
+        self.assertEqual(self.ladder.increment_for(99.99), 1)
+        self.assertEqual(self.ladder.increment_for(100), 5)
+        self.assertEqual(self.ladder.increment_for(5000), 25)
+
+    def test_price_below_first_band_uses_first_band(self):
+        self.assertEqual(IncrementLadder([(10, 2)]).increment_for(3), 2)
+
+    def test_rejects_invalid_ladders(self):
+        with self.assertRaises(ValueError):
+            IncrementLadder([])
+        with self.assertRaises(ValueError):
+            IncrementLadder([(0, 0)])
+
+
+class TestPolicyEngine(unittest.TestCase):
+    """Auction rules override category rules, which override the defaults"""
+
+    def setUp(self):
+        self.engine = PolicyEngine.from_config({
+            'MIN_BID_INCREMENT': 1.0,
+            'BID_INCREMENT_LADDER': [(0, 1.0), (100, 5.0)],
+            'AUCTION_EXTENSION_WINDOW': 300,
+            'AUCTION_EXTENSION_TIME': 120,
+            'AUCTION_MAX_EXTENSIONS': 2,
+            'BID_POLICY_CATEGORIES': {
+                'cars': {'increments': [(0, 50.0)], 'extension_time': 600},
+            },
+        })
+
+    def test_min_next_bid_by_category(self):
+        self.assertEqual(self.engine.min_next_bid(1, 150.0), 155.0)
+        self.assertEqual(self.engine.min_next_bid(2, 150.0, 'cars'), 200.0)
+        # remembered for id-only callers such as proxy bidding
+        self.assertEqual(self.engine.increment_for(2, 150.0), 50.0)
+
+    def test_auction_rules_override_category(self):
+        self.engine.set_auction_rules(3, {'increments': [(0, 10.0)]}, category='cars')
+        self.assertEqual(self.engine.min_next_bid(3, 150.0, 'cars'), 160.0)
+        self.assertEqual(self.engine.extension_for(3, 30), 600)  # inherited from the category
+
+    def test_extensions_are_windowed_and_capped(self):
+        self.assertEqual(self.engine.extension_for(1, 900, 0), 0)
+        self.assertEqual(self.engine.extension_for(1, 60, 0), 120)
+        self.assertEqual(self.engine.extension_for(1, 60, 1), 120)
+        self.assertEqual(self.engine.extension_for(1, 60, 2), 0)  # the count comes from the auction row
+
+    def test_falls_back_to_min_bid_increment(self):
+        engine = PolicyEngine.from_config({'MIN_BID_INCREMENT': 2.5})
+        self.assertEqual(engine.min_next_bid(1, 1000.0), 1002.5)
+        self.assertEqual(engine.extension_for(1, 10), 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Tests for the item and auction listing routes (api.items, api.auctions)
+"""
+
+from datetime import datetime, timedelta
+
+from db_fixtures import DatabaseTestCase
+from ending_soon import ending_soon_index
+from idempotency import bid_dedupe
+from models_enhanced import Auction, AuctionStatus, Bid, Item, ItemStatus, db
+
+
+class CatalogTestCase(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app.extensions['http_cache'].clear()
+        merchant = self.users['merchant_test']
+        self.item = Item(name='Vase', start_price=20.0, status=ItemStatus.ACTIVE, owner=merchant)
+        self.auction = Auction(item=self.item, current_price=20.0, status=AuctionStatus.ACTIVE,
+                               end_time=datetime.utcnow() + timedelta(hours=1))
+        closed = Auction(item=Item(name='Rug', start_price=5.0, owner=merchant), current_price=5.0,
+                         status=AuctionStatus.CLOSED, end_time=datetime.utcnow() - timedelta(hours=1))
+        db.session.add_all([self.auction, closed])
+        db.session.commit()
+
+    def get(self, path, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(path, headers=headers)
+
+
+class TestItemRoutes(CatalogTestCase):
+
+    def test_list_revalidates_until_an_item_changes(self):
+        response = self.get('/api/items/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({item['name'] for item in response.get_json()}, {'Vase', 'Rug'})
+        etag = response.headers['ETag']
+        self.assertEqual(self.get('/api/items/', etag).status_code, 304)
+
+        self.item.name = 'Blue vase'
+        self.item.updated_at = datetime.utcnow() + timedelta(seconds=1)
+        db.session.commit()
+        self.assertEqual(self.get('/api/items/', etag).status_code, 200)
+
+    def test_detail_and_create(self):
+        response = self.get(f'/api/items/{self.item.id}')
+        self.assertEqual(response.get_json()['owner']['username'], 'merchant_test')
+        self.assertEqual(self.get('/api/items/999999').status_code, 404)
+
+        response = self.client.post('/api/items/', json={
+            'name': 'Lamp', 'start_price': 15.0, 'owner_id': self.users['merchant_test'].id
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['status'], 'pending')
+        self.assertEqual(self.client.post('/api/items/', json={'name': 'Lamp'}).status_code, 400)
+
+
+class TestAuctionRoutes(CatalogTestCase):
+
+    def test_list_shows_active_auctions_and_changes_with_each_bid(self):
+        response = self.get('/api/auctions/')
+        self.assertEqual([auction['id'] for auction in response.get_json()], [self.auction.id])
+        etag = response.headers['ETag']
+        self.assertEqual(self.get('/api/auctions/', etag).status_code, 304)
+
+        bid = Bid(auction_id=self.auction.id, bidder_id=self.users['bidder_test'].id, amount=25.0)
+        db.session.add(bid)
+        db.session.flush()
+        self.auction.winning_bid_id = bid.id
+        db.session.commit()
+        self.assertEqual(self.get('/api/auctions/', etag).status_code, 200)
+
+    def test_detail_includes_item_and_bids(self):
+        db.session.add(Bid(auction_id=self.auction.id, bidder_id=self.users['bidder_test'].id, amount=25.0))
+        db.session.commit()
+        body = self.get(f'/api/auctions/{self.auction.id}').get_json()
+        self.assertEqual((body['status'], body['item']['name']), ('active', 'Vase'))
+        self.assertEqual([bid['amount'] for bid in body['bids']], [25.0])
+        self.assertEqual(self.get('/api/auctions/999999').status_code, 404)
+
+    def test_ending_soon_is_served_from_the_index(self):
+        now = datetime.utcnow()
+        for auction_id, minutes in ((900001, 30), (900002, 3), (900003, 7)):
+            ending_soon_index.track(auction_id, now + timedelta(minutes=minutes))
+            self.addCleanup(ending_soon_index.remove, auction_id)
+        body = self.get('/api/auctions/ending-soon?minutes=10&per_page=1').get_json()
+        self.assertEqual([auction['auction_id'] for auction in body['auctions']], [900002])
+        self.assertGreaterEqual(body['total'], 2)
+        body = self.get('/api/auctions/ending-soon?minutes=10&per_page=1&page=2').get_json()
+        self.assertEqual([auction['auction_id'] for auction in body['auctions']], [900003])
+
+
+class TestPlaceBid(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(bid_dedupe.clear)
+
+    def post_bid(self, amount, key):
+        return self.client.post(f'/api/auctions/{self.auction.id}/bids', headers={'Idempotency-Key': key},
+                                json={'amount': amount, 'bidder_id': self.users['bidder_test'].id})
+
+    def test_resend_is_replayed_even_after_the_dedupe_table_forgets_it(self):
+        first = self.post_bid(25.0, 'key-1')
+        self.assertEqual(first.status_code, 201)
+
+        replayed = self.post_bid(25.0, 'key-1')
+        self.assertEqual(replayed.headers['Idempotent-Replayed'], 'true')
+
+        bid_dedupe.clear()  # as after a restart, or on another process
+        replayed = self.post_bid(25.0, 'key-1')
+        self.assertEqual(replayed.status_code, 201)
+        self.assertEqual(replayed.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(replayed.get_json()['id'], first.get_json()['id'])
+        self.assertEqual(Bid.query.filter_by(auction_id=self.auction.id).count(), 1)
+
+    def test_posted_bid_changes_the_auction_etags(self):
+        detail = self.get(f'/api/auctions/{self.auction.id}')
+        listing = self.get('/api/auctions/')
+        self.assertEqual(self.post_bid(25.0, 'key-1').status_code, 201)
+
+        response = self.get(f'/api/auctions/{self.auction.id}', detail.headers['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([bid['amount'] for bid in response.get_json()['bids']], [25.0])
+        self.assertEqual(self.get('/api/auctions/', listing.headers['ETag']).status_code, 200)
+
+    def test_end_time_change_without_a_bid_changes_the_list_etag(self):
+        etag = self.get('/api/auctions/').headers['ETag']
+        self.auction.end_time += timedelta(minutes=5)  # updated_at follows (onupdate)
+        db.session.commit()
+        self.assertEqual(self.get('/api/auctions/', etag).status_code, 200)
+
+    def test_new_key_is_still_validated(self):
+        self.post_bid(25.0, 'key-1')
+        self.assertEqual(self.post_bid(15.0, 'key-2').status_code, 400)
@@ -0,0 +1,44 @@
+"""
+Tests for the shared test database fixtures (db_fixtures)
+"""
+
+from sqlalchemy import event
+
+from db_fixtures import DatabaseTestCase
+from models_enhanced import Item, db
+
+
+class TestTransaction(DatabaseTestCase):
+
+    commits = []
+
+    @classmethod
+    def on_commit(cls, session):
+        cls.commits.append(session)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # registered before any test transaction, like track_auction_changes
+        # in the websocket server's constructor
+        event.listen(db.session, 'after_commit', cls.on_commit)
+
+    @classmethod
+    def tearDownClass(cls):
+        event.remove(db.session, 'after_commit', cls.on_commit)
+        super().tearDownClass()
+
+    def test_listeners_registered_before_the_test_still_fire(self):
+        del self.commits[:]
+        db.session.add(Item(name='Lamp', start_price=5.0, owner=self.users['merchant_test']))
+        db.session.commit()
+        self.assertEqual(self.commits, [db.session()])
+
+    def test_commits_stay_inside_the_test_transaction(self):
+        db.session.add(Item(name='Lamp', start_price=5.0, owner=self.users['merchant_test']))
+        db.session.commit()
+        self.assertTrue(self._transaction.transaction.is_active)
+        self.assertEqual(Item.query.filter_by(name='Lamp').count(), 1)
+
+    def test_previous_test_was_rolled_back(self):
+        self.assertEqual(Item.query.filter_by(name='Lamp').count(), 0)
@@ -0,0 +1,60 @@
+"""
+Tests for the template database and transactional test fixtures (db_fixtures)
+"""
+
+import os
+import unittest
+
+from db_fixtures import DatabaseTestCase, SHARED_USERS, clone_template, template_path
+from models_enhanced import Item, User, db
+
+
+class TestTemplate(unittest.TestCase):
+    """The template is built once and cloned per connection"""
+
+    def test_clones_are_independent(self):
+        path = template_path()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(template_path(), path)
+        first, second = clone_template(), clone_template()
+        first.execute("DELETE FROM user")
+        self.assertEqual(second.execute("SELECT COUNT(*) FROM user").fetchone()[0], len(SHARED_USERS))
+
+
+class TestTransactionalIsolation(DatabaseTestCase):
+    """Writes made by one test, committed or not, are gone in the next"""
+
+    def test_a_commits(self):
+        self.assertEqual(set(self.users), set(SHARED_USERS))
+        db.session.add(Item(name='Committed', start_price=10.0, owner_id=self.users['merchant_test'].id))
+        db.session.commit()
+        db.session.add(Item(name='Rolled back', start_price=10.0, owner_id=self.users['merchant_test'].id))
+        db.session.rollback()
+        self.assertEqual([item.name for item in Item.query.all()], ['Committed'])
+
+    def test_b_sees_a_clean_database(self):
+        self.assertEqual(Item.query.count(), 0)
+        self.users['bidder_test'].email = 'changed@test.com'
+        db.session.commit()
+
+    def test_c_fixture_rows_are_restored(self):
+        self.assertEqual(User.query.filter_by(username='bidder_test').one().email, 'bidder@test.com')
+
+    def test_shared_users_use_the_cheap_hash(self):
+        user = self.users['admin_test']
+        self.assertTrue(user.password_hash.startswith('$2b$04$'))
+        self.assertTrue(user.check_password('admin123'))
+
+
+def test_pytest_fixture(db_session, shared_users):
+    db_session.add(Item(name='From a fixture', start_price=10.0, owner_id=shared_users['merchant_test'].id))
+    db_session.commit()
+    assert Item.query.filter_by(name='From a fixture').count() == 1
+
+
+def test_pytest_fixture_is_rolled_back(db_session):
+    assert Item.query.filter_by(name='From a fixture').count() == 0
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Tests for the ending-soon index (ending_soon)
+"""
+
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from ending_soon import EndingSoonIndex, track_auction_changes
+
+NOW = datetime(2025, 1, 1, 12, 0, 0)
+
+
+class TestEndingSoonIndex(unittest.TestCase):
+    """Ordering, extensions, removal and pagination"""
+
+    def setUp(self):
+        self.index = EndingSoonIndex()
+        for auction_id, minutes in ((1, 5), (2, 1), (3, 30), (4, 9)):
+            self.index.track(auction_id, NOW + timedelta(minutes=minutes))
+
+    def test_window_is_sorted_and_bounded(self):
+        auctions, total = self.index.window(600, now=NOW)
+        self.assertEqual([auction_id for auction_id, _ in auctions], [2, 1, 4])
+        self.assertEqual(total, 3)
+
+    def test_extension_moves_auction(self):
+        self.index.track(2, NOW + timedelta(minutes=20))
+        auctions, _ = self.index.window(600, now=NOW)
+        self.assertEqual([auction_id for auction_id, _ in auctions], [1, 4])
+        self.assertEqual(len(self.index), 4)
+
+    def test_remove_and_expired(self):
+        self.index.remove(1)
+        auctions, total = self.index.window(600, now=NOW + timedelta(minutes=2))
+        self.assertEqual([auction_id for auction_id, _ in auctions], [4])
+        self.assertEqual(total, 1)
+
+    def test_pagination(self):
+        auctions, total = self.index.window(3600, now=NOW, offset=1, limit=2)
+        self.assertEqual([auction_id for auction_id, _ in auctions], [1, 4])
+        self.assertEqual(total, 4)
+
+    def test_reads_are_sub_millisecond(self):
+        index = EndingSoonIndex()
+        for auction_id in range(100000):
+            index.track(auction_id, NOW + timedelta(seconds=auction_id))
+        started = time.perf_counter()
+        for _ in range(1000):
+            index.window(600, now=NOW, limit=50)
+        self.assertLess((time.perf_counter() - started) / 1000, 0.001)
+
+
+Base = declarative_base()
+
+
+class FakeAuction(Base):
+    __tablename__ = 'fake_auction'
+    id = Column(Integer, primary_key=True)
+    end_time = Column(DateTime, nullable=False)
+    status = Column(String(10), nullable=False)
+    price = Column(Integer, nullable=False, default=0)
+
+
+class TestOrmTracking(unittest.TestCase):
+    """Index follows committed changes only"""
+
+    def setUp(self):
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+        self.index = EndingSoonIndex()
+        track_auction_changes(self.index, self.session, FakeAuction, 'active')
+
+    def test_create_extend_close(self):
+        auction = FakeAuction(end_time=NOW, status='active')
+        self.session.add(auction)
+        self.session.commit()
+        self.assertEqual(self.index.end_time(auction.id), NOW)
+
+        auction.end_time = NOW + timedelta(minutes=5)
+        self.session.commit()
+        self.assertEqual(self.index.end_time(auction.id), NOW + timedelta(minutes=5))
+
+        auction.status = 'closed'
+        self.session.commit()
+        self.assertIsNone(self.index.end_time(auction.id))
+
+    def test_rollback_is_ignored(self):
+        auction = FakeAuction(end_time=NOW, status='active')
+        self.session.add(auction)
+        self.session.commit()
+
+        auction.end_time = NOW + timedelta(minutes=5)
+        self.session.flush()
+        self.session.rollback()
+        self.assertEqual(self.index.end_time(auction.id), NOW)
+
+    def test_lifecycle_changes_are_reported_once_committed(self):
+        changes = []
+        index = EndingSoonIndex()
+        session = sessionmaker(bind=self.session.get_bind())()
+        track_auction_changes(index, session, FakeAuction, 'active',
+                              on_change=lambda auction_id, start, end, status: changes.append((end, status)))
+        auction = FakeAuction(end_time=NOW, status='pending')
+        session.add(auction)
+        session.commit()
+        auction.status = 'active'
+        session.commit()
+        session.commit()  # nothing changed
+        auction.end_time = NOW + timedelta(minutes=5)
+        session.flush()
+        session.rollback()
+        auction.end_time = NOW + timedelta(minutes=2)
+        session.commit()
+        auction.status = 'closed'
+        session.commit()
+        self.assertEqual(changes, [(NOW, 'pending'), (NOW, 'active'), (NOW + timedelta(minutes=2), 'active'),
+                                   (NOW + timedelta(minutes=2), 'closed')])
+
+    def test_status_changes_outside_the_index_are_reported_too(self):
+        changes = []
+        session = sessionmaker(bind=self.session.get_bind())()
+        track_auction_changes(EndingSoonIndex(), session, FakeAuction, 'active',
+                              on_change=lambda auction_id, start, end, status: changes.append(status))
+        auction = FakeAuction(end_time=NOW, status='pending')
+        session.add(auction)
+        session.commit()
+        auction.price = 10  # not a lifecycle change
+        session.commit()
+        auction.status = 'cancelled'
+        session.commit()
+        self.assertEqual(changes, ['pending', 'cancelled'])
+
+    def test_failing_callback_does_not_break_the_commit(self):
+        index = EndingSoonIndex()
+        session = sessionmaker(bind=self.session.get_bind())()
+
+        def on_change(*args):
+            raise RuntimeError('socket server gone')
+
+        track_auction_changes(index, session, FakeAuction, 'active', on_change=on_change)
+        auction = FakeAuction(end_time=NOW, status='active')
+        session.add(auction)
+        with self.assertLogs('ending_soon', 'ERROR'):
+            session.commit()
+        self.assertEqual(index.end_time(auction.id), NOW)
+        auction.end_time = NOW + timedelta(minutes=5)
+        with self.assertLogs('ending_soon', 'ERROR'):
+            session.commit()
+        self.assertEqual(index.end_time(auction.id), NOW + timedelta(minutes=5))
+
+    def test_tracking_again_replaces_the_callback_instead_of_stacking(self):
+        first, second = [], []
+        index = EndingSoonIndex()
+        session = sessionmaker(bind=self.session.get_bind())()
+        track_auction_changes(index, session, FakeAuction, 'active',
+                              on_change=lambda auction_id, *_: first.append(auction_id))
+        track_auction_changes(index, session, FakeAuction, 'active',
+                              on_change=lambda auction_id, *_: second.append(auction_id))
+        auction = FakeAuction(end_time=NOW, status='active')
+        session.add(auction)
+        session.commit()
+        self.assertEqual((first, second), ([], [auction.id]))
+        self.assertEqual(index.end_time(auction.id), NOW)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for draining and session handoff (handoff, AuctionEventLog.export/adopt)
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+import jwt
+
+from auction_events import AuctionEventLog
+from handoff import HandoffStore, decode_resume_token, issue_resume_token, new_resume_id, open_handoff_store
+
+SECRET = 'test-secret'
+
+
+class TestResumeToken(unittest.TestCase):
+
+    def test_round_trip(self):
+        resume_id = new_resume_id()
+        claims = decode_resume_token(SECRET, issue_resume_token(SECRET, 7, resume_id, ttl=60))
+        self.assertEqual((claims['user_id'], claims['resume_id']), (7, resume_id))
+
+    def test_rejects_expired_and_foreign_tokens(self):
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            decode_resume_token(SECRET, issue_resume_token(SECRET, 7, new_resume_id(), ttl=-1))
+        with self.assertRaises(jwt.InvalidTokenError):
+            decode_resume_token('other-secret', issue_resume_token(SECRET, 7, new_resume_id(), ttl=60))
+        access_token = jwt.encode({'user_id': 7}, SECRET, algorithm='HS256')
+        with self.assertRaises(jwt.InvalidTokenError):  # an access token is not a resume token
+            decode_resume_token(SECRET, access_token)
+
+
+class TestHandoffStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_successor_claims_sessions_once(self):
+        log = AuctionEventLog()
+        log.append(1, 'new_bid', {'amount': 10.0, 'timestamp': datetime(2026, 1, 1)})
+        session = {'user_id': 7, 'username': 'bidder', 'role': 'bidder', 'encoding': 'json', 'auctions': [1]}
+        HandoffStore(self.directory, key='127.0.0.1:5000').save({'r1': session}, log.export())
+
+        successor = HandoffStore(self.directory, key='127.0.0.1:5000')
+        state = successor.load()
+        self.assertEqual(state['event_log']['epoch'], log.epoch)
+        self.assertFalse(os.listdir(self.directory))  # the file is consumed
+        self.assertEqual(successor.claim('r1'), session)
+        self.assertIsNone(successor.claim('r1'))
+        self.assertIsNone(HandoffStore(self.directory, key='127.0.0.1:5001').load())
+
+    def test_stale_handoff_is_ignored(self):
+        HandoffStore(self.directory).save({'r1': {'user_id': 7}}, AuctionEventLog().export())
+        store = HandoffStore(self.directory, max_age=0)
+        time.sleep(0.01)
+        self.assertIsNone(store.load())
+        self.assertIsNone(store.claim('r1'))
+
+    def test_disabled_without_directory(self):
+        self.assertIsNone(open_handoff_store({'HANDOFF_DIR': None}))
+
+
+class TestEventLogAdoption(unittest.TestCase):
+
+    def test_successor_continues_sequences_under_the_same_epoch(self):
+        old = AuctionEventLog()
+        for amount in (10.0, 11.0, 12.0):
+            old.append(1, 'new_bid', {'amount': amount})
+        new = AuctionEventLog()
+        self.assertTrue(new.adopt(old.export()))
+        self.assertEqual(new.epoch, old.epoch)
+        self.assertEqual([event['seq'] for event in new.since(1, 1, old.epoch)], [2, 3])
+        self.assertEqual(new.append(1, 'new_bid', {'amount': 13.0}), 4)
+
+    def test_adopt_survives_json_keys(self):
+        from serialization import dumps_bytes, loads
+        old = AuctionEventLog()
+        old.append(5, 'new_bid', {'amount': 10.0})
+        new = AuctionEventLog()
+        new.adopt(loads(dumps_bytes(old.export())))
+        self.assertEqual(new.current_seq(5), 1)
+
+    def test_no_adoption_after_own_events(self):
+        old = AuctionEventLog()
+        old.append(1, 'new_bid', {'amount': 10.0})
+        new = AuctionEventLog()
+        new.append(2, 'new_bid', {'amount': 5.0})
+        self.assertFalse(new.adopt(old.export()))
+        self.assertNotEqual(new.epoch, old.epoch)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Tests for conditional GET and response compression (http_cache)
+"""
+
+import gzip
+import unittest
+
+from flask import Blueprint, jsonify
+
+from app import create_app
+from config import TestingConfig
+from http_cache import ResponseCache, conditional, negotiate_encoding
+from werkzeug.http import parse_accept_header
+
+
+class TestResponseCache(unittest.TestCase):
+    """Encoded bodies are kept per (ETag, encoding) within a byte budget"""
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(max_bytes=100)
+        cache.put('a', None, b'x' * 20, 'application/json')
+        cache.put('b', None, b'y' * 20, 'application/json')
+        self.assertIsNotNone(cache.get('a', None))
+        for i in range(4):
+            cache.put(f'c{i}', 'gzip', b'z' * 20, 'application/json', 'gzip')
+        self.assertIsNotNone(cache.get('a', None))
+        self.assertIsNone(cache.get('b', None))
+        self.assertLessEqual(cache.size, 100)
+
+    def test_negotiation_honours_quality(self):
+        self.assertEqual(negotiate_encoding(parse_accept_header('gzip, deflate')), 'gzip')
+        self.assertIsNone(negotiate_encoding(parse_accept_header('gzip;q=0, identity')))
+        self.assertIsNone(negotiate_encoding(parse_accept_header('')))
+
+
+class TestConditionalGet(unittest.TestCase):
+    """Version-derived ETags answer repeat polls without running the view"""
+
+    def setUp(self):
+        self.version = 1
+        self.calls = 0
+        blueprint = Blueprint('cached_bp', __name__)
+
+        @blueprint.route('/listing')
+        @conditional(lambda: self.version)
+        def listing():
+            self.calls += 1
+            return jsonify([{'id': i, 'title': f'Lot {i}', 'price': i * 10.0} for i in range(200)])
+
+        @blueprint.route('/small')
+        @conditional(lambda: self.version)
+        def small():
+            self.calls += 1
+            return jsonify({'ok': True})
+
+        @blueprint.route('/plain')
+        def plain():
+            return jsonify([{'id': i, 'title': f'Lot {i}'} for i in range(200)])
+
+        self.app = create_app(TestingConfig)
+        self.app.register_blueprint(blueprint, url_prefix='/cached')
+        self.client = self.app.test_client()
+
+    def test_not_modified_skips_the_view(self):
+        first = self.client.get('/cached/listing')
+        etag = first.headers['ETag']
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Accept-Encoding', first.headers['Vary'])
+
+        again = self.client.get('/cached/listing', headers={'If-None-Match': etag})
+        self.assertEqual((again.status_code, again.data), (304, b''))
+        self.assertEqual(self.calls, 1)
+
+        self.version += 1
+        changed = self.client.get('/cached/listing', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertEqual(self.calls, 2)
+
+    def test_compressed_body_is_built_once(self):
+        plain = self.client.get('/cached/listing')
+        headers = {'Accept-Encoding': 'gzip'}
+        first = self.client.get('/cached/listing', headers=headers)
+        second = self.client.get('/cached/listing', headers=headers)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(second.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(gzip.decompress(second.data), plain.data)
+        self.assertLess(len(second.data), len(plain.data) / 3)
+
+    def test_small_bodies_stay_uncompressed(self):
+        self.client.get('/cached/small', headers={'Accept-Encoding': 'gzip'})
+        response = self.client.get('/cached/small', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.get_json(), {'ok': True})
+        self.assertEqual(self.calls, 1)
+
+    def test_uncached_routes_are_compressed(self):
+        identity = self.client.get('/cached/plain')
+        response = self.client.get('/cached/plain', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', identity.headers)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), identity.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Tests for idempotent bid submission (idempotency)
+"""
+
+import threading
+import time
+import unittest
+
+from sqlalchemy.exc import IntegrityError
+
+from db_fixtures import DatabaseTestCase
+from idempotency import DONE, NEW, PENDING, BidDedupe, valid_client_bid_id
+from models_enhanced import Bid, db
+
+
+class TestBidDedupe(unittest.TestCase):
+    """A client_bid_id is processed once; resends get the stored outcome"""
+
+    def test_claim_pending_done(self):
+        dedupe = BidDedupe()
+        self.assertEqual(dedupe.claim(1, 'a'), (NEW, None))
+        self.assertEqual(dedupe.claim(1, 'a'), (PENDING, None))
+        outcome = {'event': 'bid_confirmation', 'data': {'bid_id': 7}}
+        dedupe.complete(1, 'a', outcome)
+        self.assertEqual(dedupe.claim(1, 'a'), (DONE, outcome))
+        self.assertEqual(dedupe.hits, 2)
+
+    def test_ids_are_per_user(self):
+        dedupe = BidDedupe()
+        self.assertEqual(dedupe.claim(1, 'a')[0], NEW)
+        self.assertEqual(dedupe.claim(2, 'a')[0], NEW)
+
+    def test_release_allows_a_retry(self):
+        dedupe = BidDedupe()
+        dedupe.claim(1, 'a')
+        dedupe.release(1, 'a')
+        self.assertEqual(dedupe.claim(1, 'a')[0], NEW)
+
+    def test_entries_expire(self):
+        dedupe = BidDedupe(ttl=0.05)
+        dedupe.claim(1, 'a')
+        dedupe.complete(1, 'a', {'event': 'bid_confirmation', 'data': {}})
+        time.sleep(0.06)
+        self.assertEqual(dedupe.claim(1, 'a')[0], NEW)
+        self.assertEqual(len(dedupe), 1)
+
+    def test_bounded(self):
+        dedupe = BidDedupe(max_entries=3)
+        for i in range(5):
+            dedupe.claim(1, str(i))
+        self.assertEqual(len(dedupe), 3)
+        self.assertEqual(dedupe.claim(1, '0')[0], NEW)  # oldest were evicted
+        self.assertEqual(dedupe.claim(1, '4')[0], PENDING)
+
+    def test_concurrent_resends_claim_once(self):
+        dedupe = BidDedupe()
+        states = []
+        threads = [threading.Thread(target=lambda: states.append(dedupe.claim(1, 'a')[0])) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(states.count(NEW), 1)
+
+    def test_valid_client_bid_id(self):
+        self.assertTrue(valid_client_bid_id('3f2c6a0e-9b1d-4a57-8e0f-2d7c1b5a9e44'))
+        self.assertFalse(valid_client_bid_id(''))
+        self.assertFalse(valid_client_bid_id('x' * 65))
+        self.assertFalse(valid_client_bid_id(12))
+
+
+class TestBidUniqueness(DatabaseTestCase):
+    """The database rejects a second bid with the same (bidder, client_bid_id)"""
+
+    def test_duplicate_client_bid_id_rejected(self):
+        bidder = self.users['bidder_test'].id
+        db.session.add(Bid(auction_id=1, bidder_id=bidder, amount=10.0, client_bid_id='abc'))
+        db.session.commit()
+        db.session.add(Bid(auction_id=1, bidder_id=bidder, amount=10.0, client_bid_id='abc'))
+        with self.assertRaises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+        self.assertEqual(Bid.query.filter_by(client_bid_id='abc').count(), 1)
+
+    def test_untagged_bids_never_collide(self):
+        bidder = self.users['bidder_test'].id
+        db.session.add_all([Bid(auction_id=1, bidder_id=bidder, amount=10.0), Bid(auction_id=1, bidder_id=bidder, amount=10.0)])
+        db.session.commit()
+        other = self.users['admin_test'].id
+        db.session.add(Bid(auction_id=1, bidder_id=other, amount=10.0, client_bid_id='abc'))
+        db.session.add(Bid(auction_id=1, bidder_id=bidder, amount=10.0, client_bid_id='abc'))
+        db.session.commit()
+        self.assertEqual(Bid.query.count(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Tests for route / socket event timing and the slow-query log (instrumentation)
+"""
+
+import time
+import unittest
+from types import SimpleNamespace
+
+import jwt
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app import create_app
+from config import TestingConfig
+from extensions import db
+from instrumentation import Histogram, instrument_socketio, metrics
+from models_enhanced import User, UserRole
+
+
+class TestHistogram(unittest.TestCase):
+    """Percentiles stay within the bucket precision"""
+
+    def test_percentiles_within_relative_error(self):
+        histogram = Histogram()
+        for micros in range(1, 100001):
+            histogram.record(micros / 1_000_000)
+        for percent, expected in ((50, 50000), (99, 99000), (99.9, 99900)):
+            self.assertAlmostEqual(histogram.percentile(percent), expected, delta=expected / 32)
+        self.assertEqual(histogram.percentile(100), 100000)
+        self.assertEqual(histogram.snapshot()['count'], 100000)
+
+    def test_small_values_are_exact(self):
+        histogram = Histogram()
+        for micros in (3, 3, 7):
+            histogram.record(micros / 1_000_000)
+        self.assertEqual(histogram.percentile(50), 3)
+        self.assertEqual(histogram.percentile(100), 7)
+
+
+class TestRequestInstrumentation(unittest.TestCase):
+    """Routes and socket events are timed with their SQL counted"""
+
+    def setUp(self):
+        class InstrumentedConfig(TestingConfig):
+            SLOW_QUERY_THRESHOLD_MS = 0
+
+        metrics.reset()
+        self.app = create_app(InstrumentedConfig)
+
+        @self.app.route('/test/users')
+        def list_users():
+            return {'users': User.query.count() + User.query.count()}
+
+        @self.app.route('/test/login')
+        def login():
+            return {'found': User.query.filter_by(password_hash='s3cret-hash').count()}
+
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            admin = User(username='ops', email='ops@test.com', password_hash='x', role=UserRole.ADMIN)
+            db.session.add(admin)
+            db.session.commit()
+            token = jwt.encode({'id': admin.id}, self.app.config['SECRET_KEY'], algorithm='HS256')
+        self.admin_headers = {'Authorization': f'Bearer {token}'}
+
+    def metrics(self, query=''):
+        return self.client.get(f'/api/monitoring/metrics{query}', headers=self.admin_headers)
+
+    def tearDown(self):
+        metrics.slow_query_seconds = None
+        metrics.reset()
+
+    def test_route_timing_and_sql_count(self):
+        with self.assertLogs('mzadd.slow_query', level='WARNING') as logs:
+            self.client.get('/test/users')
+            self.client.get('/test/users')
+        snapshot = self.metrics().get_json()
+        entry = snapshot['GET /test/users']
+        self.assertEqual(entry['count'], 2)
+        self.assertEqual(entry['sql_per_call'], 2)
+        self.assertIn('GET /test/users', logs.output[0])
+
+    def test_slow_query_log_leaves_out_bind_parameters(self):
+        with self.assertLogs('mzadd.slow_query', level='WARNING') as logs:
+            self.client.get('/test/login')
+        self.assertTrue(any('GET /test/login' in line for line in logs.output))
+        self.assertFalse(any('s3cret-hash' in line for line in logs.output))
+
+    def test_failed_statement_leaves_no_start_behind(self):
+        with self.app.app_context(), db.engine.connect() as conn:
+            with self.assertRaises(IntegrityError):
+                conn.execute(text("INSERT INTO \"user\" (id, username) VALUES (1, 'ops')"))
+            conn.rollback()
+            # the connection goes back to the pool with nothing left on it
+            self.assertNotIn('instrumentation_start', conn.info)
+            metrics.slow_query_seconds = 0.04
+            time.sleep(0.05)
+            with self.assertNoLogs('mzadd.slow_query', level='WARNING'):
+                conn.execute(text('SELECT 1'))
+
+    def test_metrics_are_admin_only(self):
+        self.assertEqual(self.client.get('/api/monitoring/metrics').status_code, 401)
+        self.assertEqual(self.metrics().status_code, 200)
+
+    def test_prometheus_format(self):
+        self.client.get('/test/users')
+        self.client.get('/test/login')
+        body = self.metrics('?format=prometheus').get_data(as_text=True)
+        self.assertIn('mzadd_latency_seconds_count{name="GET /test/users"} 1', body)
+        # every sample follows its own family's TYPE line, families never interleave
+        family = None
+        for line in body.splitlines():
+            if line.startswith('# TYPE '):
+                family = line.split()[2]
+            elif not line.startswith('#'):
+                self.assertTrue(line.startswith(family), line)
+
+    def test_socket_handlers_are_wrapped(self):
+        calls = []
+        handlers = {'/': {'place_bid': lambda sid, data: calls.append(data) or 'ok'}}
+        fake = SimpleNamespace(server=SimpleNamespace(handlers=handlers))
+        instrument_socketio(fake, self.app)
+        instrument_socketio(fake, self.app)  # idempotent
+        self.assertEqual(handlers['/']['place_bid']('sid', {'amount': 1}), 'ok')
+        self.assertEqual(metrics.snapshot()['socket place_bid']['count'], 1)
+        self.assertEqual(calls, [{'amount': 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,263 @@
+"""
+Tests for the background job queue (job_queue, jobs)
+"""
+
+import os
+import shutil
+import socketserver
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from email import message_from_bytes
+from unittest import mock
+
+import jwt
+
+from app import create_app
+from config import TestingConfig
+from db_fixtures import DatabaseTestCase
+from job_queue import DEAD, QUEUED, JobQueue, Worker, enqueue, task, tasks
+from jobs import enqueue_unsettled_auctions, settle_auction
+from models_enhanced import Auction, AuctionStatus, Bid, Item, User, db
+
+calls = []
+
+
+@task('test_record')
+def record(value, fail_times=0):
+    calls.append(value)
+    if calls.count(value) <= fail_times:
+        raise RuntimeError(f'transient failure {value}')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib: keeps every message it is sent"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.messages = []
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 stand-in ready')
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line.split(' ', 1)[0].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 stand-in')
+            elif command == 'DATA':
+                self.reply('354 end with .')
+                data = []
+                for raw in iter(self.rfile.readline, b''):
+                    if raw in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(raw[1:] if raw.startswith(b'..') else raw)
+                self.server.messages.append(message_from_bytes(b''.join(data)))
+                self.reply('250 queued')
+            elif command == 'QUIT' or not line:
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+class TestJobQueue(unittest.TestCase):
+    """Claim order, batching, retries and crash recovery"""
+
+    def setUp(self):
+        self.queue = JobQueue('memory', backoff_base=0.01, backoff_max=0.05, lease_seconds=60)
+
+    def test_dequeues_by_priority_in_batches(self):
+        self.queue.enqueue_many('test_record', [{'value': i} for i in range(5)], priority=0)
+        urgent = self.queue.enqueue('test_record', {'value': 'urgent'}, priority=10)
+        self.queue.enqueue('test_record', {'value': 'later'}, priority=50, delay=60)
+
+        batch = self.queue.dequeue('w1', limit=3)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch[0].id, urgent)
+        self.assertEqual(batch[1].payload, {'value': 0})
+        self.assertEqual(len(self.queue.dequeue('w2', limit=10)), 3)  # the delayed job is not ready
+        self.assertEqual(self.queue.stats(), {QUEUED: 1, 'running': 6, DEAD: 0})
+
+    def test_concurrent_workers_never_share_a_job(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        queue = JobQueue(os.path.join(directory, 'jobs.db'))
+        queue.enqueue_many('test_record', [{'value': i} for i in range(300)])
+        claimed = []
+
+        def claim(worker_id):
+            while True:
+                jobs = queue.dequeue(worker_id, limit=7)
+                if not jobs:
+                    return
+                claimed.extend(job.id for job in jobs)
+
+        threads = [threading.Thread(target=claim, args=(f'w{i}',)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(claimed), 300)
+        self.assertEqual(len(set(claimed)), 300)
+
+    def test_failures_back_off_then_go_dead(self):
+        job_id = self.queue.enqueue('test_record', {'value': 'x'}, max_attempts=2)
+        job = self.queue.dequeue('w1')[0]
+        status, delay = self.queue.fail(job, 'boom')
+        self.assertEqual(status, QUEUED)
+        self.assertGreater(delay, 0)
+        self.assertEqual(self.queue.dequeue('w1'), [])  # still backing off
+        time.sleep(delay)
+        job = self.queue.dequeue('w1')[0]
+        self.assertEqual((job.id, job.attempts), (job_id, 2))
+        self.assertEqual(self.queue.fail(job, 'boom')[0], DEAD)
+        self.assertEqual(self.queue.stats()[DEAD], 1)
+        self.assertEqual(self.queue.retry_dead(), 1)
+        self.assertEqual(self.queue.dequeue('w1')[0].attempts, 1)
+
+    def test_stale_running_jobs_are_requeued(self):
+        self.queue.enqueue('test_record', {'value': 'x'})
+        self.queue.dequeue('crashed')
+        self.queue.lease_seconds = 0
+        self.assertEqual(self.queue.requeue_stale(), 1)
+        self.assertEqual(len(self.queue.dequeue('w1')), 1)
+
+
+class TestWorker(unittest.TestCase):
+    """Handlers run in an app context; handlers elsewhere only enqueue"""
+
+    def setUp(self):
+        calls.clear()
+        self.smtp = SMTPStandIn()
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+        port = self.smtp.server_address[1]
+
+        class JobConfig(TestingConfig):
+            MAIL_SERVER = '127.0.0.1'
+            MAIL_PORT = port
+            JOB_BACKOFF_BASE = 0.0
+
+        self.app = create_app(JobConfig)
+        self.queue = self.app.extensions['jobs']
+        self.worker = Worker(self.queue, self.app, batch_size=4)
+
+    def tearDown(self):
+        self.smtp.shutdown()
+        self.smtp.server_close()
+
+    def test_retries_until_success(self):
+        with self.app.app_context():
+            enqueue('test_record', value='a', fail_times=2)
+            enqueue('test_record', value='b')
+        self.worker.run_until_empty()
+        self.assertEqual(calls.count('a'), 3)
+        self.assertEqual(calls.count('b'), 1)
+        self.assertEqual(self.queue.stats(), {QUEUED: 0, 'running': 0, DEAD: 0})
+
+    def test_unknown_task_goes_dead(self):
+        self.queue.enqueue('no_such_task', {}, max_attempts=1)
+        self.worker.run_until_empty()
+        self.assertEqual(self.queue.stats()[DEAD], 1)
+
+    def test_send_email_over_smtp(self):
+        self.assertIn('send_email', tasks)
+        with self.app.app_context():
+            enqueue('send_email', to='winner@example.com', subject='You won', body='Lot 7 is yours')
+        self.worker.run_until_empty()
+        self.assertEqual(len(self.smtp.messages), 1)
+        message = self.smtp.messages[0]
+        self.assertEqual((message['To'], message['Subject']), ('winner@example.com', 'You won'))
+        self.assertIn('Lot 7 is yours', message.get_payload())
+
+    def test_threaded_worker(self):
+        self.worker.poll_interval = 0.01
+        self.worker.start()
+        try:
+            with self.app.app_context():
+                enqueue('test_record', value='threaded')
+            deadline = time.time() + 5
+            while 'threaded' not in calls and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            self.worker.stop(timeout=5)
+        self.assertIn('threaded', calls)
+
+
+    def test_worker_survives_a_locked_queue_during_recovery(self):
+        self.worker.poll_interval = 0.01
+        locks = [sqlite3.OperationalError('database is locked')]
+
+        def requeue_stale():
+            if locks:
+                raise locks.pop()
+            return 0
+
+        with mock.patch.object(self.queue, 'requeue_stale', side_effect=requeue_stale):
+            self.worker.start()
+            try:
+                with self.app.app_context():
+                    enqueue('test_record', value='after the lock')
+                deadline = time.time() + 5
+                while 'after the lock' not in calls and time.time() < deadline:
+                    time.sleep(0.01)
+            finally:
+                self.worker.stop(timeout=5)
+        self.assertEqual(locks, [])
+        self.assertIn('after the lock', calls)
+
+
+class TestSettlement(DatabaseTestCase):
+    """settle_auction is retried by the queue, so it must credit exactly once"""
+
+    def setUp(self):
+        super().setUp()
+        self.queue = self.app.extensions['jobs']
+        self.addCleanup(self.queue.connection.execute, 'DELETE FROM job')
+        merchant, bidder = self.users['merchant_test'], self.users['bidder_test']
+        item = Item(name='Lamp', start_price=10.0, owner=merchant)
+        self.auction = Auction(item=item, current_price=100.0, status=AuctionStatus.CLOSED,
+                               end_time=datetime.utcnow() - timedelta(minutes=1))
+        db.session.add(self.auction)
+        db.session.flush()
+        bid = Bid(auction_id=self.auction.id, bidder_id=bidder.id, amount=100.0)
+        db.session.add(bid)
+        db.session.flush()
+        self.auction.winning_bid_id = bid.id
+        db.session.commit()
+
+    def earnings(self):
+        return db.session.get(User, self.users['merchant_test'].id).total_earnings
+
+    def test_a_retry_does_not_credit_twice(self):
+        settle_auction(self.auction.id)
+        settle_auction(self.auction.id)  # e.g. the worker died before completing the job
+        self.assertEqual(self.earnings(), 95.0)  # 100 less the default 5% commission
+        self.assertIsNotNone(db.session.get(Auction, self.auction.id).settled_at)
+        self.assertEqual(self.queue.stats()[QUEUED], 1)  # one winner email
+
+    def test_startup_sweep_queues_only_unsettled_auctions(self):
+        self.assertEqual(enqueue_unsettled_auctions(), 1)
+        Worker(self.queue, self.app).run_once()  # settles; the email job stays queued
+        self.assertEqual(self.earnings(), 95.0)
+        self.assertEqual(enqueue_unsettled_auctions(), 0)
+
+    def test_job_stats_are_admin_only(self):
+        enqueue_unsettled_auctions()
+        self.assertEqual(self.client.get('/api/monitoring/jobs').status_code, 401)
+        token = jwt.encode({'id': self.users['admin_test'].id}, self.app.config['SECRET_KEY'], algorithm='HS256')
+        response = self.client.get('/api/monitoring/jobs', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.get_json()[QUEUED], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
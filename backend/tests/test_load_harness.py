@@ -0,0 +1,49 @@
+"""
+Tests for the load generator's sampling and statistics (benchmarks/load_bidding)
+"""
+
+import random
+import unittest
+from collections import Counter
+
+from benchmarks.load_bidding import ZipfSampler, normalize, percentiles
+from wire_codec import compact_available, encode_compact
+
+
+class TestZipfSampler(unittest.TestCase):
+    """Auction popularity follows a Zipf distribution"""
+
+    def test_low_ranks_dominate(self):
+        sampler = ZipfSampler(100, s=1.1, rng=random.Random(1))
+        counts = Counter(sampler.sample() for _ in range(20000))
+        self.assertTrue(set(counts) <= set(range(100)))
+        self.assertGreater(counts[0], counts[1])
+        self.assertGreater(counts[1], counts[9])
+        self.assertGreater(counts[0], 20000 * 0.15)
+
+    def test_distinct(self):
+        ranks = ZipfSampler(5, rng=random.Random(2)).distinct(10)
+        self.assertEqual(sorted(ranks), [0, 1, 2, 3, 4])
+
+
+class TestResults(unittest.TestCase):
+    """Latency percentiles and payload normalisation"""
+
+    def test_nearest_rank_percentiles(self):
+        result = percentiles(list(range(1, 1001)))
+        self.assertEqual((result['p50'], result['p99'], result['p999']), (500, 990, 999))
+        self.assertEqual(result['count'], 1000)
+        self.assertEqual(percentiles([]), {'count': 0})
+
+    def test_normalize_json_and_compact(self):
+        data = {'auction_id': 3, 'amount': 15.0, 'bidder_name': 'u1', 'timestamp': '1970-01-01T00:00:01'}
+        self.assertEqual(normalize(dict(data))['timestamp_ms'], 1000)
+        if compact_available():
+            frame = encode_compact({'auction_id': 3, 'amount': 15.0, 'bidder_name': 'u1', 'timestamp': 1000})
+            decoded = normalize(frame)
+            self.assertEqual((decoded['auction_id'], decoded['bidder_name'], decoded['timestamp_ms']),
+                             (3, 'u1', 1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+"""
+Tests for streamed, content-addressed image storage (media, api/media)
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import jwt
+
+from app import create_app
+from config import TestingConfig
+from db_fixtures import DatabaseTestCase, TemplateTestingConfig
+from media import MediaStore, UploadRejected, render_thumbnails, sniff_extension
+from models_enhanced import Item, db
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is only needed to render thumbnails
+    Image = None
+
+JPEG = b'\xff\xd8\xff\xe0' + b'\x00' * 200
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x01' * 200
+
+
+class TrickleStream(io.BytesIO):
+    """Returns at most a few bytes per read, like a slow client"""
+
+    def read(self, size=-1):
+        return super().read(min(size, 5) if size and size > 0 else 5)
+
+
+class TestMediaStore(unittest.TestCase):
+    """Uploads are sniffed, size-limited and stored once per content"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = MediaStore(self.root, {'png', 'jpg', 'jpeg', 'gif', 'webp'})
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_sniff_extension(self):
+        self.assertEqual(sniff_extension(JPEG), 'jpg')
+        self.assertEqual(sniff_extension(PNG), 'png')
+        self.assertEqual(sniff_extension(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'webp')
+        self.assertIsNone(sniff_extension(b'<?php echo 1; ?>'))
+
+    def test_identical_uploads_are_stored_once(self):
+        digest, extension, created = self.store.save_stream(io.BytesIO(JPEG), 1024)
+        self.assertTrue(created)
+        self.assertEqual(self.store.save_stream(TrickleStream(JPEG), 1024), (digest, 'jpg', False))
+        self.assertTrue(os.path.exists(self.store.original_path(digest, extension)))
+        self.assertEqual(os.listdir(self.store.incoming), [])
+
+    def test_rejects_non_images_and_oversized_bodies(self):
+        with self.assertRaises(UploadRejected):
+            self.store.save_stream(io.BytesIO(b'#!/bin/sh\nrm -rf /\n'), 1024)
+        with self.assertRaises(UploadRejected):
+            self.store.save_stream(io.BytesIO(PNG), 100)
+        with self.assertRaises(UploadRejected):
+            self.store.save_stream(io.BytesIO(b''), 100)
+        self.assertEqual(os.listdir(self.store.incoming), [])
+
+    @unittest.skipUnless(Image, 'Pillow is not installed')
+    def test_render_thumbnails(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (2000, 1000), (200, 30, 30)).save(buffer, 'JPEG')
+        digest, extension, _ = self.store.save_stream(io.BytesIO(buffer.getvalue()), 10 ** 7)
+        written = render_thumbnails(self.store.original_path(digest, extension), digest,
+                                    self.store.thumbs, (160, 480), 80)
+        with Image.open(written[160]) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (160, 80)))
+
+
+class TestMediaRoutes(unittest.TestCase):
+    """Content-addressed media is served with long-lived cache headers"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+        class MediaConfig(TestingConfig):
+            UPLOAD_FOLDER = self.root
+
+        self.app = create_app(MediaConfig)
+        self.client = self.app.test_client()
+        self.store = self.app.extensions['media']
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_original_is_immutable(self):
+        digest, _, _ = self.store.save_stream(io.BytesIO(PNG), 1024)
+        response = self.client.get(f'/api/media/{digest}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(response.data, PNG)
+        again = self.client.get(f'/api/media/{digest}', headers={'If-None-Match': f'"{digest}"'})
+        self.assertEqual(again.status_code, 304)
+
+    def test_missing_thumbnail_falls_back_uncached(self):
+        digest, _, _ = self.store.save_stream(io.BytesIO(PNG), 1024)
+        response = self.client.get(f'/api/media/{digest}/160.webp')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Cache-Control'], 'no-store')
+        self.assertEqual(self.client.get(f'/api/media/{digest}/161.webp').status_code, 404)
+        self.assertEqual(self.client.get('/api/media/not-a-digest').status_code, 404)
+
+
+class TestUploadRoute(DatabaseTestCase):
+    """The owner uploads an item photo as a raw body or a multipart form"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp()
+
+        class UploadConfig(TemplateTestingConfig):
+            UPLOAD_FOLDER = cls.root
+
+        cls.config_class = UploadConfig
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.item = Item(name='Lamp', start_price=10.0, owner_id=self.users['merchant_test'].id)
+        db.session.add(self.item)
+        db.session.commit()
+        store = self.app.extensions['media']
+        # rendering runs in a process pool; the route only has to queue it
+        patcher = mock.patch.object(store, 'generate_thumbnails')
+        self.generate_thumbnails = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def headers(self, username='merchant_test', **extra):
+        token = jwt.encode({'id': self.users[username].id}, self.app.config['SECRET_KEY'], algorithm='HS256')
+        return dict(extra, Authorization=f'Bearer {token}')
+
+    def test_raw_body_upload(self):
+        response = self.client.put(f'/api/media/items/{self.item.id}/image', data=PNG, headers=self.headers(**{'Content-Type': 'image/png'}))
+        self.assertEqual(response.status_code, 201, response.get_json())
+        body = response.get_json()
+        self.assertFalse(body['deduplicated'])
+        self.assertEqual(db.session.get(Item, self.item.id).image_url, body['original'])
+        self.assertEqual(self.client.get(body['original']).data, PNG)
+        self.generate_thumbnails.assert_called_once_with(body['digest'], 'png')
+
+    def test_multipart_upload(self):
+        response = self.client.post(f'/api/media/items/{self.item.id}/image', headers=self.headers(),
+                                    data={'image': (io.BytesIO(JPEG), 'photo.jpg')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 201, response.get_json())
+        self.assertTrue(response.get_json()['original'].startswith('/api/media/'))
+        missing = self.client.post(f'/api/media/items/{self.item.id}/image', headers=self.headers(),
+                                   data={'other': (io.BytesIO(JPEG), 'photo.jpg')},
+                                   content_type='multipart/form-data')
+        self.assertEqual(missing.status_code, 400)
+
+    def test_only_the_owner_may_upload(self):
+        url = f'/api/media/items/{self.item.id}/image'
+        self.assertEqual(self.client.put(url, data=PNG).status_code, 401)
+        response = self.client.put(url, data=PNG, headers=self.headers('bidder_test'))
+        self.assertEqual(response.status_code, 403)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+Tests for the notification pipeline (notifications.NotificationService)
+"""
+
+import json
+import unittest
+import tempfile
+import os
+from unittest import mock
+
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from config import TestingConfig
+from extensions import db
+from models_enhanced import User, UserRole, Notification
+from notifications import NotificationService
+
+
+class RecordingSocketIO:
+    """Stands in for SocketIO: records emits, runs no background tasks"""
+
+    def __init__(self):
+        self.emitted = []
+        self.tasks = []
+        self.slept = []
+
+    def emit(self, event, data, room=None):
+        self.emitted.append((event, data, room))
+
+    def start_background_task(self, target, *args):
+        self.tasks.append(target)
+        return object()
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+
+
+class WorkerKilled(BaseException):
+    """Ends a worker the way GreenletExit or interpreter shutdown would"""
+
+
+class TestNotificationService(unittest.TestCase):
+    """Batched inbox inserts, per-user room pushes and unread delivery"""
+
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+
+        class FileConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.db_path}'
+            SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'check_same_thread': False}}
+
+        self.app = create_app(FileConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.users = [User(username=f'user{i}', email=f'user{i}@test.com', password_hash='x',
+                           role=UserRole.BIDDER) for i in range(3)]
+        db.session.add_all(self.users)
+        db.session.commit()
+        self.user_ids = [user.id for user in self.users]
+
+        self.socketio = RecordingSocketIO()
+        self.service = NotificationService(self.app, self.socketio)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app.extensions['read_engine'].dispose()
+        self.app_context.pop()
+        os.close(self.db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def drain(self):
+        batch = []
+        while not self.service._queue.empty():
+            batch.append(self.service._queue.get_nowait())
+        self.service.flush(batch)
+
+    def test_fan_out_is_stored_and_pushed_to_user_rooms(self):
+        self.service.notify(self.user_ids, {'type': 'outbid', 'title': 'Outbid', 'data': {'auction_id': 1}})
+        self.drain()
+
+        self.assertEqual(Notification.query.count(), 3)
+        rooms = sorted(room for _, _, room in self.socketio.emitted)
+        self.assertEqual(rooms, sorted(f'user_{user_id}' for user_id in self.user_ids))
+        event, payload, _ = self.socketio.emitted[0]
+        self.assertEqual(event, 'notification')
+        self.assertIsNotNone(payload['id'])
+        self.assertEqual(payload['data'], {'auction_id': 1})
+
+    def test_unread_inbox_and_mark_read(self):
+        user_id = self.user_ids[0]
+        for title in ('first', 'second'):
+            self.service.notify([user_id], {'type': 'info', 'title': title})
+        self.drain()
+
+        unread = self.service.get_unread(user_id)
+        self.assertEqual(len(unread), 2)
+        self.assertEqual(json.loads(json.dumps(unread)), unread)  # plain JSON, as the other models' to_dict
+        self.assertEqual(unread[0]['created_at'], db.session.get(Notification, unread[0]['id']).created_at.isoformat())
+        self.assertEqual(self.service.mark_read(user_id, [unread[0]['id']]), 1)
+        self.assertEqual(len(self.service.get_unread(user_id)), 1)
+        self.assertEqual(self.service.get_unread(self.user_ids[1]), [])
+
+    def test_drain_stores_everything_queued(self):
+        self.service.batch_size = 2
+        self.service.notify(self.user_ids, {'type': 'outbid', 'title': 'Outbid'})
+        self.assertEqual(self.service.drain(), 3)  # two batches, in the caller
+        self.assertEqual(Notification.query.count(), 3)
+        self.assertEqual(len(self.socketio.emitted), 3)
+        self.assertEqual(self.service.drain(), 0)
+
+
+    def failing_inserts(self, failures):
+        """Patch the batch insert to raise `failures` times, then work"""
+        real_scalars = db.session.scalars
+        calls = []
+
+        def scalars(*args, **kwargs):
+            calls.append(1)
+            if len(calls) <= failures:
+                raise OperationalError('INSERT', {}, Exception('database is locked'))
+            return real_scalars(*args, **kwargs)
+
+        return mock.patch.object(db.session, 'scalars', side_effect=scalars)
+
+    def test_failed_batch_is_retried_with_backoff(self):
+        self.service.notify(self.user_ids, {'type': 'outbid'})
+        with self.failing_inserts(2):
+            self.assertEqual(self.service.drain(), 3)
+        self.assertEqual(self.socketio.slept, [0.5, 1.0])
+        self.assertEqual(Notification.query.count(), 3)
+
+    def test_batch_that_keeps_failing_is_kept_aside(self):
+        self.service.notify(self.user_ids, {'type': 'outbid'})
+        with self.failing_inserts(3):
+            self.assertEqual(self.service.drain(), 0)
+        self.assertEqual(len(self.service.failed), 3)
+        self.assertEqual(Notification.query.count(), 0)
+
+        self.assertEqual(self.service.drain(), 3)  # e.g. at shutdown, once the database is back
+        self.assertEqual((len(self.service.failed), Notification.query.count()), (0, 3))
+
+    def test_worker_survives_errors_and_is_replaced_when_it_stops(self):
+        self.service.notify(self.user_ids[:1], {'type': 'info'})
+        self.service.notify(self.user_ids[1:2], {'type': 'info'})
+        self.assertEqual(len(self.socketio.tasks), 1)
+        worker = self.socketio.tasks[0]
+
+        self.service.batch_size = 1
+        get = self.service._queue.get
+        with mock.patch.object(self.service, 'deliver', side_effect=[RuntimeError('boom'), True]) as deliver, \
+                mock.patch.object(self.service._queue, 'get',
+                                  side_effect=[get(), get(), WorkerKilled()]):
+            with self.assertRaises(WorkerKilled):
+                worker()
+        self.assertEqual(deliver.call_count, 2)  # the error did not end the loop
+
+        self.service.notify(self.user_ids[2:], {'type': 'info'})
+        self.assertEqual(len(self.socketio.tasks), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
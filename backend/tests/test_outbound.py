@@ -0,0 +1,160 @@
+"""
+Tests for per-connection outbound queues (outbound.OutboundHub)
+"""
+
+import queue
+import unittest
+
+from socketio import Manager, PubSubManager
+
+from outbound import BackpressureManager, OutboundHub, manager_class
+
+
+class FakeTransport:
+    """An Engine.IO socket whose backlog the test controls"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def fill(self, packets):
+        for _ in range(packets):
+            self.queue.put(None)
+
+    def clear(self):
+        self.queue = queue.Queue()
+
+
+class FakeSocketIO:
+    """Just enough of flask_socketio.SocketIO for the hub"""
+
+    def __init__(self, sids):
+        self.transports = {sid: FakeTransport() for sid in sids}
+        self.emitted = []
+        self.disconnected = []
+        socketio = self
+
+        class Manager:
+            def eio_sid_from_sid(self, sid, namespace):
+                return sid
+
+        class EIO:
+            sockets = self.transports
+
+        class Server:
+            manager = Manager()
+            eio = EIO()
+
+            def disconnect(self, sid, namespace=None):
+                socketio.disconnected.append(sid)
+
+        self.server = Server()
+
+    def emit(self, event, data, to=None):
+        self.emitted.append((to, event, data))
+
+
+class TestOutboundHub(unittest.TestCase):
+
+    def setUp(self):
+        self.socketio = FakeSocketIO(['fast', 'slow'])
+        self.hub = OutboundHub(self.socketio, max_depth=4, watermark=8,
+                               on_overflow=lambda sid: {'epoch': 'e1', 'seq': {'1': 9}})
+
+    def lag(self, sid='slow'):
+        self.socketio.transports[sid].fill(8)
+        self.hub.scan(['fast', 'slow'])
+
+    def catch_up(self, sid='slow'):
+        self.socketio.transports[sid].clear()
+        self.hub.pump()
+
+    def test_nobody_behind_means_plain_room_emits(self):
+        self.hub.scan(['fast', 'slow'])
+        self.assertEqual(self.hub.behind({'fast', 'slow'}), [])
+
+    def test_lagging_connection_gets_latest_price_only(self):
+        self.lag()
+        self.assertEqual(self.hub.behind({'fast', 'slow'}), ['slow'])
+        for seq, amount in enumerate((10.0, 11.0, 12.0), start=1):
+            self.hub.push('slow', 'new_bid', {'amount': amount, 'seq': seq}, auction_id=1)
+        self.hub.push('slow', 'new_bid', {'amount': 50.0, 'seq': 1}, auction_id=2)
+        self.hub.pump()
+        self.assertEqual(self.socketio.emitted, [])  # still no room in the transport
+
+        self.catch_up()
+        self.assertEqual(self.socketio.emitted, [
+            ('slow', 'new_bid', {'amount': 12.0, 'seq': 3, 'conflated': 2}),
+            ('slow', 'new_bid', {'amount': 50.0, 'seq': 1}),
+        ])
+        self.assertEqual(self.hub.counters['conflated'], 2)
+
+    def test_order_is_kept_around_conflated_prices(self):
+        self.lag()
+        self.hub.push('slow', 'new_bid', {'amount': 10.0}, auction_id=1)
+        self.hub.push('slow', 'auction_extended', {'auction_id': 1}, auction_id=1)
+        self.hub.push('slow', 'new_bid', {'amount': 11.0}, auction_id=1)
+        self.catch_up()
+        self.assertEqual([event for _, event, _ in self.socketio.emitted], ['auction_extended', 'new_bid'])
+
+    def test_presence_is_dropped_before_anything_else(self):
+        self.lag()
+        self.hub.push('slow', 'participant_joined', {'participants_count': 3}, auction_id=1)
+        self.hub.push('slow', 'participant_joined', {'participants_count': 4}, auction_id=2)
+        for auction_id in (1, 2, 3):
+            self.hub.push('slow', 'auction_extended', {'auction_id': auction_id}, auction_id=auction_id)
+        self.assertEqual(self.socketio.disconnected, [])
+        self.assertEqual(self.hub.stats()['max_depth'], 4)
+        self.assertEqual(self.hub.counters['presence_dropped'], 1)
+
+    def test_overflow_disconnects_with_resync_hint(self):
+        self.lag()
+        for auction_id in range(5):
+            self.hub.push('slow', 'auction_ended', {'auction_id': auction_id}, auction_id=auction_id)
+        self.assertEqual(self.socketio.disconnected, ['slow'])
+        self.assertEqual(self.socketio.emitted, [
+            ('slow', 'resync_required', {'epoch': 'e1', 'seq': {'1': 9}, 'reason': 'slow_consumer'})
+        ])
+        self.assertEqual(self.hub.stats()['queues'], 0)
+        self.assertEqual(self.hub.counters['overflow_disconnects'], 1)
+
+    def test_pump_respects_the_watermark(self):
+        self.lag()
+        for auction_id in range(4):
+            self.hub.push('slow', 'auction_ended', {'auction_id': auction_id}, auction_id=auction_id)
+        self.socketio.transports['slow'].clear()
+        self.socketio.transports['slow'].fill(6)
+        self.hub.pump()
+        self.assertEqual(len(self.socketio.emitted), 2)  # 8 - 6 slots free
+        self.assertEqual(self.hub.stats()['queued_frames'], 2)
+
+    def test_stays_queued_until_drained_and_rescanned(self):
+        self.lag()
+        self.hub.push('slow', 'auction_ended', {'auction_id': 1}, auction_id=1)
+        self.catch_up()
+        self.assertEqual(self.hub.behind({'slow'}), ['slow'])  # until the next scan
+        self.hub.scan(['fast', 'slow'])
+        self.assertEqual(self.hub.behind({'slow'}), [])
+
+    def test_stats(self):
+        self.lag()
+        self.hub.push('slow', 'auction_extended', {'auction_id': 1}, auction_id=1)
+        stats = self.hub.stats()
+        self.assertEqual(stats['lagging'], 1)
+        self.assertEqual(stats['depth_histogram']['1+'], 1)
+        self.assertEqual(stats['limit'], 4)
+
+
+class TestManagerClass(unittest.TestCase):
+
+    def test_local_delivery(self):
+        self.assertIs(manager_class(None), BackpressureManager)
+
+    def test_queue_managers_deliver_through_the_backpressure_check(self):
+        mro = manager_class('redis://localhost:6379/0').__mro__
+        # PubSubManager._handle_emit calls super().emit for relayed frames
+        self.assertLess(mro.index(PubSubManager), mro.index(BackpressureManager))
+        self.assertLess(mro.index(BackpressureManager), mro.index(Manager))
+
+
+if __name__ == '__main__':
+    unittest.main()
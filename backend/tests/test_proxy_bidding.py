@@ -0,0 +1,70 @@
+"""
+Tests for proxy (auto) bid resolution (proxy_bidding)
+"""
+
+import time
+import unittest
+
+from proxy_bidding import ProxyBidEngine
+
+
+class TestProxyBidEngine(unittest.TestCase):
+    """Competing maximums resolve in one pass with at most two visible bids"""
+
+    def setUp(self):
+        self.engine = ProxyBidEngine(increment_for=lambda auction_id, price: 5.0)
+
+    def test_plain_bid_without_proxies(self):
+        result = self.engine.resolve(1, 100.0, 7, [], bidder_id=8, amount=105.0)
+        self.assertEqual(result.winner_id, 8)
+        self.assertEqual(result.price, 105.0)
+        self.assertEqual(result.visible_bids, [(8, 105.0)])
+        self.assertEqual(result.outbid_user_ids, {7})
+        self.assertIsNone(result.bidder_max)
+
+    def test_proxy_bids_only_what_is_needed(self):
+        result = self.engine.resolve(1, 100.0, 7, [], bidder_id=8, amount=105.0, max_amount=300.0)
+        self.assertEqual((result.winner_id, result.price, result.bidder_max), (8, 105.0, 300.0))
+
+    def test_new_bid_absorbed_by_existing_proxy(self):
+        result = self.engine.resolve(1, 105.0, 8, [(8, 300.0)], bidder_id=9, amount=150.0)
+        self.assertEqual(result.winner_id, 8)
+        self.assertEqual(result.price, 155.0)
+        self.assertEqual(result.visible_bids, [(9, 150.0), (8, 155.0)])
+        self.assertEqual(result.outbid_user_ids, set())
+
+    def test_two_competing_proxies_resolve_at_once(self):
+        result = self.engine.resolve(1, 105.0, 8, [(8, 300.0)], bidder_id=9, amount=110.0, max_amount=500.0)
+        self.assertEqual(result.winner_id, 9)
+        self.assertEqual(result.price, 305.0)
+        self.assertEqual(result.visible_bids, [(9, 305.0)])
+        self.assertEqual(result.outbid_user_ids, {8})
+
+    def test_tie_goes_to_earlier_maximum(self):
+        result = self.engine.resolve(1, 105.0, 8, [(8, 300.0)], bidder_id=9, amount=110.0, max_amount=300.0)
+        self.assertEqual((result.winner_id, result.price), (8, 300.0))
+
+    def test_raised_maximum_queues_behind_an_equal_earlier_one(self):
+        proxies = [(9, 200.0), (8, 300.0)]
+        result = self.engine.resolve(1, 105.0, 8, proxies, bidder_id=9, amount=110.0, max_amount=300.0)
+        self.assertEqual((result.winner_id, result.price, result.bidder_max), (8, 300.0, 300.0))
+
+    def test_manual_bid_above_own_maximum_raises_it(self):
+        result = self.engine.resolve(1, 105.0, 9, [(8, 120.0)], bidder_id=8, amount=150.0)
+        self.assertEqual((result.winner_id, result.bidder_max), (8, 150.0))
+
+    def test_winner_never_pays_more_than_its_maximum(self):
+        result = self.engine.resolve(1, 105.0, 8, [(8, 300.0)], bidder_id=9, amount=110.0, max_amount=302.0)
+        self.assertEqual((result.winner_id, result.price), (9, 302.0))
+
+    def test_resolution_cost_is_linear_in_proxies(self):
+        proxies = [(user_id, 1000.0 + user_id) for user_id in range(10000)]
+        started = time.perf_counter()
+        result = self.engine.resolve(1, 100.0, None, proxies, bidder_id=99999, amount=105.0, max_amount=50000.0)
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.assertEqual(result.price, 10999.0 + 5.0)
+        self.assertEqual(len(result.visible_bids), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the N+1 query guard (query_guard)
+"""
+
+import unittest
+
+from app import create_app
+from config import TestingConfig
+from extensions import db
+from instrumentation import metrics, query_budget
+from models_enhanced import User, UserRole
+from query_guard import QueryBudgetExceeded, statement_shape
+
+
+class TestStatementShape(unittest.TestCase):
+    """Statements differing only in parameters share a shape"""
+
+    def test_placeholders_and_in_lists(self):
+        self.assertEqual(
+            statement_shape('SELECT * FROM user\n WHERE id IN (?, ?, ?) AND role = ?'),
+            statement_shape('SELECT * FROM user WHERE id IN (?, ?) AND role = ?'),
+        )
+        self.assertEqual(statement_shape('SELECT 1 WHERE id = %(id_1)s'), 'SELECT 1 WHERE id = ?')
+
+
+class TestQueryGuard(unittest.TestCase):
+    """Handlers over budget raise in tests and warn in development"""
+
+    def create_app(self, mode):
+        class GuardConfig(TestingConfig):
+            QUERY_GUARD_MODE = mode
+            QUERY_BUDGET = 20
+            QUERY_REPEAT_LIMIT = 5
+
+        app = create_app(GuardConfig)
+
+        @app.route('/test/n-plus-one')
+        def n_plus_one():
+            return {'names': [db.session.get(User, user_id).username for user_id in range(1, 9)]}
+
+        @app.route('/test/allowed')
+        @query_budget(repeats=10)
+        def allowed():
+            return {'names': [db.session.get(User, user_id).username for user_id in range(1, 9)]}
+
+        @app.route('/test/batched')
+        def batched():
+            return {'names': [user.username for user in User.query.filter(User.id.in_(range(1, 9)))]}
+
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([User(username=f'user{i}', email=f'user{i}@test.com',
+                                     password_hash='x', role=UserRole.BIDDER) for i in range(1, 9)])
+            db.session.commit()
+        return app
+
+    def tearDown(self):
+        metrics.guard = None
+        metrics.reset()
+
+    def test_repeated_statement_fails_with_call_site(self):
+        client = self.create_app('raise').test_client()
+        with self.assertRaises(QueryBudgetExceeded) as context:
+            client.get('/test/n-plus-one')
+        report = str(context.exception)
+        self.assertIn('GET /test/n-plus-one', report)
+        self.assertIn('8x the same statement', report)
+        self.assertIn('tests/test_query_guard.py', report)
+
+    def test_batched_query_passes(self):
+        client = self.create_app('raise').test_client()
+        self.assertEqual(client.get('/test/batched').status_code, 200)
+
+    def test_query_budget_override(self):
+        client = self.create_app('raise').test_client()
+        self.assertEqual(client.get('/test/allowed').status_code, 200)
+
+    def test_warn_mode_logs(self):
+        client = self.create_app('warn').test_client()
+        with self.assertLogs('mzadd.query_guard', level='WARNING') as logs:
+            self.assertEqual(client.get('/test/n-plus-one').status_code, 200)
+        self.assertIn('Query budget exceeded', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
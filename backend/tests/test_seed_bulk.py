@@ -0,0 +1,72 @@
+"""
+Tests for the bulk synthetic data generator (seed_bulk)
+"""
+
+import io
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import StaticPool
+
+import seed_bulk
+from models_enhanced import Auction, db
+
+HASHES = ['$2b$04$' + 'x' * 53]
+
+
+class TestGenerate(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://', poolclass=StaticPool)
+        db.metadata.create_all(self.engine)
+        self.connection = self.engine.connect()
+        self.progress = seed_bulk.Progress({}, stream=io.StringIO())
+
+    def tearDown(self):
+        self.connection.close()
+        self.engine.dispose()
+
+    def index_names(self, table):
+        return {index['name'] for index in inspect(self.connection).get_indexes(table)}
+
+    def test_generates_linked_rows(self):
+        counts = seed_bulk.generate(self.connection, 50, users=30, bids=400, hashes=HASHES, progress=self.progress)
+        self.assertEqual((counts['users'], counts['auctions']), (30, 50))
+        self.assertEqual(self.connection.exec_driver_sql('SELECT COUNT(*) FROM bid').scalar(), counts['bids'])
+        self.assertIn('ix_bid_auction', self.index_names('bid'))
+
+    def test_indexes_are_rebuilt_when_the_load_fails(self):
+        with mock.patch.object(seed_bulk, '_item_chunk', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                seed_bulk.generate(self.connection, 50, users=30, hashes=HASHES, progress=self.progress)
+        self.assertIn('ix_bid_auction', self.index_names('bid'))
+        self.assertIn('ix_auction_status_end_time', self.index_names(Auction.__tablename__))
+        self.assertEqual(self.connection.exec_driver_sql('SELECT COUNT(*) FROM user').scalar(), 0)
+
+
+class TestChunks(unittest.TestCase):
+
+    def test_parallel_output_matches_serial_and_stays_bounded(self):
+        plan = {'seed': 1, 'users': 25000, 'first_user': 1, 'first_bidder': 100, 'merchants': 99,
+                'bidders': 24901, 'hashes': HASHES, 'now': seed_bulk.datetime(2026, 1, 1)}
+        serial = list(seed_bulk._chunks(seed_bulk._user_chunk, 3, plan, processes=1))
+
+        submitted = []
+        real_executor = seed_bulk.ProcessPoolExecutor
+
+        class CountingExecutor(real_executor):
+            def submit(self, fn, *args):
+                submitted.append(args[0])
+                return super().submit(fn, *args)
+
+        with mock.patch.object(seed_bulk, 'ProcessPoolExecutor', CountingExecutor):
+            chunks = seed_bulk._chunks(seed_bulk._user_chunk, 3, plan, processes=2, in_flight=1)
+            first = next(chunks)
+            self.assertEqual(submitted, [0])  # nothing generated ahead of the writer
+            parallel = [first] + list(chunks)
+        self.assertEqual(parallel, serial)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for the JSON serializer, model schemas and Socket.IO packet encoding
+"""
+
+import json
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from flask import jsonify
+from socketio import packet
+
+import serialization
+from app import create_app
+from config import TestingConfig
+from models_enhanced import User, UserRole
+from serialization import BACKENDS, Many, Schema, SocketIOJSON, dumps, use_backend
+
+
+class Lot:
+    def __init__(self, id, bids=(), seller=None):
+        self.id = id
+        self.price = Decimal('12.50')
+        self.ends = datetime(2026, 3, 1, 12, 30, 5, 250000)
+        self.bids = list(bids)
+        self.seller = seller
+
+
+class TestSerializer(unittest.TestCase):
+    """Both backends produce the same JSON for the types the app emits"""
+
+    payload = {
+        'when': datetime(2026, 3, 1, 12, 30, 5, 250000),
+        'price': Decimal('10.25'),
+        'role': UserRole.MERCHANT,
+        'ids': {3},
+        'nested': {'end_time': datetime(2026, 3, 1)},
+    }
+    expected = {
+        'when': '2026-03-01T12:30:05.250000',
+        'price': 10.25,
+        'role': 'merchant',
+        'ids': [3],
+        'nested': {'end_time': '2026-03-01T00:00:00'},
+    }
+
+    def tearDown(self):
+        use_backend('orjson')
+
+    def test_backends_agree(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                use_backend(backend)
+                self.assertEqual(json.loads(dumps(self.payload)), self.expected)
+
+    def test_unknown_types_still_fail(self):
+        with self.assertRaises(TypeError):
+            dumps({'value': object()})
+
+    def test_socketio_packets(self):
+        class Packet(packet.Packet):
+            json = SocketIOJSON
+
+        encoded = Packet(packet.EVENT, ['new_bid', self.payload]).encode()
+        decoded = Packet(encoded_packet=encoded)
+        self.assertEqual(decoded.data, ['new_bid', self.expected])
+
+
+class TestSchema(unittest.TestCase):
+    """Compiled schemas build the same dicts a hand-written to_dict would"""
+
+    def test_nested_and_many(self):
+        bid = Schema('id', 'price')
+        lot = Schema('id', 'ends', bids=Many(bid), seller=Schema('id'))
+        data = lot.dump(Lot(1, bids=[Lot(2), Lot(3)]))
+        self.assertEqual(data['seller'], None)
+        self.assertEqual([child['id'] for child in data['bids']], [2, 3])
+        self.assertEqual(lot.only('id').dump(Lot(4)), {'id': 4})
+        self.assertEqual(set(lot.extend('price').dump(Lot(5))), {'id', 'ends', 'bids', 'seller', 'price'})
+
+    def test_models_serialize_through_their_schema(self):
+        user = User(id=7, username='sam', email='sam@example.com', password_hash='secret',
+                    role=UserRole.BIDDER, is_active=True, is_verified=False,
+                    created_at=datetime(2026, 1, 2))
+        data = json.loads(dumps(user))
+        self.assertEqual((data['username'], data['role'], data['created_at']),
+                         ('sam', 'bidder', '2026-01-02T00:00:00'))
+        self.assertNotIn('password_hash', data)
+
+    def test_jsonify_uses_the_provider(self):
+        app = create_app(TestingConfig)
+        with app.app_context():
+            response = jsonify({'price': Decimal('1.5'), 'at': datetime(2026, 1, 1)})
+        self.assertEqual(response.get_json(), {'price': 1.5, 'at': '2026-01-01T00:00:00'})
+        self.assertIs(app.json.__class__, serialization.FastJSONProvider)
+
+
+if __name__ == '__main__':
+    unittest.main()
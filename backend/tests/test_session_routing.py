@@ -0,0 +1,182 @@
+"""
+Tests for read/write session routing (extensions.RoutingSession / read_only)
+and the pool metrics behind /api/monitoring/db-pool
+"""
+
+import unittest
+import tempfile
+import os
+import threading
+
+import jwt
+from sqlalchemy import create_engine
+
+from app import create_app
+from config import TestingConfig
+from db_fixtures import DatabaseTestCase
+from extensions import PRIMARY_COOKIE, db, pool_stats, read_only, track_pool
+from models_enhanced import User, UserRole
+
+
+class FileDatabaseTestCase(unittest.TestCase):
+    """An app on a temporary SQLite file, so it gets a separate read-only pool"""
+
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+
+        class FileConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.db_path}'
+            SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'check_same_thread': False}}
+
+        self.app = create_app(FileConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add(User(username='reader', email='reader@test.com',
+                            password_hash='x', role=UserRole.BIDDER))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        for engine in (db.engine, self.app.extensions['read_engine']):
+            engine.dispose()
+        self.app_context.pop()
+        os.close(self.db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+
+class TestSessionRouting(FileDatabaseTestCase):
+    """Queries inside @read_only go to the read engine, flushes to the primary"""
+
+    def test_read_engine_is_separate_pool(self):
+        read_engine = self.app.extensions['read_engine']
+        self.assertIsNot(read_engine, db.engine)
+        self.assertIn('mode=ro', str(read_engine.url))
+
+    def test_read_only_scope_uses_read_engine(self):
+        @read_only
+        def lookup():
+            return db.session.get_bind(User), User.query.filter_by(username='reader').first()
+
+        bind, user = lookup()
+        self.assertIs(bind, self.app.extensions['read_engine'])
+        self.assertEqual(user.email, 'reader@test.com')
+        self.assertIs(db.session.get_bind(User), db.engine)
+
+    def test_writes_go_to_primary(self):
+        @read_only
+        def rename():
+            user = User.query.filter_by(username='reader').first()
+            user.first_name = 'Routed'
+            db.session.commit()
+
+        rename()
+        db.session.expire_all()
+        self.assertEqual(User.query.filter_by(username='reader').first().first_name, 'Routed')
+
+    def test_read_connection_is_released_when_the_scope_ends(self):
+        read_engine = self.app.extensions['read_engine']
+
+        @read_only
+        def lookup():
+            return User.query.filter_by(username='reader').first().email
+
+        self.assertEqual(lookup(), 'reader@test.com')
+        self.assertFalse(db.session().in_transaction())
+        self.assertEqual(read_engine.pool.checkedout(), 0)
+
+    def test_reads_after_a_write_see_it(self):
+        @read_only
+        def lookup(username):
+            return db.session.get_bind(User), User.query.filter_by(username=username).first()
+
+        db.session.add(User(username='writer', email='writer@test.com', password_hash='x', role=UserRole.BIDDER))
+        db.session.flush()
+        bind, user = lookup('writer')
+        self.assertIs(bind, db.engine)
+        self.assertIsNotNone(user)
+        db.session.commit()  # the transaction ended: reads go to the read engine again
+        self.assertIs(lookup('writer')[0], self.app.extensions['read_engine'])
+
+    def test_pending_changes_survive_the_scope(self):
+        user = User.query.filter_by(username='reader').first()
+        user.first_name = 'Pending'
+        read_only(lambda: None)()
+        db.session.commit()
+        db.session.expire_all()
+        self.assertEqual(User.query.filter_by(username='reader').first().first_name, 'Pending')
+
+
+class TestReadYourWrites(FileDatabaseTestCase):
+    """A client that just wrote over REST reads from the primary for a while"""
+
+    def setUp(self):
+        super().setUp()
+
+        @self.app.route('/test/rename', methods=['POST'])
+        def rename():
+            User.query.filter_by(username='reader').first().first_name = 'Renamed'
+            db.session.commit()
+            return {}
+
+        @self.app.route('/test/bind')
+        @read_only
+        def which_bind():
+            return {'primary': db.session.get_bind(User) is db.engine}
+
+        self.client = self.app.test_client()
+
+    def test_writer_is_pinned_to_the_primary(self):
+        self.assertFalse(self.client.get('/test/bind').get_json()['primary'])
+        response = self.client.post('/test/rename')
+        self.assertIn(PRIMARY_COOKIE, response.headers['Set-Cookie'])
+        self.assertTrue(self.client.get('/test/bind').get_json()['primary'])
+        self.client.delete_cookie(PRIMARY_COOKIE)
+        self.assertFalse(self.client.get('/test/bind').get_json()['primary'])
+
+
+class TestPoolMonitoring(DatabaseTestCase):
+    """Pool counters are exact under concurrent checkouts and only admins see them"""
+
+    def get(self, username=None):
+        headers = {}
+        if username:
+            token = jwt.encode({'id': self.users[username].id}, self.app.config['SECRET_KEY'], algorithm='HS256')
+            headers['Authorization'] = f'Bearer {token}'
+        return self.client.get('/api/monitoring/db-pool', headers=headers)
+
+    def test_admin_only_and_no_database_url(self):
+        self.assertEqual(self.get().status_code, 401)
+        self.assertEqual(self.get('bidder_test').status_code, 403)
+        response = self.get('admin_test')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('url', response.get_json()['primary'])
+        self.assertNotIn('sqlite:', response.get_data(as_text=True))
+
+    def test_checkouts_counted_exactly_across_threads(self):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        self.addCleanup(os.unlink, path)
+        self.addCleanup(os.close, fd)
+        engine = create_engine(f'sqlite:///{path}', pool_size=8, connect_args={'check_same_thread': False})
+        self.addCleanup(engine.dispose)
+        track_pool(engine)
+
+        def check_out():
+            for _ in range(200):
+                engine.connect().close()
+
+        threads = [threading.Thread(target=check_out) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = pool_stats(engine)
+        self.assertEqual(stats['checkouts_total'], 1600)
+        self.assertLessEqual(stats['peak_checkedout'], 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Tests for the server time-sync protocol (time_sync)
+"""
+
+import unittest
+from datetime import datetime
+
+from time_sync import ClockSync, auction_time_payload, now_ms, offset_and_delay, sync_reply
+
+
+def exchange(client_send, skew, outbound, server_time, inbound):
+    """One simulated round: client clock = server clock - skew"""
+    t1 = client_send + skew + outbound
+    reply = {'t0': client_send, 't1': t1, 't2': t1 + server_time}
+    return reply, reply['t2'] - skew + inbound
+
+
+class TestOffset(unittest.TestCase):
+
+    def test_symmetric_path_gives_the_exact_offset(self):
+        reply, received = exchange(1000, skew=250, outbound=20, server_time=1, inbound=20)
+        offset, delay = offset_and_delay(reply['t0'], reply['t1'], reply['t2'], received)
+        self.assertEqual((offset, delay), (250, 40))
+
+    def test_lowest_delay_sample_wins(self):
+        clock = ClockSync(window=4)
+        clock.add(*exchange(1000, skew=250, outbound=300, server_time=1, inbound=10))  # queued on the way out
+        clock.add(*exchange(2000, skew=250, outbound=15, server_time=1, inbound=15))
+        clock.add(*exchange(3000, skew=250, outbound=10, server_time=1, inbound=200))
+        self.assertEqual(clock.offset, 250)
+        self.assertEqual(clock.server_now(5000), 5250)
+
+    def test_window_forgets_old_samples(self):
+        clock = ClockSync(window=2)
+        clock.add(*exchange(1000, skew=100, outbound=1, server_time=0, inbound=1))
+        for start in (2000, 3000):
+            clock.add(*exchange(start, skew=400, outbound=30, server_time=0, inbound=30))
+        self.assertEqual(clock.offset, 400)
+
+    def test_countdown_uses_server_clock(self):
+        clock = ClockSync()
+        clock.add(*exchange(1000, skew=5000, outbound=10, server_time=0, inbound=10))
+        self.assertEqual(clock.remaining_ms(end_time_ms=20_000, client_ms=10_000), 5_000)
+        self.assertEqual(clock.remaining_ms(end_time_ms=20_000, client_ms=30_000), 0)
+
+
+class TestServerSide(unittest.TestCase):
+
+    def test_sync_reply(self):
+        received = now_ms()
+        reply = sync_reply(123.5, received)
+        self.assertEqual((reply['t0'], reply['t1']), (123.5, received))
+        self.assertGreaterEqual(reply['t2'], received)
+
+    def test_auction_time_payload(self):
+        payload = auction_time_payload(3, datetime(1970, 1, 1), datetime(1970, 1, 1, 0, 0, 2), 'active')
+        self.assertEqual((payload['start_time'], payload['end_time'], payload['status']), (0, 2000, 'active'))
+        self.assertIsNone(auction_time_payload(3, None, None, 'pending')['end_time'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Tests for the watch-list inverted index and lifecycle fan-out (watchlist)
+"""
+
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from sqlalchemy.exc import OperationalError
+
+from db_fixtures import DatabaseTestCase
+from models_enhanced import Watch, db
+from watchlist import WatchIndex, WatchListService
+
+
+class RecordingNotifications:
+    def __init__(self):
+        self.sent = []
+
+    def notify(self, user_ids, notification_data):
+        self.sent.append((set(user_ids), notification_data))
+
+
+class TestWatchIndex(unittest.TestCase):
+    """Both directions of the index stay consistent"""
+
+    def test_add_remove(self):
+        index = WatchIndex()
+        self.assertTrue(index.add(1, 10))
+        self.assertFalse(index.add(1, 10))
+        index.add(2, 10)
+        index.add(1, 11)
+        self.assertEqual(index.watchers(10), {1, 2})
+        self.assertEqual(index.watched_by(1), {10, 11})
+        self.assertTrue(index.remove(1, 10))
+        self.assertFalse(index.remove(1, 10))
+        self.assertEqual(index.watchers(10), {2})
+        self.assertEqual(len(index), 2)
+
+    def test_drop_auction(self):
+        index = WatchIndex()
+        index.load([(1, 10), (2, 10), (2, 11)])
+        self.assertEqual(index.drop_auction(10), {1, 2})
+        self.assertEqual(index.watched_by(1), set())
+        self.assertEqual(index.watched_by(2), {11})
+        self.assertEqual(len(index), 1)
+
+    def test_lookup_cost_does_not_grow_with_index_size(self):
+        index = WatchIndex()
+        index.load((user_id, user_id % 50000) for user_id in range(500000))
+        started = time.perf_counter()
+        for _ in range(1000):
+            index.watchers(12345)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(len(index.watchers(12345)), 10)
+
+
+class TestWatchListFanOut(DatabaseTestCase):
+    """Ending-soon notices go to every watcher once per auction"""
+
+    def setUp(self):
+        super().setUp()
+        self.notifications = RecordingNotifications()
+        self.service = WatchListService(self.notifications)
+        self.first, self.second, self.third = (self.users[name].id
+                                               for name in ('admin_test', 'merchant_test', 'bidder_test'))
+        entries = [(self.first, 10), (self.second, 10), (self.third, 11)]
+        db.session.add_all(Watch(user_id=user_id, auction_id=auction_id) for user_id, auction_id in entries)
+        db.session.commit()
+        self.service.index.load(entries)
+
+    def test_ending_soon_batches_watchers(self):
+        end_time = datetime(2025, 1, 1, 12, 0)
+        self.service.on_ending_soon([10, 11, 12], {10: end_time})
+        self.assertEqual([users for users, _ in self.notifications.sent], [{self.first, self.second}, {self.third}])
+        self.assertEqual(self.notifications.sent[0][1]['data']['end_time'], end_time.isoformat())
+
+    def test_unwatch_through_another_process_is_not_notified(self):
+        other_process = WatchListService(RecordingNotifications())
+        self.assertTrue(other_process.unwatch(self.second, 10))  # its index never saw the watch
+        self.assertEqual(Watch.query.filter_by(auction_id=10).count(), 1)
+
+        self.service.on_ending_soon([10, 11])
+        self.assertEqual([users for users, _ in self.notifications.sent], [{self.first}, {self.third}])
+        self.assertEqual(self.service.index.watchers(10), {self.first})
+
+    def test_ending_soon_is_announced_once_until_extended(self):
+        self.service.on_ending_soon([10])
+        self.service.on_ending_soon([10])
+        self.assertEqual(len(self.notifications.sent), 1)
+        self.service.on_auction_extended(10)
+        self.service.on_ending_soon([10])
+        self.assertEqual(len(self.notifications.sent), 2)
+
+    def test_new_end_time_is_announced_again(self):
+        end_time = datetime(2025, 1, 1, 12, 0)
+        self.service.on_ending_soon([10], {10: end_time})
+        self.service.on_ending_soon([10], {10: end_time + timedelta(seconds=30)})
+        self.assertEqual(len(self.notifications.sent), 2)
+
+    def test_announcements_only_cover_the_current_window(self):
+        for auction_id in range(100, 1100):
+            self.service.on_ending_soon([auction_id, 10])
+        self.assertEqual(set(self.service._announced_ending), {1099, 10})
+        self.assertEqual(len(self.notifications.sent), 1)
+
+
+class TestWatchPersistence(DatabaseTestCase):
+    """The index only changes once the watch table has committed"""
+
+    def setUp(self):
+        super().setUp()
+        self.service = WatchListService(RecordingNotifications())
+        self.user_id = self.users['bidder_test'].id
+
+    def test_watch_and_unwatch(self):
+        self.assertTrue(self.service.watch(self.user_id, 10))
+        self.assertEqual(Watch.query.filter_by(user_id=self.user_id).count(), 1)
+        self.assertTrue(self.service.unwatch(self.user_id, 10))
+        self.assertEqual(Watch.query.filter_by(user_id=self.user_id).count(), 0)
+        self.assertEqual(len(self.service.index), 0)
+
+    def test_failed_commit_leaves_the_index_alone(self):
+        with mock.patch.object(db.session, 'commit', side_effect=OperationalError('commit', {}, None)):
+            with self.assertRaises(OperationalError):
+                self.service.watch(self.user_id, 10)
+        self.assertFalse(self.service.index.is_watching(self.user_id, 10))
+        self.assertTrue(self.service.watch(self.user_id, 10))
+
+        with mock.patch.object(db.session, 'commit', side_effect=OperationalError('commit', {}, None)):
+            with self.assertRaises(OperationalError):
+                self.service.unwatch(self.user_id, 10)
+        self.assertTrue(self.service.index.is_watching(self.user_id, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+"""
+Tests for the live-bidding socket handlers (websocket_server)
+"""
+
+import os
+import signal
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+import jwt
+
+from db_fixtures import DatabaseTestCase
+from models_enhanced import Auction, AuctionStatus, Bid, Item, ItemStatus, ProxyBid, db
+from handoff import issue_resume_token
+from idempotency import bid_dedupe
+from wire_codec import auction_room
+from websocket_server import create_websocket_server, install_drain_handler
+
+
+class SocketTestCase(DatabaseTestCase):
+    """A socket server on the class's app; each test gets an open auction and clients per user"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = create_websocket_server(cls.app, cls.app.config['SECRET_KEY'])
+
+    def setUp(self):
+        super().setUp()
+        item = Item(name='Clock', start_price=100.0, status=ItemStatus.ACTIVE, owner=self.users['merchant_test'])
+        self.auction = Auction(item=item, current_price=100.0, status=AuctionStatus.ACTIVE,
+                               end_time=datetime.utcnow() + timedelta(hours=1))
+        db.session.add(self.auction)
+        db.session.commit()
+
+    def connect(self, username):
+        client = self.server.socketio.test_client(self.app)
+        self.addCleanup(client.disconnect)
+        token = jwt.encode({'user_id': self.users[username].id}, self.app.config['SECRET_KEY'], algorithm='HS256')
+        client.emit('authenticate', {'token': token})
+        self.assertEqual(self.events(client, 'auth_success')[0]['username'], username)
+        return client
+
+    @staticmethod
+    def events(client, name):
+        return [event['args'][0] for event in client.get_received() if event['name'] == name]
+
+    def bid(self, client, amount, **extra):
+        client.emit('place_bid', dict({'auction_id': self.auction.id, 'amount': amount}, **extra))
+        return {event['name']: event['args'][0] for event in client.get_received()
+                if event['name'] in ('bid_confirmation', 'bid_error')}
+
+
+class TestProxyBids(SocketTestCase):
+
+    def test_proxy_maximum_is_stored_with_the_bid_and_answers_later_bids(self):
+        bidder = self.connect('bidder_test')
+        confirmation = self.bid(bidder, 105.0, max_amount=300.0)['bid_confirmation']
+        self.assertEqual((confirmation['current_price'], confirmation['max_amount']), (105.0, 300.0))
+        self.assertEqual(ProxyBid.query.filter_by(auction_id=self.auction.id).one().max_amount, 300.0)
+
+        rival = self.connect('admin_test')
+        confirmation = self.bid(rival, 150.0)['bid_confirmation']
+        self.assertFalse(confirmation['leading'])
+        self.assertEqual(confirmation['current_price'], 155.0)
+        self.assertEqual(Bid.query.filter_by(auction_id=self.auction.id).count(), 3)
+
+    def test_invalid_maximum_is_rejected_inside_the_handler(self):
+        bidder = self.connect('bidder_test')
+        self.assertIn('bid_error', self.bid(bidder, 105.0, max_amount=100.0))
+        self.assertIn('bid_error', self.bid(bidder, 105.0, max_amount='lots'))
+        self.assertEqual(ProxyBid.query.count(), 0)
+
+    def test_failed_commit_leaves_no_proxy_behind(self):
+        bidder = self.connect('bidder_test')
+        with mock.patch.object(db.session, 'commit', side_effect=RuntimeError('database is locked')):
+            self.assertIn('bid_error', self.bid(bidder, 105.0, max_amount=300.0))
+        self.assertEqual(ProxyBid.query.count(), 0)
+        # nothing was remembered in memory either: the next bid starts clean
+        confirmation = self.bid(bidder, 105.0)['bid_confirmation']
+        self.assertIsNone(confirmation['max_amount'])
+
+
+class TestResends(SocketTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(bid_dedupe.clear)
+
+    def test_resend_missed_by_the_dedupe_table_is_replayed_from_the_database(self):
+        bidder = self.connect('bidder_test')
+        first = self.bid(bidder, 105.0, client_bid_id='tab-1')['bid_confirmation']
+        bid_dedupe.clear()  # as after a restart, or on another process
+
+        resent = self.bid(bidder, 105.0, client_bid_id='tab-1')['bid_confirmation']
+        self.assertTrue(resent['duplicate'])
+        self.assertEqual((resent['bid_id'], resent['current_price']), (first['bid_id'], 105.0))
+        self.assertEqual(Bid.query.filter_by(auction_id=self.auction.id).count(), 1)
+
+    def test_bid_answered_by_a_proxy_keeps_its_client_bid_id(self):
+        self.bid(self.connect('bidder_test'), 105.0, max_amount=300.0)
+        rival = self.connect('admin_test')
+        self.assertFalse(self.bid(rival, 150.0, client_bid_id='tab-2')['bid_confirmation']['leading'])
+
+        stored = Bid.query.filter_by(bidder_id=self.users['admin_test'].id).one()
+        self.assertEqual((stored.amount, stored.client_bid_id), (150.0, 'tab-2'))
+        bid_dedupe.clear()
+        self.assertTrue(self.bid(rival, 150.0, client_bid_id='tab-2')['bid_confirmation']['duplicate'])
+
+
+class TestExtensions(SocketTestCase):
+    """Extensions are counted on the auction row, in the bid's own commit"""
+
+    def setUp(self):
+        super().setUp()
+        self.auction.end_time = datetime.utcnow() + timedelta(seconds=60)
+        db.session.commit()
+        self.server.policies.set_auction_rules(self.auction.id, {'max_extensions': 2})
+        self.addCleanup(self.server.policies.clear_auction, self.auction.id)
+
+    def test_count_is_stored_and_caps_later_extensions(self):
+        bidder = self.connect('bidder_test')
+        end_time = self.auction.end_time
+        self.bid(bidder, 105.0)
+        db.session.refresh(self.auction)
+        self.assertEqual(self.auction.extension_count, 1)
+        self.assertGreater(self.auction.end_time, end_time)
+
+        # another process used the last extension
+        self.auction.extension_count = 2
+        self.auction.end_time = datetime.utcnow() + timedelta(seconds=60)
+        db.session.commit()
+        end_time = self.auction.end_time
+        self.bid(bidder, 110.0)
+        db.session.refresh(self.auction)
+        self.assertEqual((self.auction.extension_count, self.auction.end_time), (2, end_time))
+
+    def test_failed_commit_does_not_count(self):
+        bidder = self.connect('bidder_test')
+        end_time = self.auction.end_time
+        with mock.patch.object(db.session, 'commit', side_effect=RuntimeError('database is locked')):
+            self.assertIn('bid_error', self.bid(bidder, 105.0))
+        db.session.refresh(self.auction)
+        self.assertEqual((self.auction.extension_count, self.auction.end_time), (0, end_time))
+
+
+class TestBackpressureAtDelivery(SocketTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.hub = self.server.outbound
+        self.addCleanup(setattr, self.hub, 'lagging', set())
+
+    def join(self, username):
+        client = self.connect(username)
+        client.emit('join_auction', {'auction_id': self.auction.id})
+        client.get_received()
+        sid = next(sid for sid, info in self.server.connected_users.items()
+                   if info['user_id'] == self.users[username].id)
+        self.addCleanup(self.hub.discard, sid)
+        return client, sid
+
+    def test_frames_relayed_from_the_message_queue_are_queued_for_lagging_clients(self):
+        fast, _ = self.join('bidder_test')
+        slow, slow_sid = self.join('admin_test')
+        self.hub.lagging = {slow_sid}
+
+        # what PubSubManager._handle_emit does with a frame another process published
+        manager = self.server.socketio.server.manager
+        for amount in (110.0, 120.0):
+            manager.emit('new_bid', {'auction_id': self.auction.id, 'amount': amount}, '/',
+                         room=auction_room(self.auction.id))
+        self.assertEqual([frame['amount'] for frame in self.events(fast, 'new_bid')], [110.0, 120.0])
+        self.assertEqual(self.events(slow, 'new_bid'), [])
+
+        self.hub.pump()
+        self.assertEqual(self.events(slow, 'new_bid'),
+                         [{'auction_id': self.auction.id, 'amount': 120.0, 'conflated': 1}])
+
+    def test_replies_to_a_lagging_client_wait_behind_its_queue(self):
+        client, sid = self.join('bidder_test')
+        self.hub.lagging = {sid}
+        self.hub.push(sid, 'auction_extended', {'auction_id': self.auction.id}, self.auction.id)
+        self.assertEqual(self.bid(client, 105.0), {})
+
+        self.hub.pump()
+        names = [event['name'] for event in client.get_received()]
+        self.assertLess(names.index('auction_extended'), names.index('bid_confirmation'))
+
+    def test_outbound_stats_are_admin_only(self):
+        self.assertEqual(self.client.get('/api/monitoring/outbound').status_code, 401)
+        token = jwt.encode({'id': self.users['admin_test'].id}, self.app.config['SECRET_KEY'], algorithm='HS256')
+        response = self.client.get('/api/monitoring/outbound', headers={'Authorization': f'Bearer {token}'})
+        self.assertIn('queued_frames', response.get_json())
+
+
+class TestResync(SocketTestCase):
+    """A last_seq that is not a number gets a snapshot, not an error"""
+
+    def setUp(self):
+        super().setUp()
+        self.server.event_log.append(self.auction.id, 'new_bid', {'amount': 105.0})
+
+    def test_resync_auction(self):
+        client = self.connect('bidder_test')
+        for last_seq in ('abc', [0], None):
+            client.emit('resync_auction', {'auction_id': self.auction.id, 'last_seq': last_seq,
+                                           'epoch': self.server.event_log.epoch})
+            self.assertEqual(self.events(client, 'auction_status')[0]['auction_id'], self.auction.id)
+        client.emit('resync_auction', {'auction_id': self.auction.id, 'epoch': self.server.event_log.epoch,
+                                       'last_seq': str(self.server.event_log.current_seq(self.auction.id) - 1)})
+        self.assertEqual(len(self.events(client, 'auction_resync')), 1)
+
+    def test_resume_session(self):
+        user = self.users['bidder_test']
+        saved = {'user_id': user.id, 'username': user.username, 'role': user.role.value,
+                 'encoding': 'json', 'auctions': [self.auction.id]}
+        token = issue_resume_token(self.app.config['SECRET_KEY'], user.id, 'resume-1', ttl=60)
+        client = self.server.socketio.test_client(self.app)
+        self.addCleanup(client.disconnect)
+        for last_seq in ({str(self.auction.id): 'abc'}, ['abc']):
+            with mock.patch.object(self.server, 'claim_saved_session', return_value=dict(saved)):
+                client.emit('resume_session', {'resume_token': token, 'last_seq': last_seq,
+                                               'epoch': self.server.event_log.epoch})
+            resumed = self.events(client, 'session_resumed')[0]
+            self.assertEqual(resumed['snapshot_required'], [self.auction.id])
+
+
+class TestDrainHandler(SocketTestCase):
+
+    def test_signal_schedules_the_drain_then_hands_over(self):
+        self.addCleanup(signal.signal, signal.SIGTERM, signal.getsignal(signal.SIGTERM))
+        handed_over = []
+        signal.signal(signal.SIGTERM, lambda signum, frame: handed_over.append(self.server.handed_off))
+        install_drain_handler(self.server)
+
+        os.kill(os.getpid(), signal.SIGTERM)
+        self.assertTrue(self.server.draining)  # the handler returned without waiting
+        deadline = time.monotonic() + 5
+        while not handed_over and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(handed_over, [True])  # gunicorn's handler runs after the handoff
@@ -0,0 +1,78 @@
+"""
+Tests for the compact WebSocket wire encoding (wire_codec)
+"""
+
+import json
+import unittest
+from datetime import datetime
+
+import wire_codec
+from wire_codec import (
+    ENCODING_JSON, ENCODING_MSGPACK, auction_room, decode_compact,
+    encode_compact, encode_json, epoch_millis, negotiate_encoding
+)
+
+
+@unittest.skipUnless(wire_codec.compact_available(), 'msgpack not installed')
+class TestCompactEncoding(unittest.TestCase):
+    """MessagePack frames with short field codes and epoch-millis timestamps"""
+
+    def setUp(self):
+        self.bid_data = {
+            'auction_id': 42,
+            'bid_id': 1001,
+            'amount': 250.0,
+            'bidder_name': 'bidder_test',
+            'timestamp': datetime(2025, 1, 1, 12, 0, 0),
+            'total_bids': 17,
+            'unique_bidders': 6
+        }
+
+    def test_short_codes_and_millis(self):
+        frame = decode_compact(encode_compact(self.bid_data))
+        self.assertEqual(frame['a'], 42)
+        self.assertEqual(frame['p'], 250.0)
+        self.assertEqual(frame['t'], 1735732800000)
+
+    def test_compact_frame_is_smaller_than_json(self):
+        json_size = len(json.dumps(encode_json(self.bid_data)).encode())
+        self.assertLess(len(encode_compact(self.bid_data)), json_size / 2)
+
+    def test_update_data_is_flattened(self):
+        frame = decode_compact(encode_compact({
+            'auction_id': 7,
+            'update_data': {'current_price': 90.0, 'status': 'active'},
+            'timestamp': datetime(2025, 1, 1)
+        }))
+        self.assertNotIn('update_data', frame)
+        self.assertEqual(frame['r'], 90.0)
+        self.assertEqual(frame['s'], 'active')
+
+    def test_every_field_has_its_own_code(self):
+        self.assertEqual(len(set(wire_codec.FIELD_CODES.values())), len(wire_codec.FIELD_CODES))
+        frame = decode_compact(encode_compact({
+            'amount': 100.0, 'current_price': 100.0, 'bidder_name': 'b', 'username': 'b',
+            'new_end_time': datetime(2025, 1, 1), 'end_time': datetime(2025, 1, 1)
+        }))
+        self.assertEqual(len(frame), 6)
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate_encoding('msgpack'), ENCODING_MSGPACK)
+        self.assertEqual(negotiate_encoding(None), ENCODING_JSON)
+        self.assertEqual(auction_room(3, ENCODING_MSGPACK), 'auction_3:mp')
+
+
+class TestJsonFallback(unittest.TestCase):
+    """Legacy clients keep receiving the verbose JSON payload"""
+
+    def test_datetimes_become_iso_strings(self):
+        data = encode_json({'auction_id': 1, 'update_data': {'end_time': datetime(2025, 1, 1)}})
+        self.assertEqual(data['update_data']['end_time'], '2025-01-01T00:00:00')
+        self.assertEqual(auction_room(1), 'auction_1')
+
+    def test_epoch_millis(self):
+        self.assertEqual(epoch_millis(datetime(1970, 1, 1, 0, 0, 1)), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Server Time Sync for Mzadd Platform
+NTP-style clock offset estimation over the socket. A client sends its
+clock (t0), the server answers with when it received and sent the reply
+(t1, t2), and the client notes when the reply arrived (t3):
+
+    offset = ((t1 - t0) + (t2 - t3)) / 2     server clock - client clock
+    delay  = (t3 - t0) - (t2 - t1)           network round trip
+
+With the offset and the end times pushed in `auction_time` on every
+lifecycle change, countdowns render locally instead of polling
+`get_auction_status`. All times are epoch milliseconds.
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from wire_codec import epoch_millis
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def sync_reply(client_send, server_receive: int) -> Dict:
+    """The server's half of one exchange; `server_receive` is taken on arrival"""
+    return {'t0': client_send, 't1': server_receive, 't2': now_ms()}
+
+
+def offset_and_delay(t0: float, t1: float, t2: float, t3: float) -> Tuple[float, float]:
+    return ((t1 - t0) + (t2 - t3)) / 2, (t3 - t0) - (t2 - t1)
+
+
+class ClockSync:
+    """
+    Client-side estimator (reference for the web/mobile clients and used by
+    the load generator): keeps the last `window` samples and trusts the
+    offset of the one with the smallest delay, which had the least
+    asymmetric queueing.
+    """
+
+    def __init__(self, window: int = 8):
+        self.window = window
+        self.samples: List[Tuple[float, float]] = []  # (delay, offset)
+
+    def add(self, reply: Dict, received_ms: float) -> Tuple[float, float]:
+        sample = offset_and_delay(reply['t0'], reply['t1'], reply['t2'], received_ms)
+        self.samples.append((sample[1], sample[0]))
+        del self.samples[:-self.window]
+        return sample
+
+    @property
+    def offset(self) -> Optional[float]:
+        return min(self.samples)[1] if self.samples else None
+
+    def server_now(self, client_ms: float) -> float:
+        return client_ms + (self.offset or 0)
+
+    def remaining_ms(self, end_time_ms: float, client_ms: float) -> float:
+        """Countdown to a server-clock end time, from the client's clock"""
+        return max(end_time_ms - self.server_now(client_ms), 0)
+
+
+def auction_time_payload(auction_id: int, start_time: Optional[datetime], end_time: Optional[datetime],
+                         status) -> Dict:
+    """Pushed as `auction_time` whenever an auction's end time or status changes"""
+    return {
+        'auction_id': auction_id,
+        'status': getattr(status, 'value', status),
+        'start_time': epoch_millis(start_time) if start_time else None,
+        'end_time': epoch_millis(end_time) if end_time else None,
+        'server_time': now_ms(),
+    }
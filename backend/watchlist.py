@@ -0,0 +1,221 @@
+"""
+Watch-list Subsystem for Mzadd Platform
+Keeps an in-memory inverted index of who watches which auction (persisted
+in the `watch` table) and turns auction lifecycle events into outbid and
+ending-soon notifications for every interested user in bulk
+
+The index is per process: with SERVER_PROCESSES > 1 each process only
+adds the watches made through it (plus what it loaded at startup), and
+an unwatch on one process does not reach the others' indexes. The watch
+table is what counts, so unwatch always deletes the row and ending-soon
+recipients are checked against it before anything is sent.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from models_enhanced import db, Watch
+
+logger = logging.getLogger(__name__)
+
+
+class WatchIndex:
+    """Inverted index: auction -> watchers and user -> watched auctions"""
+
+    def __init__(self):
+        self._watchers: Dict[int, Set[int]] = defaultdict(set)
+        self._watched: Dict[int, Set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._size = 0
+
+    def load(self, entries: Iterable[Tuple[int, int]]):
+        """Bulk load (user_id, auction_id) pairs"""
+        with self._lock:
+            for user_id, auction_id in entries:
+                watchers = self._watchers[auction_id]
+                if user_id not in watchers:
+                    watchers.add(user_id)
+                    self._watched[user_id].add(auction_id)
+                    self._size += 1
+
+    def add(self, user_id: int, auction_id: int) -> bool:
+        """Returns False if the user already watched the auction"""
+        with self._lock:
+            watchers = self._watchers[auction_id]
+            if user_id in watchers:
+                return False
+            watchers.add(user_id)
+            self._watched[user_id].add(auction_id)
+            self._size += 1
+            return True
+
+    def remove(self, user_id: int, auction_id: int) -> bool:
+        with self._lock:
+            watchers = self._watchers.get(auction_id)
+            if not watchers or user_id not in watchers:
+                return False
+            watchers.discard(user_id)
+            if not watchers:
+                del self._watchers[auction_id]
+            watched = self._watched[user_id]
+            watched.discard(auction_id)
+            if not watched:
+                del self._watched[user_id]
+            self._size -= 1
+            return True
+
+    def drop_auction(self, auction_id: int) -> Set[int]:
+        """Forget a finished auction; O(watchers). Returns its former watchers"""
+        with self._lock:
+            watchers = self._watchers.pop(auction_id, set())
+            for user_id in watchers:
+                watched = self._watched[user_id]
+                watched.discard(auction_id)
+                if not watched:
+                    del self._watched[user_id]
+            self._size -= len(watchers)
+            return watchers
+
+    def watchers(self, auction_id: int) -> Set[int]:
+        with self._lock:
+            return set(self._watchers.get(auction_id, ()))
+
+    def watched_by(self, user_id: int) -> Set[int]:
+        with self._lock:
+            return set(self._watched.get(user_id, ()))
+
+    def is_watching(self, user_id: int, auction_id: int) -> bool:
+        return user_id in self._watchers.get(auction_id, ())
+
+    def __len__(self):
+        return self._size
+
+
+class WatchListService:
+    """Persists watches and fans lifecycle events out to watchers"""
+
+    def __init__(self, notifications, ending_soon_window: int = 600):
+        self.notifications = notifications
+        self.ending_soon_window = ending_soon_window  # seconds
+        self.index = WatchIndex()
+        # auction -> end time it was announced for; only auctions still in
+        # the ending-soon window are kept
+        self._announced_ending: Dict[int, Optional[datetime]] = {}
+
+    def load(self, batch_size: int = 10000):
+        """Rebuild the index from the watch table, streaming in batches"""
+        rows = db.session.execute(
+            select(Watch.user_id, Watch.auction_id).execution_options(yield_per=batch_size)
+        )
+        self.index.load(rows)
+        logger.info(f"Loaded {len(self.index)} watch entries")
+
+    def watch(self, user_id: int, auction_id: int) -> bool:
+        """Persist first; the index only changes once the row is committed"""
+        if self.index.is_watching(user_id, auction_id):
+            return False
+        try:
+            db.session.add(Watch(user_id=user_id, auction_id=auction_id))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # already persisted by another process
+        except Exception:
+            db.session.rollback()
+            raise
+        return self.index.add(user_id, auction_id)
+
+    def unwatch(self, user_id: int, auction_id: int) -> bool:
+        """Deletes the row even when the watch was made through another process"""
+        try:
+            result = db.session.execute(delete(Watch).where(Watch.user_id == user_id, Watch.auction_id == auction_id))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        removed = self.index.remove(user_id, auction_id)
+        return result.rowcount > 0 or removed
+
+    def on_new_bid(self, auction_id: int, bidder_id: int, amount: float,
+                   outbid_user_ids: Iterable[int] = ()):
+        """
+        A bid was accepted: the bidder starts watching the auction and every
+        user who lost the lead gets an outbid notice, in one batch.
+        """
+        self.watch(bidder_id, auction_id)
+        outbid = {user_id for user_id in outbid_user_ids if user_id and user_id != bidder_id}
+        if outbid:
+            self.notifications.notify(outbid, {
+                'type': 'outbid',
+                'title': 'You have been outbid',
+                'message': f'A higher bid of {amount} KWD was placed',
+                'data': {'auction_id': auction_id, 'amount': amount}
+            })
+
+    def on_ending_soon(self, auction_ids: Iterable[int], ends_at: Optional[Dict[int, datetime]] = None):
+        """
+        Notify the watchers of each auction once per end time; O(watchers)
+        per auction, and one query checks them all against the watch table.
+        auction_ids is the whole current window: auctions that left it are
+        forgotten, so the bookkeeping never outgrows the window.
+        """
+        ends_at = ends_at or {}
+        auction_ids = list(auction_ids)
+        announced = self._announced_ending
+        self._announced_ending = {}
+        due = {}
+        for auction_id in auction_ids:
+            end_time = ends_at.get(auction_id)
+            self._announced_ending[auction_id] = end_time
+            if auction_id in announced and announced[auction_id] == end_time:
+                continue
+            watchers = self.index.watchers(auction_id)
+            if watchers:
+                due[auction_id] = watchers
+        if not due:
+            return
+        persisted = self._persisted_watchers(due)
+        for auction_id, watchers in due.items():
+            for user_id in watchers - persisted[auction_id]:
+                self.index.remove(user_id, auction_id)  # unwatched through another process
+            watchers &= persisted[auction_id]
+            if not watchers:
+                continue
+            end_time = ends_at.get(auction_id)
+            self.notifications.notify(watchers, {
+                'type': 'ending_soon',
+                'title': 'Auction ending soon',
+                'message': 'An auction you are watching is about to end',
+                'data': {
+                    'auction_id': auction_id,
+                    'end_time': end_time.isoformat() if end_time else None
+                }
+            })
+
+    def _persisted_watchers(self, auction_ids: Iterable[int]) -> Dict[int, Set[int]]:
+        """Watchers per auction as the watch table has them, in one query"""
+        persisted = defaultdict(set)
+        rows = db.session.execute(
+            select(Watch.auction_id, Watch.user_id).where(Watch.auction_id.in_(list(auction_ids)))
+        )
+        for auction_id, user_id in rows:
+            persisted[auction_id].add(user_id)
+        return persisted
+
+    def on_auction_extended(self, auction_id: int):
+        """An extended auction may be announced again when it nears its new end"""
+        self._announced_ending.pop(auction_id, None)
+
+    def on_auction_closed(self, auction_id: int):
+        try:
+            db.session.execute(delete(Watch).where(Watch.auction_id == auction_id))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self.index.drop_auction(auction_id)
+        self._announced_ending.pop(auction_id, None)
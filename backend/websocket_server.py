@@ -4,15 +4,38 @@ Handles live bidding, notifications, and auction status updates
 """
 
 import asyncio
+import functools
 import json
 import logging
+import os
+import signal
+import threading
 from datetime import datetime
-from typing import Dict, Set, Optional
+from typing import Dict, List, Optional, Set, Tuple
 import jwt
-from flask import Flask
+from flask import Flask, request
 from flask_socketio import SocketIO, emit, join_room, leave_room, disconnect
-from models_enhanced import db, User, Auction, Bid, AuctionStatus
-from business_logic import revenue_manager
+from sqlalchemy.exc import IntegrityError
+from extensions import socketio_options
+from models_enhanced import db, User, Auction, Bid, AuctionStatus, ProxyBid
+from job_queue import enqueue
+from jobs import enqueue_unsettled_auctions
+from idempotency import DONE, PENDING, bid_dedupe, valid_client_bid_id
+from bid_journal import open_journal
+from outbound import BackpressureManager, OutboundHub
+from time_sync import auction_time_payload, now_ms, sync_reply
+from handoff import decode_resume_token, issue_resume_token, new_resume_id, open_handoff_store
+from auction_events import open_event_log, parse_seq
+from notifications import NotificationService, user_room
+from watchlist import WatchListService
+from ending_soon import ending_soon_index, track_auction_changes
+from proxy_bidding import ProxyBidEngine
+from bid_policy import PolicyEngine
+from instrumentation import instrument_socketio, timed
+from wire_codec import (
+    ENCODING_JSON, ENCODING_MSGPACK, FIELD_CODES, auction_room, compact_available,
+    encode_compact, encode_json, negotiate_encoding
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,13 +47,8 @@ class AuctionWebSocketServer:
     def __init__(self, app: Flask, secret_key: str):
         self.app = app
         self.secret_key = secret_key
-        self.socketio = SocketIO(
-            app, 
-            cors_allowed_origins="*",
-            async_mode='threading',
-            logger=True,
-            engineio_logger=True
-        )
+        # the app's SocketIO (extensions.socketio) when create_app set one up
+        self.socketio = app.extensions.get('socketio') or SocketIO(app, **socketio_options(app))
         
         # Connection tracking
         self.connected_users: Dict[str, Dict] = {}  # session_id -> user_info
@@ -40,7 +58,55 @@ class AuctionWebSocketServer:
         # Auction timers
         self.auction_timers: Dict[int, asyncio.Task] = {}
         
+        # Per-auction event sequence and recent deltas for resync
+        self.event_log = open_event_log(app.config)
+        
+        # Persistent inbox + per-user room delivery
+        self.notifications = NotificationService(app, self.socketio)
+        
+        # Watch lists: outbid / ending-soon fan-out to interested users
+        self.watchlist = WatchListService(
+            self.notifications, ending_soon_window=app.config.get('ENDING_SOON_WINDOW', 600)
+        )
+        
+        # Active auctions sorted by end_time, kept current from ORM commits
+        self.ending_soon = ending_soon_index
+        # ...and every committed change of an end time or status is pushed as
+        # `auction_time`, so clients count down locally instead of polling
+        track_auction_changes(self.ending_soon, db.session, Auction, AuctionStatus.ACTIVE,
+                              on_change=self.broadcast_auction_time)
+        
+        # Increment ladders and anti-sniping rules, compiled once from config
+        self.policies = PolicyEngine.from_config(app.config)
+        
+        # Proxy (auto) bids: maximums read from proxy_bid inside each bid's transaction
+        self.proxy_engine = ProxyBidEngine(increment_for=self.policies.increment_for)
+        self.bid_dedupe = bid_dedupe
+        
+        # Append-only journal of accepted bids / extensions / closes for crash recovery
+        self.journal = open_journal(app.config, app.root_path)
+        
+        # Drain mode and hot handoff of sessions to the replacing process
+        self.handoff = open_handoff_store(app.config, app.root_path)
+        self.draining = False  # no new joins / authentications
+        self.handed_off = False  # state saved: no new bids either
+        self._bids_in_flight = 0
+        self._bid_gate = threading.Condition()
+        
+        # Bounded per-connection queues for clients that fall behind on broadcasts
+        self.outbound = OutboundHub(
+            self.socketio,
+            max_depth=app.config.get('OUTBOUND_MAX_DEPTH', 256),
+            watermark=app.config.get('OUTBOUND_WATERMARK', 32),
+            scan_interval=app.config.get('OUTBOUND_SCAN_INTERVAL', 0.1),
+            on_overflow=self.resync_hint
+        )
+        if isinstance(self.socketio.server.manager, BackpressureManager):
+            self.outbound.attach(self.socketio.server.manager)
+        app.extensions['outbound'] = self.outbound
+        
         self.setup_event_handlers()
+        instrument_socketio(self.socketio, app)
     
     def setup_event_handlers(self):
         """Setup WebSocket event handlers"""
@@ -48,7 +114,7 @@ class AuctionWebSocketServer:
         @self.socketio.on('connect')
         def handle_connect(auth=None):
             """Handle client connection"""
-            session_id = self.socketio.request.sid
+            session_id = request.sid
             logger.info(f"Client connected: {session_id}")
             
             # Send connection confirmation
@@ -61,9 +127,11 @@ class AuctionWebSocketServer:
         @self.socketio.on('disconnect')
         def handle_disconnect():
             """Handle client disconnection"""
-            session_id = self.socketio.request.sid
+            session_id = request.sid
             logger.info(f"Client disconnected: {session_id}")
             
+            self.outbound.discard(session_id)
+            
             # Clean up user session
             if session_id in self.connected_users:
                 user_info = self.connected_users[session_id]
@@ -81,16 +149,26 @@ class AuctionWebSocketServer:
                 
                 del self.connected_users[session_id]
         
+        @self.socketio.on('time_sync')
+        def handle_time_sync(data=None):
+            """Handle one clock-offset sample (see time_sync.py); no auth or database"""
+            received = now_ms()
+            emit('time_sync', sync_reply((data or {}).get('t0'), received))
+        
         @self.socketio.on('authenticate')
         def handle_authenticate(data):
             """Handle user authentication"""
-            session_id = self.socketio.request.sid
+            session_id = request.sid
             token = data.get('token')
             
             if not token:
                 emit('auth_error', {'message': 'Token required'})
                 return
             
+            if self.draining:
+                emit('server_draining', self.draining_payload())
+                return
+            
             try:
                 # Decode JWT token
                 payload = jwt.decode(token, self.secret_key, algorithms=['HS256'])
@@ -107,25 +185,26 @@ class AuctionWebSocketServer:
                     return
                 
                 # Store user session
-                self.connected_users[session_id] = {
-                    'user_id': user_id,
-                    'username': user.username,
-                    'role': user.role.value,
-                    'connected_at': datetime.utcnow()
-                }
-                
-                # Track user sessions
-                if user_id not in self.user_sessions:
-                    self.user_sessions[user_id] = set()
-                self.user_sessions[user_id].add(session_id)
+                encoding = negotiate_encoding(data.get('encoding'))
+                resume_token = self._register_session(session_id, user_id, user.username, user.role.value, encoding)
                 
                 logger.info(f"User authenticated: {user.username} ({session_id})")
                 
-                emit('auth_success', {
+                auth_data = {
                     'user_id': user_id,
                     'username': user.username,
-                    'role': user.role.value
-                })
+                    'role': user.role.value,
+                    'encoding': encoding,
+                    'resume_token': resume_token
+                }
+                if encoding == ENCODING_MSGPACK:
+                    auth_data['field_codes'] = FIELD_CODES
+                emit('auth_success', auth_data)
+                
+                # Deliver everything that arrived while the user was offline
+                unread = self.notifications.get_unread(user_id)
+                if unread:
+                    emit('notifications_unread', {'notifications': unread, 'count': len(unread)})
                 
             except jwt.ExpiredSignatureError:
                 emit('auth_error', {'message': 'Token expired'})
@@ -135,10 +214,66 @@ class AuctionWebSocketServer:
                 logger.error(f"Authentication error: {str(e)}")
                 emit('auth_error', {'message': 'Authentication failed'})
         
+        @self.socketio.on('resume_session')
+        def handle_resume_session(data):
+            """
+            Handle a client reconnecting after a deploy: the resume token
+            replaces authenticate, saved rooms are re-joined, and each auction
+            gets only the events the client missed (sent as last_seq per auction)
+            """
+            session_id = request.sid
+            
+            if self.draining:
+                emit('server_draining', self.draining_payload())
+                return
+            
+            try:
+                claims = decode_resume_token(self.secret_key, data.get('resume_token') or '')
+            except jwt.InvalidTokenError:
+                emit('resume_failed', {'reason': 'invalid_token'})
+                return
+            
+            saved = self.claim_saved_session(claims['resume_id'])
+            if saved is None or saved['user_id'] != claims['user_id']:
+                emit('resume_failed', {'reason': 'unknown_session'})
+                return
+            
+            encoding = saved['encoding']
+            resume_token = self._register_session(session_id, saved['user_id'], saved['username'],
+                                                  saved['role'], encoding)
+            last_seqs = data.get('last_seq')
+            if not isinstance(last_seqs, dict):
+                last_seqs = {}
+            resync, snapshot_required = [], []
+            for auction_id in saved['auctions']:
+                join_room(auction_room(auction_id, encoding))
+                self.auction_participants.setdefault(auction_id, set()).add(session_id)
+                last_seq = parse_seq(last_seqs.get(str(auction_id)))
+                missed = self.event_log.since(auction_id, last_seq, data.get('epoch'))
+                if missed is None:
+                    snapshot_required.append(auction_id)
+                else:
+                    resync.append(self.resync_payload(auction_id, missed))
+            
+            logger.info(f"User {saved['username']} resumed ({session_id}), {len(saved['auctions'])} auctions")
+            resumed = {
+                'user_id': saved['user_id'],
+                'username': saved['username'],
+                'role': saved['role'],
+                'encoding': encoding,
+                'resume_token': resume_token,
+                'epoch': self.event_log.epoch,
+                'auctions': resync,
+                'snapshot_required': snapshot_required
+            }
+            if encoding == ENCODING_MSGPACK:
+                resumed['field_codes'] = FIELD_CODES
+            emit('session_resumed', resumed)
+        
         @self.socketio.on('join_auction')
         def handle_join_auction(data):
             """Handle user joining an auction room"""
-            session_id = self.socketio.request.sid
+            session_id = request.sid
             auction_id = data.get('auction_id')
             
             if session_id not in self.connected_users:
@@ -149,36 +284,53 @@ class AuctionWebSocketServer:
                 emit('error', {'message': 'Auction ID required'})
                 return
             
+            if self.draining:
+                emit('server_draining', self.draining_payload())
+                return
+            
             try:
-                # Verify auction exists and is active
-                auction = Auction.query.get(auction_id)
-                if not auction:
-                    emit('error', {'message': 'Auction not found'})
-                    return
+                # A reconnecting client sends the last sequence it applied;
+                # if the log still covers the gap, no snapshot is needed.
+                seq = self.event_log.current_seq(auction_id)
+                missed = self.event_log.since(auction_id, parse_seq(data.get('last_seq')), data.get('epoch'))
                 
-                # Join auction room
-                join_room(f'auction_{auction_id}')
+                if missed is None:
+                    # Verify auction exists and is active
+                    auction = Auction.query.get(auction_id)
+                    if not auction:
+                        emit('error', {'message': 'Auction not found'})
+                        return
+                
+                user_info = self.connected_users[session_id]
+                
+                # Join auction room (JSON or compact, as negotiated)
+                join_room(auction_room(auction_id, user_info['encoding']))
                 
                 # Track participant
                 if auction_id not in self.auction_participants:
                     self.auction_participants[auction_id] = set()
                 self.auction_participants[auction_id].add(session_id)
                 
-                user_info = self.connected_users[session_id]
                 logger.info(f"User {user_info['username']} joined auction {auction_id}")
                 
-                # Send current auction state
-                emit('auction_joined', {
-                    'auction_id': auction_id,
-                    'auction_data': auction.to_dict(include_item=True),
-                    'participants_count': len(self.auction_participants[auction_id])
-                })
+                # Send current auction state, or only the missed events
+                if missed is None:
+                    emit('auction_joined', {
+                        'auction_id': auction_id,
+                        'auction_data': auction.to_dict(include_item=True),
+                        'participants_count': len(self.auction_participants[auction_id]),
+                        'seq': seq,
+                        'epoch': self.event_log.epoch,
+                        'server_time': now_ms()
+                    })
+                else:
+                    emit('auction_resync', self.resync_payload(auction_id, missed))
                 
                 # Notify other participants
-                emit('participant_joined', {
+                self.broadcast('participant_joined', auction_id, {
                     'username': user_info['username'],
                     'participants_count': len(self.auction_participants[auction_id])
-                }, room=f'auction_{auction_id}', include_self=False)
+                }, skip_sid=session_id, sequenced=False)
                 
             except Exception as e:
                 logger.error(f"Error joining auction: {str(e)}")
@@ -187,7 +339,7 @@ class AuctionWebSocketServer:
         @self.socketio.on('leave_auction')
         def handle_leave_auction(data):
             """Handle user leaving an auction room"""
-            session_id = self.socketio.request.sid
+            session_id = request.sid
             auction_id = data.get('auction_id')
             
             if session_id not in self.connected_users:
@@ -195,21 +347,22 @@ class AuctionWebSocketServer:
             
             if auction_id and auction_id in self.auction_participants:
                 self.auction_participants[auction_id].discard(session_id)
-                leave_room(f'auction_{auction_id}')
                 
                 user_info = self.connected_users[session_id]
+                leave_room(auction_room(auction_id, user_info['encoding']))
                 logger.info(f"User {user_info['username']} left auction {auction_id}")
                 
                 # Notify other participants
-                emit('participant_left', {
+                self.broadcast('participant_left', auction_id, {
                     'username': user_info['username'],
                     'participants_count': len(self.auction_participants[auction_id])
-                }, room=f'auction_{auction_id}')
+                }, sequenced=False)
         
         @self.socketio.on('place_bid')
+        @self.bid_gate
         def handle_place_bid(data):
             """Handle bid placement"""
-            session_id = self.socketio.request.sid
+            session_id = request.sid
             
             if session_id not in self.connected_users:
                 emit('bid_error', {'message': 'Not authenticated'})
@@ -219,34 +372,98 @@ class AuctionWebSocketServer:
             user_id = user_info['user_id']
             auction_id = data.get('auction_id')
             bid_amount = data.get('amount')
+            max_amount = data.get('max_amount')  # optional proxy maximum
             
             if not auction_id or not bid_amount:
                 emit('bid_error', {'message': 'Auction ID and bid amount required'})
                 return
             
+            # Idempotent resends: the same client_bid_id replays the original outcome
+            client_bid_id = data.get('client_bid_id')
+            if client_bid_id is not None:
+                if not valid_client_bid_id(client_bid_id):
+                    emit('bid_error', {'message': 'Invalid client_bid_id'})
+                    return
+                state, outcome = self.bid_dedupe.claim(user_id, client_bid_id)
+                if state == DONE:
+                    emit(outcome['event'], dict(outcome['data'], duplicate=True))
+                    return
+                if state == PENDING:
+                    emit('bid_pending', {'auction_id': auction_id, 'client_bid_id': client_bid_id})
+                    return
+            
+            def reply(event, payload):
+                # final outcomes are remembered for resends of the same client_bid_id
+                if client_bid_id is not None:
+                    payload['client_bid_id'] = client_bid_id
+                    self.bid_dedupe.complete(user_id, client_bid_id, {'event': event, 'data': payload})
+                emit(event, payload)
+            
+            def replay(original):
+                # stored by another process or before a restart: confirm it again
+                reply('bid_confirmation', {
+                    'success': True,
+                    'bid_id': original.id,
+                    'amount': original.amount,
+                    'auction_id': original.auction_id,
+                    'current_price': db.session.get(Auction, original.auction_id).current_price,
+                    'duplicate': True
+                })
+            
             try:
+                # A resend the in-memory table missed must not be validated
+                # against the price its own first copy already set
+                if client_bid_id is not None:
+                    original = Bid.query.filter_by(bidder_id=user_id, client_bid_id=client_bid_id).first()
+                    if original is not None:
+                        replay(original)
+                        return
+                
+                bid_amount = float(bid_amount)
+                max_amount = float(max_amount) if max_amount is not None else None
+                if max_amount is not None and max_amount < bid_amount:
+                    reply('bid_error', {'message': 'Maximum bid cannot be lower than the bid amount'})
+                    return
+                
+                # The row lock serialises bids on this auction (where the
+                # database has row locks) from here to the commit
+                auction = db.session.get(Auction, auction_id, with_for_update=True)
+                
                 # Validate bid
                 validation_result = self.validate_bid(user_id, auction_id, bid_amount)
                 if not validation_result['valid']:
-                    emit('bid_error', {'message': validation_result['message']})
+                    db.session.rollback()
+                    reply('bid_error', {'message': validation_result['message']})
                     return
                 
-                # Create bid
-                bid = Bid(
-                    auction_id=auction_id,
-                    bidder_id=user_id,
-                    amount=float(bid_amount),
-                    timestamp=datetime.utcnow(),
-                    is_valid=True
+                previous_leader_id = auction.winning_bid.bidder_id if auction.winning_bid else None
+                
+                # Resolve against competing proxy maximums in one pass; only the
+                # resulting visible bids are stored
+                resolution = self.proxy_engine.resolve(
+                    auction_id, auction.current_price, previous_leader_id,
+                    self.load_proxies(auction_id, auction.current_price), user_id, bid_amount, max_amount
                 )
+                if resolution.bidder_max is not None:
+                    self.save_proxy_bid(auction_id, user_id, resolution.bidder_max)
                 
-                db.session.add(bid)
+                now = datetime.utcnow()
+                bids = [
+                    Bid(auction_id=auction_id, bidder_id=bidder_id, amount=amount,
+                        timestamp=now, is_valid=True)
+                    for bidder_id, amount in resolution.visible_bids
+                ]
+                if client_bid_id is not None:
+                    # the bidder's own bid, also when a proxy answered it
+                    next(b for b in bids if b.bidder_id == user_id).client_bid_id = client_bid_id
+                db.session.add_all(bids)
+                db.session.flush()
+                bid = bids[-1]
                 
                 # Update auction
-                auction = Auction.query.get(auction_id)
-                auction.current_price = float(bid_amount)
+                auction.current_price = resolution.price
                 auction.winning_bid_id = bid.id
-                auction.total_bids += 1
+                auction.total_bids += len(bids)
                 
                 # Update unique bidders count
                 existing_bidder = Bid.query.filter_by(
@@ -256,48 +473,136 @@ class AuctionWebSocketServer:
                 if not existing_bidder:
                     auction.unique_bidders += 1
                 
+                # Anti-sniping: extend late bids as the auction's policy allows,
+                # counted on the (locked) auction row in the bid's own commit
+                time_remaining = (auction.end_time - datetime.utcnow()).total_seconds()
+                extension_time = self.policies.extension_for(auction_id, time_remaining,
+                                                             auction.extension_count or 0)
+                if extension_time:
+                    auction.extend_auction(extension_time)
+                
                 db.session.commit()
+                if self.journal:
+                    self.journal.record_bids(auction_id, [(b.id, b.bidder_id, b.amount) for b in bids])
                 
-                logger.info(f"Bid placed: {bid_amount} KWD by {user_info['username']} on auction {auction_id}")
+                logger.info(f"Bid placed: {bid_amount} KWD by {user_info['username']} on auction {auction_id}, "
+                            f"price now {resolution.price} KWD")
                 
-                # Broadcast bid to all auction participants
+                # Broadcast one new_bid for the whole resolution
+                if resolution.winner_id == user_id:
+                    winner_name = user_info['username']
+                else:
+                    winner_name = User.query.get(resolution.winner_id).username
                 bid_data = {
                     'auction_id': auction_id,
                     'bid_id': bid.id,
-                    'amount': float(bid_amount),
-                    'bidder_name': user_info['username'],
-                    'timestamp': bid.timestamp.isoformat(),
+                    'amount': resolution.price,
+                    'bidder_name': winner_name,
+                    'timestamp': bid.timestamp,
                     'total_bids': auction.total_bids,
                     'unique_bidders': auction.unique_bidders
                 }
                 
-                emit('new_bid', bid_data, room=f'auction_{auction_id}')
+                self.broadcast('new_bid', auction_id, bid_data)
+                
+                # Winner now watches the auction; outbid notices are queued
+                # for the notification worker to store and push
+                self.watchlist.on_new_bid(auction_id, resolution.winner_id, resolution.price,
+                                          resolution.outbid_user_ids)
                 
                 # Send confirmation to bidder
-                emit('bid_confirmation', {
+                reply('bid_confirmation', {
                     'success': True,
-                    'bid_id': bid.id,
-                    'amount': float(bid_amount),
-                    'auction_id': auction_id
+                    'bid_id': bids[0].id,
+                    'amount': resolution.visible_bids[0][1],
+                    'auction_id': auction_id,
+                    'current_price': resolution.price,
+                    'leading': resolution.winner_id == user_id,
+                    'max_amount': resolution.bidder_max
                 })
                 
-                # Check if auction should be extended (last 5 minutes)
-                time_remaining = (auction.end_time - datetime.utcnow()).total_seconds()
-                if time_remaining < 300:  # 5 minutes
-                    auction.extend_auction(300)  # Extend by 5 minutes
-                    db.session.commit()
+                if extension_time:
+                    if self.journal:
+                        self.journal.record_extension(auction_id, auction.end_time, auction.extension_count)
+                    self.watchlist.on_auction_extended(auction_id)
                     
-                    emit('auction_extended', {
+                    self.broadcast('auction_extended', auction_id, {
                         'auction_id': auction_id,
-                        'new_end_time': auction.end_time.isoformat(),
-                        'extension_time': 300
-                    }, room=f'auction_{auction_id}')
+                        'new_end_time': auction.end_time,
+                        'extension_time': extension_time
+                    })
                 
+            except IntegrityError:
+                db.session.rollback()
+                # Stored concurrently by another process: replay it
+                original = Bid.query.filter_by(bidder_id=user_id, client_bid_id=client_bid_id).first()
+                if client_bid_id is None or original is None:
+                    self.bid_dedupe.release(user_id, client_bid_id)
+                    emit('bid_error', {'message': 'Failed to place bid'})
+                    return
+                replay(original)
             except Exception as e:
                 db.session.rollback()
+                if client_bid_id is not None:
+                    self.bid_dedupe.release(user_id, client_bid_id)
                 logger.error(f"Error placing bid: {str(e)}")
                 emit('bid_error', {'message': 'Failed to place bid'})
         
+        @self.socketio.on('watch_auction')
+        def handle_watch_auction(data):
+            """Handle adding an auction to the user's watch list"""
+            self._update_watch(data, watch=True)
+        
+        @self.socketio.on('unwatch_auction')
+        def handle_unwatch_auction(data):
+            """Handle removing an auction from the user's watch list"""
+            self._update_watch(data, watch=False)
+        
+        @self.socketio.on('subscribe_ending_soon')
+        def handle_subscribe_ending_soon(data=None):
+            """Handle joining the ending-soon broadcast channel"""
+            join_room('ending_soon')
+            emit('ending_soon', self.ending_soon_payload())
+        
+        @self.socketio.on('unsubscribe_ending_soon')
+        def handle_unsubscribe_ending_soon(data=None):
+            """Handle leaving the ending-soon broadcast channel"""
+            leave_room('ending_soon')
+        
+        @self.socketio.on('mark_notifications_read')
+        def handle_mark_notifications_read(data):
+            """Handle marking inbox notifications as read"""
+            session_id = request.sid
+            
+            if session_id not in self.connected_users:
+                emit('error', {'message': 'Not authenticated'})
+                return
+            
+            try:
+                user_id = self.connected_users[session_id]['user_id']
+                updated = self.notifications.mark_read(user_id, data.get('notification_ids', []))
+                emit('notifications_marked_read', {'count': updated})
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error marking notifications read: {str(e)}")
+                emit('error', {'message': 'Failed to update notifications'})
+        
+        @self.socketio.on('resync_auction')
+        def handle_resync_auction(data):
+            """Handle a client that detected a gap in the event sequence"""
+            auction_id = data.get('auction_id')
+            
+            if not auction_id:
+                emit('error', {'message': 'Auction ID required'})
+                return
+            
+            # anything that is not a number gets a snapshot, like a gap would
+            missed = self.event_log.since(auction_id, parse_seq(data.get('last_seq')), data.get('epoch'))
+            if missed is not None:
+                emit('auction_resync', self.resync_payload(auction_id, missed))
+            else:
+                handle_get_auction_status(data)
+        
         @self.socketio.on('get_auction_status')
         def handle_get_auction_status(data):
             """Handle auction status request"""
@@ -308,6 +613,7 @@ class AuctionWebSocketServer:
                 return
             
             try:
+                seq = self.event_log.current_seq(auction_id)
                 auction = Auction.query.get(auction_id)
                 if not auction:
                     emit('error', {'message': 'Auction not found'})
@@ -315,13 +621,184 @@ class AuctionWebSocketServer:
                 
                 emit('auction_status', {
                     'auction_id': auction_id,
-                    'auction_data': auction.to_dict(include_item=True, include_bids=True)
+                    'auction_data': auction.to_dict(include_item=True, include_bids=True),
+                    'seq': seq,
+                    'epoch': self.event_log.epoch,
+                    'server_time': now_ms()
                 })
                 
             except Exception as e:
                 logger.error(f"Error getting auction status: {str(e)}")
                 emit('error', {'message': 'Failed to get auction status'})
     
+    def _register_session(self, session_id: str, user_id: int, username: str, role: str, encoding: str) -> str:
+        """Track an authenticated session; returns the token that resumes it on another process"""
+        resume_id = new_resume_id()
+        self.connected_users[session_id] = {
+            'user_id': user_id,
+            'username': username,
+            'role': role,
+            'encoding': encoding,
+            'resume_id': resume_id,
+            'connected_at': datetime.utcnow()
+        }
+        
+        # Track user sessions
+        if user_id not in self.user_sessions:
+            self.user_sessions[user_id] = set()
+        self.user_sessions[user_id].add(session_id)
+        join_room(user_room(user_id))
+        return issue_resume_token(self.secret_key, user_id, resume_id, self.app.config.get('RESUME_TOKEN_TTL', 300))
+    
+    def bid_gate(self, handler):
+        """Counts bids in flight so drain() can wait for them; refuses new ones once handed off"""
+        @functools.wraps(handler)
+        def gated(data):
+            with self._bid_gate:
+                if self.handed_off:
+                    emit('bid_error', {'message': 'Server is restarting, please resend the bid', 'retry': True})
+                    return
+                self._bids_in_flight += 1
+            try:
+                return handler(data)
+            finally:
+                with self._bid_gate:
+                    self._bids_in_flight -= 1
+                    self._bid_gate.notify_all()
+        return gated
+    
+    def draining_payload(self) -> Dict:
+        return {
+            'message': 'Server is restarting',
+            'reconnect': True,
+            # clients pick a random delay up to this, so reconnects are spread out
+            'reconnect_spread': self.app.config.get('DRAIN_RECONNECT_SPREAD', 5)
+        }
+    
+    @timed('task drain')
+    def drain(self, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Stop accepting joins, let in-flight bids finish, flush pending writes
+        and save sessions, room membership and event-log sequences for the
+        replacing process. Returns the handoff file, if one was written.
+        """
+        if self.handed_off:
+            return None
+        self.draining = True
+        if timeout is None:
+            timeout = self.app.config.get('DRAIN_TIMEOUT', 10)
+        with self._bid_gate:
+            if not self._bid_gate.wait_for(lambda: self._bids_in_flight == 0, timeout):
+                logger.warning(f"Draining with {self._bids_in_flight} bids still in flight")
+            self.handed_off = True
+        
+        self.notifications.drain()
+        if self.journal:
+            self.journal.close()
+        path = None
+        if self.handoff:
+            path = self.handoff.save(self.saved_sessions(), self.event_log.export())
+        self.socketio.emit('server_draining', self.draining_payload())
+        logger.info(f"Drained: {len(self.connected_users)} sessions handed off" + (f" to {path}" if path else ""))
+        return path
+    
+    def saved_sessions(self) -> Dict[str, Dict]:
+        """resume_id -> user, encoding and joined auctions of every live session"""
+        auctions_by_session: Dict[str, list] = {}
+        for auction_id, participants in self.auction_participants.items():
+            for session_id in participants:
+                auctions_by_session.setdefault(session_id, []).append(auction_id)
+        return {
+            user_info['resume_id']: self._saved_session(user_info, auctions_by_session.get(session_id, []))
+            for session_id, user_info in self.connected_users.items()
+        }
+    
+    @staticmethod
+    def _saved_session(user_info: Dict, auctions: list) -> Dict:
+        return {
+            'user_id': user_info['user_id'],
+            'username': user_info['username'],
+            'role': user_info['role'],
+            'encoding': user_info['encoding'],
+            'auctions': auctions
+        }
+    
+    def resync_hint(self, session_id: str) -> Dict:
+        """
+        Sent to a slow consumer before it is disconnected: the sequences it
+        should catch up to. Its session stays resumable with its resume token.
+        """
+        auctions = [auction_id for auction_id, participants in self.auction_participants.items()
+                    if session_id in participants]
+        user_info = self.connected_users.get(session_id)
+        resumable = bool(self.handoff and user_info)
+        if resumable:
+            self.handoff.hold(user_info['resume_id'], self._saved_session(user_info, auctions))
+        return {
+            'epoch': self.event_log.epoch,
+            'seq': {str(auction_id): self.event_log.current_seq(auction_id) for auction_id in auctions},
+            'resume': resumable
+        }
+    
+    def load_handoff(self) -> bool:
+        """Take over a drained predecessor's sessions and sequences, if it left any"""
+        state = self.handoff.load()
+        if state is None:
+            return False
+        adopted = self.event_log.adopt(state['event_log'])
+        logger.info(f"Loaded handoff of {len(state['sessions'])} sessions"
+                    + (f", continuing epoch {self.event_log.epoch}" if adopted else ", sequences not adopted"))
+        return True
+    
+    def claim_saved_session(self, resume_id: str) -> Optional[Dict]:
+        if not self.handoff:
+            return None
+        saved = self.handoff.claim(resume_id)
+        # A rolling reload starts this process before the old one has drained
+        if saved is None and self.load_handoff():
+            saved = self.handoff.claim(resume_id)
+        return saved
+    
+    def load_proxies(self, auction_id: int, current_price: float) -> List[Tuple[int, float]]:
+        """Proxy maximums still above the price, in registration order (read in the bid's transaction)"""
+        return db.session.query(ProxyBid.user_id, ProxyBid.max_amount).filter(
+            ProxyBid.auction_id == auction_id,
+            ProxyBid.max_amount > current_price
+        ).order_by(ProxyBid.created_at, ProxyBid.id).all()
+    
+    def save_proxy_bid(self, auction_id: int, user_id: int, max_amount: float):
+        """Persist a proxy maximum (committed together with the bid); a raise queues behind earlier maximums"""
+        proxy = ProxyBid.query.filter_by(auction_id=auction_id, user_id=user_id).first()
+        if proxy is None:
+            db.session.add(ProxyBid(auction_id=auction_id, user_id=user_id, max_amount=max_amount))
+        elif max_amount > proxy.max_amount:
+            proxy.max_amount = max_amount
+            proxy.created_at = datetime.utcnow()
+    
+    def _update_watch(self, data: Dict, watch: bool):
+        session_id = request.sid
+        auction_id = data.get('auction_id')
+        
+        if session_id not in self.connected_users:
+            emit('error', {'message': 'Not authenticated'})
+            return
+        
+        if not auction_id:
+            emit('error', {'message': 'Auction ID required'})
+            return
+        
+        try:
+            user_id = self.connected_users[session_id]['user_id']
+            if watch:
+                self.watchlist.watch(user_id, auction_id)
+            else:
+                self.watchlist.unwatch(user_id, auction_id)
+            emit('watch_status', {'auction_id': auction_id, 'watching': watch})
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error updating watch list: {str(e)}")
+            emit('error', {'message': 'Failed to update watch list'})
+    
     def validate_bid(self, user_id: int, auction_id: int, bid_amount: float) -> Dict:
         """Validate bid before processing"""
         try:
@@ -342,8 +819,8 @@ class AuctionWebSocketServer:
             if auction.item.owner_id == user_id:
                 return {'valid': False, 'message': 'Cannot bid on your own item'}
             
-            # Check minimum bid increment (5 KWD)
-            min_bid = auction.current_price + 5
+            # Check minimum bid increment (auction / category / default ladder)
+            min_bid = self.policies.min_next_bid(auction_id, auction.current_price, auction.item.category)
             if bid_amount < min_bid:
                 return {'valid': False, 'message': f'Minimum bid is {min_bid} KWD'}
             
@@ -358,14 +835,48 @@ class AuctionWebSocketServer:
             logger.error(f"Error validating bid: {str(e)}")
             return {'valid': False, 'message': 'Validation failed'}
     
+    def broadcast(self, event: str, auction_id: int, data: Dict, skip_sid: Optional[str] = None,
+                  sequenced: bool = True):
+        """
+        Send an auction event to its participants. The payload is encoded once
+        per room (JSON for legacy clients, MessagePack for compact clients) and
+        the same frame is reused for every recipient in that room.
+        
+        State changes are sequenced and kept in the event log for resync;
+        presence chatter (sequenced=False) is not.
+        """
+        if sequenced:
+            data = dict(data, seq=self.event_log.append(auction_id, event, data))
+        frames = {ENCODING_JSON: encode_json(data)}
+        if compact_available():
+            frames[ENCODING_MSGPACK] = encode_compact(data)
+        # connections that are behind get the frame through their own
+        # bounded queue, at delivery (outbound.BackpressureManager)
+        for encoding, frame in frames.items():
+            self.socketio.emit(event, frame, room=auction_room(auction_id, encoding), skip_sid=skip_sid)
+    
+    def resync_payload(self, auction_id: int, events) -> Dict:
+        """Missed events for a client that is behind, in sequence order"""
+        return encode_json({
+            'auction_id': auction_id,
+            'epoch': self.event_log.epoch,
+            'seq': self.event_log.current_seq(auction_id),
+            'events': [dict(entry['data'], seq=entry['seq'], event=entry['event']) for entry in events]
+        })
+    
+    def broadcast_auction_time(self, auction_id: int, start_time, end_time, status):
+        """Push an auction's end time and status after any committed lifecycle change"""
+        self.broadcast('auction_time', auction_id, auction_time_payload(auction_id, start_time, end_time, status))
+    
     def broadcast_auction_update(self, auction_id: int, update_data: Dict):
         """Broadcast auction update to all participants"""
-        self.socketio.emit('auction_update', {
+        self.broadcast('auction_update', auction_id, {
             'auction_id': auction_id,
             'update_data': update_data,
-            'timestamp': datetime.utcnow().isoformat()
-        }, room=f'auction_{auction_id}')
+            'timestamp': datetime.utcnow()
+        })
     
+    @timed('task auction_ended')
     def broadcast_auction_ended(self, auction_id: int):
         """Broadcast auction end notification"""
         try:
@@ -375,33 +886,105 @@ class AuctionWebSocketServer:
             
             # Update auction status
             auction.status = AuctionStatus.CLOSED
+            db.session.commit()
+            if self.journal:
+                self.journal.record_close(auction_id)
             
-            # Process revenue if there's a winner
+            # Settlement (commission, earnings, winner email) runs on the job
+            # queue; if this process dies before the enqueue, the startup
+            # sweep (enqueue_unsettled_auctions) picks the auction up
             if auction.winning_bid_id:
-                revenue_result = revenue_manager.process_auction_completion(auction_id)
-                logger.info(f"Revenue processed for auction {auction_id}: {revenue_result}")
-            
-            db.session.commit()
+                enqueue('settle_auction', auction_id=auction_id)
             
             # Broadcast to all participants
-            self.socketio.emit('auction_ended', {
+            self.broadcast('auction_ended', auction_id, {
                 'auction_id': auction_id,
                 'final_price': auction.current_price,
                 'winner_id': auction.winning_bid.bidder_id if auction.winning_bid else None,
                 'total_bids': auction.total_bids,
-                'timestamp': datetime.utcnow().isoformat()
-            }, room=f'auction_{auction_id}')
+                'timestamp': datetime.utcnow()
+            })
+            self.event_log.discard(auction_id)
+            self.policies.clear_auction(auction_id)
+            self.watchlist.on_auction_closed(auction_id)
             
             logger.info(f"Auction {auction_id} ended - Final price: {auction.current_price} KWD")
             
         except Exception as e:
             logger.error(f"Error ending auction {auction_id}: {str(e)}")
     
+    def start_background_tasks(self):
+        """Load persisted watch lists and start the auction lifecycle sweeper"""
+        with self.app.app_context():
+            self.watchlist.load()
+            enqueue_unsettled_auctions()
+            active = db.session.query(Auction.id, Auction.end_time).filter(
+                Auction.status == AuctionStatus.ACTIVE
+            )
+            for auction_id, end_time in active:
+                self.ending_soon.track(auction_id, end_time)
+            if self.journal:
+                self.restore_live_state()
+            db.session.remove()
+        if self.handoff:
+            self.load_handoff()
+        if self.journal:
+            self.journal.start(spawn=self.socketio.start_background_task)
+        self.outbound.start(lambda: list(self.connected_users))
+        self.socketio.start_background_task(self._lifecycle_sweeper)
+    
+    @timed('task restore_live_state')
+    def restore_live_state(self):
+        """
+        Replay the bid journal (snapshot + tail, truncating a torn record),
+        then append the bids that were committed but not yet fsynced to it:
+        one range scan on bid.id. Nothing is read back into memory: prices,
+        leaders and extension counts all come from the database.
+        """
+        state = self.journal.recover()
+        journaled = state.last_bid_id
+        missed = db.session.query(Bid.auction_id, Bid.id, Bid.bidder_id, Bid.amount).filter(
+            Bid.id > journaled
+        ).order_by(Bid.id)
+        for auction_id, bid_id, bidder_id, amount in missed:
+            self.journal.record_bids(auction_id, [(bid_id, bidder_id, amount)])
+        self.journal.flush()
+        logger.info(f"Recovered live state of {len(state)} auctions from the bid journal "
+                    f"(last bid {journaled}, {state.last_bid_id - journaled} bids caught up)")
+    
+    def _lifecycle_sweeper(self):
+        interval = self.app.config.get('AUCTION_SWEEP_INTERVAL', 30)
+        while True:
+            self.socketio.sleep(interval)
+            with self.app.app_context():  # notification inbox writes
+                try:
+                    self.sweep_ending_soon()
+                except Exception as e:
+                    logger.error(f"Error in auction sweeper: {str(e)}")
+    
+    @timed('task sweep_ending_soon')
+    def sweep_ending_soon(self):
+        """Announce active auctions that entered the ending-soon window"""
+        window = self.watchlist.ending_soon_window
+        auctions, _ = self.ending_soon.window(window, limit=len(self.ending_soon))
+        self.watchlist.on_ending_soon([auction_id for auction_id, _ in auctions], dict(auctions))
+        self.socketio.emit('ending_soon', self.ending_soon_payload(), room='ending_soon')
+    
+    def ending_soon_payload(self, limit: int = 50) -> Dict:
+        window = self.watchlist.ending_soon_window
+        auctions, total = self.ending_soon.window(window, limit=limit)
+        return {
+            'window': window,
+            'total': total,
+            'auctions': [
+                {'auction_id': auction_id, 'end_time': end_time.isoformat()}
+                for auction_id, end_time in auctions
+            ]
+        }
+    
     def send_notification_to_user(self, user_id: int, notification_data: Dict):
-        """Send notification to specific user"""
-        if user_id in self.user_sessions:
-            for session_id in self.user_sessions[user_id]:
-                self.socketio.emit('notification', notification_data, room=session_id)
+        """Send notification to specific user (stored in the inbox if offline)"""
+        self.notifications.notify([user_id], notification_data)
     
     def get_active_auctions_count(self) -> int:
         """Get count of active auctions with participants"""
@@ -422,8 +1005,46 @@ def create_websocket_server(app: Flask, secret_key: str) -> AuctionWebSocketServ
     """Create and configure WebSocket server"""
     global websocket_server
     websocket_server = AuctionWebSocketServer(app, secret_key)
+    if not app.config.get('TESTING'):
+        websocket_server.start_background_tasks()
+        install_drain_handler(websocket_server)
     return websocket_server
 
+def install_drain_handler(server: AuctionWebSocketServer, signum: int = signal.SIGTERM):
+    """
+    Drain on SIGTERM, then hand over to the previous handler (gunicorn's
+    graceful exit). The handler only schedules the drain as a background
+    task: waiting for bids in a signal handler would block the eventlet /
+    gevent hub (or the interrupted thread) that has to finish them.
+    """
+    previous = signal.getsignal(signum)
+    
+    def hand_over(received, frame):
+        if callable(previous):
+            previous(received, frame)
+        elif previous != signal.SIG_IGN:
+            signal.signal(signum, signal.SIG_DFL)
+            os.kill(os.getpid(), signum)
+    
+    def drain_then_hand_over(received):
+        try:
+            server.drain()
+        except Exception as e:
+            logger.error(f"Error draining: {str(e)}")
+        hand_over(received, None)
+    
+    def on_signal(received, frame):
+        if server.draining:  # a second signal: stop waiting
+            hand_over(received, frame)
+            return
+        server.draining = True
+        server.socketio.start_background_task(drain_then_hand_over, received)
+    
+    try:
+        signal.signal(signum, on_signal)
+    except ValueError:  # not the main thread: the caller drains explicitly
+        logger.warning("Drain handler not installed outside the main thread")
+
 def get_websocket_server() -> Optional[AuctionWebSocketServer]:
     """Get the global WebSocket server instance"""
     return websocket_server
@@ -0,0 +1,116 @@
+"""
+Wire Encoding for Auction Broadcasts in Mzadd Platform
+Compact MessagePack frames (short field codes, epoch-millis timestamps) for
+clients that negotiate them, with the verbose JSON dicts as the fallback
+"""
+
+from datetime import datetime, date
+from decimal import Decimal
+from typing import Dict
+
+try:
+    import msgpack
+except ImportError:  # compact encoding is optional; everyone gets JSON
+    msgpack = None
+
+ENCODING_JSON = 'json'
+ENCODING_MSGPACK = 'msgpack'
+
+# Long field name -> short code used in compact frames. Sent to clients in
+# `auth_success` so they can expand frames without hard-coding the table;
+# codes are unique so the table inverts without losing a field.
+FIELD_CODES = {
+    'auction_id': 'a',
+    'bid_id': 'b',
+    'amount': 'p',
+    'current_price': 'r',
+    'final_price': 'f',
+    'bidder_name': 'u',
+    'username': 'h',
+    'winner_id': 'w',
+    'timestamp': 't',
+    'total_bids': 'n',
+    'unique_bidders': 'k',
+    'participants_count': 'c',
+    'new_end_time': 'e',
+    'end_time': 'd',
+    'extension_time': 'x',
+    'status': 's',
+    'seq': 'q',
+}
+
+
+def compact_available() -> bool:
+    return msgpack is not None
+
+
+def negotiate_encoding(requested) -> str:
+    """Pick the encoding for a client: compact only when asked and supported."""
+    if requested == ENCODING_MSGPACK and compact_available():
+        return ENCODING_MSGPACK
+    return ENCODING_JSON
+
+
+def auction_room(auction_id, encoding: str = ENCODING_JSON) -> str:
+    """Socket.IO room for an auction; compact clients get their own room."""
+    if encoding == ENCODING_MSGPACK:
+        return f'auction_{auction_id}:mp'
+    return f'auction_{auction_id}'
+
+
+def room_auction_id(room):
+    """The auction id of an auction_room() name; None for any other room."""
+    if not isinstance(room, str) or not room.startswith('auction_'):
+        return None
+    auction_id = room[len('auction_'):].split(':', 1)[0]
+    return int(auction_id) if auction_id.isdigit() else None
+
+
+def epoch_millis(value: datetime) -> int:
+    # naive datetimes in this code base are UTC (datetime.utcnow)
+    if value.tzinfo is None:
+        return int((value - datetime(1970, 1, 1)).total_seconds() * 1000)
+    return int(value.timestamp() * 1000)
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dict):
+        return {key: _json_value(item) for key, item in value.items()}
+    return value
+
+
+def _compact_value(value):
+    if isinstance(value, datetime):
+        return epoch_millis(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def encode_json(data: Dict) -> Dict:
+    """JSON fallback: the same dict as before, with datetimes as ISO strings."""
+    return _json_value(data)
+
+
+def encode_compact(data: Dict) -> bytes:
+    """
+    Pack a broadcast payload into a MessagePack frame. Nested `update_data`
+    is flattened into the top level and known fields use their short code.
+    """
+    flat = {}
+    for key, value in data.items():
+        if key == 'update_data' and isinstance(value, dict):
+            for nested_key, nested_value in value.items():
+                flat.setdefault(FIELD_CODES.get(nested_key, nested_key), _compact_value(nested_value))
+        else:
+            flat[FIELD_CODES.get(key, key)] = _compact_value(value)
+    return msgpack.packb(flat, use_bin_type=True)
+
+
+def decode_compact(frame: bytes) -> Dict:
+    """Inverse of encode_compact (short codes are kept); used by tests and tools."""
+    return msgpack.unpackb(frame, raw=False)
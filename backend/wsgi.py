@@ -0,0 +1,15 @@
+# backend/wsgi.py
+"""
+Production entry point: `gunicorn -c gunicorn.conf.py wsgi:app`
+(or `python serve.py` to run several processes behind nginx).
+"""
+import os
+
+from app import create_app
+from config import config
+from websocket_server import create_websocket_server
+
+app = create_app(config[os.environ.get('FLASK_CONFIG', 'production')])
+# Live-bidding handlers, background tasks and the SIGTERM drain; imported
+# by each gunicorn worker, after the worker has installed its own signals
+websocket_server = create_websocket_server(app, app.config['JWT_SECRET_KEY'])